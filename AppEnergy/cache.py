@@ -0,0 +1,281 @@
+"""
+Persistent on-disk cache of data source lookups.
+
+Results of each source's ``get_categories`` are stored in a single SQLite
+file keyed by (source, normalized app name), so repeated lookups of the same
+application are answered locally until their TTL expires. The store
+description of the application, when the source has one, is kept in the
+same entry.
+
+ResolutionIndex uses the same file to remember which store ID or page URL a
+search-based source resolved a name to, so a lookup whose categories have
+expired can go straight to the detail page instead of searching again.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from .config import (
+    CACHE_PATH, CACHE_DEFAULT_TTL, CACHE_NEGATIVE_TTL, CACHE_TTL,
+    RESOLUTION_TTL, RESOLUTION_NEGATIVE_TTL,
+)
+
+
+def normalize_app_name(app_name: str) -> str:
+    """
+    Normalize an application name for use as a cache key.
+    
+    Args:
+        app_name: Name of the application
+        
+    Returns:
+        Lowercased name with collapsed whitespace
+    """
+    return " ".join(str(app_name).lower().split())
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Open a cache database, creating its directory if needed."""
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    conn = sqlite3.connect(path, check_same_thread=False)
+    with conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class CategoryCache:
+    """SQLite-backed cache of per-source category lookups with TTLs"""
+    
+    def __init__(self, path: Optional[str] = None, ttl: Optional[dict] = None,
+                 default_ttl: float = CACHE_DEFAULT_TTL, negative_ttl: float = CACHE_NEGATIVE_TTL):
+        """
+        Args:
+            path: Cache file location (defaults to CACHE_PATH, ":memory:"
+                keeps the cache in memory)
+            ttl: Per-source TTL in seconds for non-empty results (defaults
+                to CACHE_TTL)
+            default_ttl: TTL of non-empty results for sources not in ttl
+            negative_ttl: TTL of empty results
+        """
+        self.path = path or CACHE_PATH
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS categories ("
+                " source TEXT NOT NULL,"
+                " app_key TEXT NOT NULL,"
+                " categories TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " description TEXT,"
+                " PRIMARY KEY (source, app_key))"
+            )
+    
+    def get(self, source: str, app_name: str) -> Optional[List[str]]:
+        """
+        Read a cached lookup.
+        
+        Args:
+            source: Data source name
+            app_name: Name of the application
+            
+        Returns:
+            Cached category list (possibly empty), or None on a miss or when
+            the entry has expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT categories, expires_at FROM categories WHERE source = ? AND app_key = ?",
+                (source, normalize_app_name(app_name))
+            ).fetchone()
+        
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+    
+    def get_description(self, source: str, app_name: str) -> Optional[str]:
+        """
+        Read the description stored with a cached lookup.
+        
+        Args:
+            source: Data source name
+            app_name: Name of the application
+            
+        Returns:
+            Cached description ("" if the source has none), or None on a
+            miss, when the entry has expired or when no description was stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT description, expires_at FROM categories WHERE source = ? AND app_key = ?",
+                (source, normalize_app_name(app_name))
+            ).fetchone()
+        
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+    
+    def set(self, source: str, app_name: str, categories: List[str], description: Optional[str] = None) -> None:
+        """
+        Store a lookup result.
+        
+        Args:
+            source: Data source name
+            app_name: Name of the application
+            categories: Categories returned by the source (may be empty)
+            description: Store description of the application ("" if it has
+                none, None if unknown)
+        """
+        categories = list(categories or [])
+        ttl = self.ttl.get(source, self.default_ttl) if categories else self.negative_ttl
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO categories (source, app_key, categories, expires_at, description)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (source, normalize_app_name(app_name), json.dumps(categories), time.time() + ttl, description)
+            )
+    
+    def set_description(self, source: str, app_name: str, description: str) -> None:
+        """
+        Add a description to an existing cache entry (no-op if there is none).
+        
+        Args:
+            source: Data source name
+            app_name: Name of the application
+            description: Store description ("" if the source has none)
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE categories SET description = ? WHERE source = ? AND app_key = ?",
+                (description, source, normalize_app_name(app_name))
+            )
+    
+    def prune(self) -> int:
+        """
+        Delete expired entries.
+        
+        Returns:
+            Number of deleted entries
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM categories WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+    
+    def clear(self) -> None:
+        """Delete all entries."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM categories")
+    
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class ResolutionIndex:
+    """SQLite-backed index of per-source name -> store ID/URL resolutions"""
+    
+    def __init__(self, path: Optional[str] = None, ttl: float = RESOLUTION_TTL,
+                 negative_ttl: float = RESOLUTION_NEGATIVE_TTL):
+        """
+        Args:
+            path: Index file location (defaults to CACHE_PATH, ":memory:"
+                keeps the index in memory)
+            ttl: TTL in seconds of resolved IDs/URLs
+            negative_ttl: TTL of "no search match" entries
+        """
+        self.path = path or CACHE_PATH
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolutions ("
+                " source TEXT NOT NULL,"
+                " app_key TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (source, app_key))"
+            )
+    
+    def get(self, source: str, app_name: str) -> Optional[str]:
+        """
+        Read a stored resolution.
+        
+        Args:
+            source: Data source name
+            app_name: Name of the application
+            
+        Returns:
+            Resolved ID or URL, an empty string if the search had no match,
+            or None on a miss or when the entry has expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT target, expires_at FROM resolutions WHERE source = ? AND app_key = ?",
+                (source, normalize_app_name(app_name))
+            ).fetchone()
+        
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+    
+    def set(self, source: str, app_name: str, target: Optional[str]) -> None:
+        """
+        Store a resolution.
+        
+        Args:
+            source: Data source name
+            app_name: Name of the application
+            target: Resolved ID or URL, or None/"" if the search had no match
+        """
+        target = target or ""
+        ttl = self.ttl if target else self.negative_ttl
+        
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?)",
+                (source, normalize_app_name(app_name), target, time.time() + ttl)
+            )
+    
+    def delete(self, source: str, app_name: str) -> None:
+        """Forget the resolution of an application (e.g. when it went stale)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM resolutions WHERE source = ? AND app_key = ?",
+                (source, normalize_app_name(app_name))
+            )
+    
+    def prune(self) -> int:
+        """
+        Delete expired entries.
+        
+        Returns:
+            Number of deleted entries
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM resolutions WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+    
+    def clear(self) -> None:
+        """Delete all entries."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM resolutions")
+    
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,7 @@
 """
 Configuration and constants for the App Category Analyzer.
 """
+import os
 
 # Headers for Snapcraft API
 SNAP_HEADERS = {
@@ -14,6 +15,120 @@ GENERAL_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
 }
 
+# Base URLs of the store APIs (overridable, e.g. to point at a local stand-in server)
+FLATHUB_API_URL = os.environ.get("APPENERGY_FLATHUB_API", "https://flathub.org/api/v2")
+SNAPCRAFT_API_URL = os.environ.get("APPENERGY_SNAPCRAFT_API", "https://api.snapcraft.io/v2")
+
+# Shared HTTP sessions used by the data sources (see data_sources/session.py)
+HTTP_POOL_CONNECTIONS = 10  # Number of per-host connection pools kept alive
+HTTP_POOL_MAXSIZE = 10  # Keep-alive connections per host
+HTTP_TIMEOUT = (5, 30)  # (connect, read) timeout in seconds
+HTTP_RETRIES = 2  # Retries on connection errors, 429 and 5xx responses
+HTTP_BACKOFF_FACTOR = 0.5  # Exponential backoff between retries, in seconds
+HTTP_RETRY_AFTER_MAX = 10  # Longest Retry-After wait honoured before a retry, in seconds
+
+# Per-host health tracking of the data sources (see data_sources/health.py)
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures (errors, 429, 5xx) that open a host's circuit
+CIRCUIT_COOLDOWN = 60  # Seconds an open circuit skips the host before a trial request
+HOST_MIN_CONCURRENCY = 1  # Lowest adaptive limit of concurrent requests per host
+HOST_MAX_CONCURRENCY = HTTP_POOL_MAXSIZE  # Highest adaptive limit of concurrent requests per host
+HOST_SLOW_REQUEST = 5.0  # Request duration, in seconds, treated as a congestion signal
+
+# In-process memo of resolved app pages shared by each source's
+# get_categories and get_description (see data_sources/pages.py)
+APP_PAGE_TTL = 600  # Seconds a fetched page stays reusable
+APP_PAGE_CACHE_SIZE = 256  # Pages kept per source
+
+# Headless browser pool used by the get_description scrapers (see data_sources/browser.py)
+BROWSER_POOL_SIZE = 2  # Maximum number of live WebDriver instances
+BROWSER_MAX_USES = 50  # Pages a driver may serve before it is recycled
+BROWSER_WAIT_TIMEOUT = 10  # Seconds to wait for a page element to render
+
+# Maximum number of worker threads used to query the data sources of a
+# single application concurrently (1 queries them one after another)
+FETCH_MAX_WORKERS = 6
+
+# Confidence-driven early exit (EnergyConsumptionCalculator(early_exit_threshold=...)):
+# a lookup stops querying the remaining sources once the best category reaches
+# the threshold and its lead over every other category exceeds the summed
+# budget of the pending sources
+EARLY_EXIT_THRESHOLD = 0.6  # Default threshold of the CLI --early-exit option
+
+# Largest score a pending source is assumed to add to any one category, i.e.
+# the number of normalized tags it returns (each scores at most 1.0). The
+# Apple Store and MyAbandonware return one category, which normalizes to at
+# most two tags ("Photo & Video" -> photo, video), so their budget is a bound;
+# the other stores return tag lists of any length and their budget is a
+# typical count, which makes the early exit a heuristic when they are pending
+EARLY_EXIT_TAG_BUDGET = {
+    "Snapcraft": 2.0,
+    "Flathub": 2.0,
+    "Apple Store": 2.0,
+    "Gog": 3.0,
+    "Itch.io": 3.0,
+    "My Abandonware": 2.0,
+}
+
+# Default delay, in seconds, after which the CLI --hedge-after option sends a
+# second request to a source that has not answered
+HEDGE_AFTER = 3.0
+
+# Persistent lookup cache used by the CLI (see cache.py)
+CACHE_PATH = os.environ.get(
+    "APPENERGY_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "AppEnergy", "cache.sqlite3")
+)
+CACHE_DEFAULT_TTL = 7 * 24 * 3600  # Seconds a non-empty lookup stays fresh
+CACHE_NEGATIVE_TTL = 24 * 3600  # Seconds an empty ("not found") lookup stays fresh
+
+# Per-source TTL overrides for non-empty lookups, in seconds
+CACHE_TTL = {
+    "Snapcraft": 14 * 24 * 3600,
+    "Flathub": 14 * 24 * 3600,
+    "Apple Store": 7 * 24 * 3600,
+    "Gog": 30 * 24 * 3600,
+    "Itch.io": 7 * 24 * 3600,
+    "My Abandonware": 90 * 24 * 3600,
+}
+
+# Local mirror of the Flathub and Snapcraft catalogs, filled by
+# "AppEnergy sync-catalog" (see data_sources/catalog_mirror.py)
+CATALOG_PATH = os.environ.get(
+    "APPENERGY_CATALOG",
+    os.path.join(os.path.expanduser("~"), ".cache", "AppEnergy", "catalog.sqlite3")
+)
+CATALOG_MAX_AGE = 30 * 24 * 3600  # Seconds after a sync the mirror is still used (None: forever)
+CATALOG_DETAILS_WORKERS = 8  # Concurrent Flathub details requests of a sync
+
+# Persistent name -> store ID/URL resolutions of the search-based sources,
+# kept in the lookup cache file (see cache.ResolutionIndex)
+RESOLUTION_TTL = 30 * 24 * 3600  # Seconds a resolved ID or URL is reused
+RESOLUTION_NEGATIVE_TTL = 24 * 3600  # Seconds a "no search match" result is reused
+
+# Default number of applications processed concurrently by
+# EnergyConsumptionCalculator.process_applications
+BATCH_CONCURRENCY = 8
+
+# Number of applications sent to a worker process at a time by
+# EnergyConsumptionCalculator.classify_applications
+CLASSIFY_CHUNK_SIZE = 64
+
+# "AppEnergy serve" (see server.py)
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8765
+SERVE_MAX_BATCH = 1000  # Names accepted per POST /batch request
+SERVE_MAX_BODY = 1024 * 1024  # Bytes accepted per request body
+
+# Maximum number of normalized tags whose per-category scores are memoized
+# by each calculator (see matching.TagScoreCache)
+TAG_SCORE_CACHE_SIZE = 10000
+
+# Share of the confidence given to category keywords found in store
+# descriptions (EnergyConsumptionCalculator(use_descriptions=True)); the
+# tag score keeps the rest. Descriptions without any keyword leave the
+# confidence unchanged
+DESCRIPTION_WEIGHT = 0.25
+
 # Predefined main categories
 # Predefined main and sub categories
 MAIN_CATEGORIES = {
@@ -0,0 +1,110 @@
+"""
+Asyncio helpers shared by the ``async_get_categories`` adapters.
+
+The adapters take an aiohttp-compatible ``session`` (an object whose ``get``
+method returns an async context manager yielding a response with
+``raise_for_status``, ``read`` and ``text``), so aiohttp is only imported
+when create_session is called.
+
+Requests are recorded in the per-host health state (see health.py) and fail
+immediately with health.CircuitOpenError while their host's circuit is open;
+the per-host concurrency limit is left to the session's connector.
+"""
+import json
+import time
+
+from AppEnergy import metrics
+from AppEnergy.config import HTTP_POOL_MAXSIZE, HTTP_TIMEOUT
+from . import health
+
+
+def create_session():
+    """
+    Open an aiohttp.ClientSession with the pool size and timeouts used by the
+    shared synchronous sessions (see session.py).
+    
+    Returns:
+        aiohttp.ClientSession: New client session; the caller must close it
+    """
+    import aiohttp
+
+    connect_timeout, read_timeout = HTTP_TIMEOUT
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=HTTP_POOL_MAXSIZE),
+        timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+    )
+
+
+async def _get(session, url, raise_for_status, as_text, **kwargs):
+    """Fetch a URL, recording the outcome in the health state of its host."""
+    host = health.get_host(url)
+    trial = host.acquire(enforce_limit=False)
+    started = time.monotonic()
+    status = None
+    try:
+        async with session.get(url, **kwargs) as response:
+            status = response.status
+            if raise_for_status:
+                response.raise_for_status()
+            body = await (response.text() if as_text else response.read())
+    except Exception:
+        host.release(time.monotonic() - started, status is None or status in health.FAILURE_STATUSES, trial)
+        metrics.record_request(0)
+        raise
+    except BaseException:
+        host.cancel(trial)  # Cancelled (e.g. by a deadline or early exit)
+        raise
+    
+    host.release(time.monotonic() - started, status in health.FAILURE_STATUSES, trial)
+    metrics.record_request(len(body))
+    return body
+
+
+async def fetch_bytes(session, url, **kwargs):
+    """
+    Fetch a URL and return the response body.
+    
+    Args:
+        session: aiohttp-compatible client session
+        url (str): URL to fetch
+        **kwargs: Extra arguments passed to ``session.get`` (headers, params)
+        
+    Returns:
+        bytes: Response body
+        
+    Raises:
+        Exception: If the request fails or returns an error status
+    """
+    return await _get(session, url, True, False, **kwargs)
+
+
+async def fetch_text(session, url, raise_for_status=True, **kwargs):
+    """
+    Fetch a URL and return the decoded response body.
+    
+    Args:
+        session: aiohttp-compatible client session
+        url (str): URL to fetch
+        raise_for_status (bool): Raise on 4xx/5xx responses (default: True)
+        **kwargs: Extra arguments passed to ``session.get`` (headers, params)
+        
+    Returns:
+        str: Response text
+    """
+    return await _get(session, url, raise_for_status, True, **kwargs)
+
+
+async def fetch_json(session, url, raise_for_status=True, **kwargs):
+    """
+    Fetch a URL and decode its JSON body, whatever the content type.
+    
+    Args:
+        session: aiohttp-compatible client session
+        url (str): URL to fetch
+        raise_for_status (bool): Raise on 4xx/5xx responses (default: True)
+        **kwargs: Extra arguments passed to ``session.get`` (headers, params)
+        
+    Returns:
+        Decoded JSON document
+    """
+    return json.loads(await fetch_text(session, url, raise_for_status, **kwargs))
@@ -1,112 +1,179 @@
 """
-Apple App Store scraper for fetching application categories.
+Apple App Store scraper for fetching application categories and descriptions.
 """
-import requests
-from bs4 import BeautifulSoup
 from AppEnergy.config import GENERAL_HEADERS
+from . import aio, resolution
+from .pages import failed_lookup, memoize_page
 
-def get_categories(app_name):
+SOURCE_NAME = "Apple Store"
+HOST = "apple.com"  # Health key of the hosts queried by get_categories (see health.py)
+
+
+def _search_url(app_name):
+    """Build the apple.com search URL for an application name."""
+    return f"https://www.apple.com/us/search/{app_name}?src=serp"
+
+
+def _find_app_link(search_content, app_name):
     """
-    Get categories for an application from Apple App Store.
+    Find the App Store link of the first search result matching the app name.
     
     Args:
+        search_content: Body of the apple.com search page
         app_name (str): Name of the application
         
     Returns:
-        list: List containing the category if found, otherwise empty list
+        str: App Store URL, or None if no result matches
+        
+    Raises:
+        ValueError: If the page has no search results container (not a
+        search page), so it is not taken for "no match"
     """
-    result = {"app_link": None, "category": None}
-    
-    # Phase 1: Find app link
-    search_url = f"https://www.apple.com/us/search/{app_name}?src=serp"
-    
-    try:
-        response = requests.get(search_url, headers=GENERAL_HEADERS)
-        response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return []
+    from bs4 import BeautifulSoup
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = BeautifulSoup(search_content, "html.parser")
+    results = soup.find("div", class_="rf-serp-results")
+    if results is None:
+        raise ValueError("apple.com search page has no results container")
     
     # Find matching app in search results
-    for div in soup.find_all("div", class_="rf-serp-product-description"):
+    for div in results.find_all("div", class_="rf-serp-product-description"):
         h2 = div.find("h2", class_="rf-serp-productname")
         target_name = app_name.lower()
         if h2 and target_name in h2.text.strip().lower():
             if a_tag := div.find("a", href=True):
-                result["app_link"] = a_tag["href"]
-                break
+                return a_tag["href"]
+    return None
 
-    if not result["app_link"]:
-        return []
 
-    # Phase 2: Get category info
-    try:
-        app_response = requests.get(result["app_link"], headers=GENERAL_HEADERS)
-        app_response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return []
+def _parse_app_page(app_link, app_content):
+    """
+    Parse every field used from an App Store app page in a single pass.
+    
+    Args:
+        app_link (str): URL of the app page
+        app_content: Body of the app page
+        
+    Returns:
+        dict: Page with url, categories (list containing the category if
+        found) and description (paragraphs separated by blank lines, or
+        empty string)
+    """
+    from bs4 import BeautifulSoup
 
-    app_soup = BeautifulSoup(app_response.content, "html.parser")
+    app_soup = BeautifulSoup(app_content, "html.parser")
     
+    categories = []
     if (dt_tag := app_soup.find("dt", string="Category")) and (dd_tag := dt_tag.find_next("dd")):
-        result["category"] = dd_tag.text.strip()
-        return [result["category"]] if result["category"] else []
+        category = dd_tag.text.strip()
+        categories = [category] if category else []
     
-    return []
+    p_elements = app_soup.select('div.section__description div.l-row div.we-truncate p')
+    # Forcefully print text of all p elements same like web
+    description = "\n\n".join([p.get_text(separator="\n") for p in p_elements]).strip()
+    
+    return {"url": app_link, "categories": categories, "description": description}
 
 
-def get_description(app_name, num_to_skip=0):
+def _search_app_link(app_name):
+    """Search the App Store for an application and return its page link, or None."""
+    from .session import get_session
+
+    response = get_session("general").get(_search_url(app_name))
+    response.raise_for_status()
+    return _find_app_link(response.content, app_name)
+
+
+@memoize_page
+def fetch_app_page(app_name):
     """
-    Get application description from Apple App Store and return <p> elements as a string,
-    skipping the last num_to_skip paragraphs.
+    Resolve an application to its App Store page, fetching and parsing it once.
     
     Args:
         app_name (str): Name of the application
-        num_to_skip (int): Number of trailing <p> elements to skip (default: 0)
         
     Returns:
-        str: Description text (paragraphs separated by blank lines), or empty string if not found.
+        dict: Parsed page (see _parse_app_page), or None if no search result
+        matches
+        
+    Raises:
+        requests.exceptions.RequestException: If a request fails
+    """
+    from .session import get_session
+
+    def fetch(app_link):
+        app_response = get_session("general").get(app_link)
+        app_response.raise_for_status()
+        return _parse_app_page(app_link, app_response.content)
+
+    # Phase 1: Find app link (skipped when already resolved); Phase 2: Get the app page
+    return resolution.resolve(SOURCE_NAME, app_name, _search_app_link, fetch)
+
+
+def get_categories(app_name):
     """
-    # Phase 1: Find app link
-    search_url = f"https://www.apple.com/us/search/{app_name}?src=serp"
+    Get categories for an application from Apple App Store.
     
+    Args:
+        app_name (str): Name of the application
+        
+    Returns:
+        list: List containing the category if found, otherwise empty list;
+        None if the lookup failed
+    """
     try:
-        response = requests.get(search_url, headers=GENERAL_HEADERS)
-        response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return ""
+        page = fetch_app_page(app_name)
+    except Exception as e:
+        return failed_lookup(e)
+
+    return page["categories"] if page else []
+
 
-    soup = BeautifulSoup(response.content, "html.parser")
+async def async_get_categories(app_name, session):
+    """
+    Asyncio variant of get_categories.
     
-    # Find matching app in search results
-    app_link = None
-    for div in soup.find_all("div", class_="rf-serp-product-description"):
-        h2 = div.find("h2", class_="rf-serp-productname")
-        target_name = app_name.lower()
-        if h2 and target_name in h2.text.strip().lower():
-            if a_tag := div.find("a", href=True):
-                app_link = a_tag["href"]
-                break
+    Args:
+        app_name (str): Name of the application
+        session: aiohttp-compatible client session
+        
+    Returns:
+        list: List containing the category if found, otherwise empty list;
+        None if the lookup failed
+    """
+    async def search(app_name):
+        search_content = await aio.fetch_bytes(session, _search_url(app_name), headers=GENERAL_HEADERS)
+        return _find_app_link(search_content, app_name)
 
-    if not app_link:
-        return ""
+    async def fetch(app_link):
+        app_content = await aio.fetch_bytes(session, app_link, headers=GENERAL_HEADERS)
+        return _parse_app_page(app_link, app_content)
 
-    # Phase 2: Get description
     try:
-        app_response = requests.get(app_link, headers=GENERAL_HEADERS)
-        app_response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return ""
+        page = await resolution.async_resolve(SOURCE_NAME, app_name, search, fetch)
+        fetch_app_page.prime(app_name, page)
+        return page["categories"] if page else []
+    except Exception as e:
+        return failed_lookup(e)
 
-    app_soup = BeautifulSoup(app_response.content, "html.parser")
 
-    p_elements = app_soup.select('div.section__description div.l-row div.we-truncate p')
+def get_description(app_name, num_to_skip=0):
+    """
+    Get application description from Apple App Store and return <p> elements as a string,
+    skipping the last num_to_skip paragraphs.
     
-    if not p_elements:
+    Args:
+        app_name (str): Name of the application
+        num_to_skip (int): Number of trailing <p> elements to skip (default: 0)
+        
+    Returns:
+        str: Description text (paragraphs separated by blank lines), or empty string if not found.
+    """
+    import requests
+
+    try:
+        page = fetch_app_page(app_name)
+    except requests.exceptions.RequestException:
         return ""
 
-    # Forcefully print text of all p elements same like web
-    description = "\n\n".join([p.get_text(separator="\n") for p in p_elements]).strip()
-    # print(description)
-    return description
\ No newline at end of file
+    return page["description"] if page else ""
@@ -0,0 +1,156 @@
+"""
+Pool of long-lived headless Chrome WebDriver instances.
+
+The ``get_description`` scrapers check a driver out of the shared pool
+instead of launching a new browser per call, so fetching descriptions for
+many applications costs page-load time rather than browser start-up time.
+Drivers are recycled after BROWSER_MAX_USES pages or after any error.
+Selenium is imported only when the first driver is created.
+"""
+import atexit
+import threading
+from contextlib import contextmanager
+
+from AppEnergy.config import BROWSER_POOL_SIZE, BROWSER_MAX_USES, BROWSER_WAIT_TIMEOUT
+
+
+def create_driver():
+    """
+    Launch a headless Chrome WebDriver.
+    
+    Returns:
+        selenium.webdriver.Chrome: New driver instance
+    """
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    return webdriver.Chrome(options=options)
+
+
+def wait_for(driver, css_selector, timeout=BROWSER_WAIT_TIMEOUT):
+    """
+    Wait until an element matching a CSS selector is present on the page.
+    
+    Args:
+        driver: WebDriver instance
+        css_selector (str): CSS selector of the element to wait for
+        timeout (float): Maximum number of seconds to wait
+        
+    Returns:
+        bool: True if the element appeared, False on timeout
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+class BrowserPool:
+    """Thread-safe pool of reusable WebDriver instances"""
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES, factory=create_driver):
+        """
+        Args:
+            size (int): Maximum number of live drivers; callers wait when all
+                are checked out
+            max_uses (int): Pages a driver may serve before it is replaced
+            factory (callable): Function creating a new driver
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.factory = factory
+        self._idle = []  # (driver, uses) pairs ready for checkout
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _checkout(self):
+        with self._cond:
+            while not self._idle and self._live >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._live += 1
+
+        try:
+            return self.factory(), 0
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+
+    def _checkin(self, driver, uses, healthy):
+        with self._cond:
+            if healthy and uses < self.max_uses and not self._closed:
+                self._idle.append((driver, uses))
+                self._cond.notify()
+                return
+            self._live -= 1
+            self._cond.notify()
+        _quit(driver)
+
+    @contextmanager
+    def driver(self):
+        """
+        Check a driver out of the pool for the duration of a with block.
+        
+        A driver whose block raised is quit instead of returned, since its
+        state is unknown.
+        
+        Yields:
+            WebDriver instance
+        """
+        driver, uses = self._checkout()
+        healthy = False
+        try:
+            yield driver
+            healthy = True
+        finally:
+            self._checkin(driver, uses + 1, healthy)
+
+    def close(self):
+        """Quit all idle drivers; drivers still checked out are quit on return."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+        for driver, _ in idle:
+            _quit(driver)
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass  # Browser already gone
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Get the process-wide browser pool, creating it on first use.
+    
+    Returns:
+        BrowserPool: Shared pool, closed automatically at interpreter exit
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,442 @@
+"""
+Local mirror of the Flathub and Snapcraft catalogs.
+
+``AppEnergy sync-catalog`` downloads the category listings of both stores
+into a small SQLite file (name, store ID and categories of every application)
+at CATALOG_PATH. While the mirror is fresh, ``snap.get_categories`` and
+``flathub.get_categories`` answer names found in it without any network I/O
+and only fall back to the store API for names it does not contain. Flathub
+listings only carry each application's main category, so the sync also reads
+the details of every listed application for its full category list (main
+and sub categories), as a lookup would.
+
+Each category listing is a separate feed whose ETag/Last-Modified validators
+are stored with it; later syncs send conditional requests and only re-import
+the listings that changed, reusing the mirrored details of applications
+already known.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from AppEnergy import metrics
+from AppEnergy.cache import normalize_app_name
+from AppEnergy.config import (
+    CATALOG_PATH, CATALOG_MAX_AGE, CATALOG_DETAILS_WORKERS, FLATHUB_API_URL, SNAPCRAFT_API_URL
+)
+
+FLATHUB = "Flathub"
+SNAPCRAFT = "Snapcraft"
+
+# Main categories of the Flathub catalog, each listed by its own endpoint
+FLATHUB_CATEGORIES = (
+    "AudioVideo", "Development", "Education", "Game", "Graphics",
+    "Network", "Office", "Science", "System", "Utility",
+)
+
+
+class CatalogMirror:
+    """SQLite store of mirrored catalog listings"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): Mirror file location (defaults to CATALOG_PATH,
+                ":memory:" keeps the mirror in memory)
+        """
+        self.path = path or CATALOG_PATH
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS feeds ("
+                " source TEXT NOT NULL,"
+                " url TEXT NOT NULL PRIMARY KEY,"
+                " rank INTEGER NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " synced_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " source TEXT NOT NULL,"
+                " feed TEXT NOT NULL,"
+                " rank INTEGER NOT NULL,"
+                " app_key TEXT NOT NULL,"
+                " app_id TEXT,"
+                " name TEXT NOT NULL,"
+                " categories TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_app ON entries (source, app_key)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_feed ON entries (feed)")
+
+    def synced_at(self, source):
+        """
+        Get the time of the last sync of a source.
+
+        Returns:
+            float: time.time() of the most recent feed sync, or None if the
+            source was never synced
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(synced_at) FROM feeds WHERE source = ?", (source,)).fetchone()
+        return row[0]
+
+    def lookup(self, source, app_name, max_age=CATALOG_MAX_AGE):
+        """
+        Look up the categories of an application in the mirror.
+
+        Args:
+            source (str): FLATHUB or SNAPCRAFT
+            app_name (str): Application name (Flathub) or snap name (Snapcraft)
+            max_age (float): Ignore the mirror if its last sync is older than
+                this many seconds (None: never)
+
+        Returns:
+            list: Categories of the application, or None if the mirror is
+            missing, stale or does not contain the application
+        """
+        if not self._fresh(source, max_age):
+            return None
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT categories FROM entries WHERE source = ? AND app_key = ? ORDER BY rank",
+                (source, normalize_app_name(app_name))
+            ).fetchall()
+        if not rows:
+            return None
+
+        categories = []
+        for (row,) in rows:
+            for category in json.loads(row):
+                if category not in categories:
+                    categories.append(category)
+        return categories
+
+    def lookup_id(self, source, app_name, max_age=CATALOG_MAX_AGE):
+        """
+        Look up the store ID of an application in the mirror.
+
+        Args:
+            source (str): FLATHUB or SNAPCRAFT
+            app_name (str): Application name
+            max_age (float): Ignore the mirror if its last sync is older than
+                this many seconds (None: never)
+
+        Returns:
+            str: Store ID (Flatpak application ID, snap ID), or None if the
+            mirror is missing, stale or does not contain the application
+        """
+        if not self._fresh(source, max_age):
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT app_id FROM entries WHERE source = ? AND app_key = ? AND app_id IS NOT NULL ORDER BY rank",
+                (source, normalize_app_name(app_name))
+            ).fetchone()
+        return row[0] if row else None
+
+    def app_categories(self, source):
+        """
+        Get the mirrored categories of every application of a source by store ID.
+
+        Returns:
+            dict: Store ID mapped to its category list
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT app_id, categories FROM entries WHERE source = ? AND app_id IS NOT NULL", (source,)
+            ).fetchall()
+        return {app_id: json.loads(categories) for app_id, categories in rows}
+
+    def _fresh(self, source, max_age):
+        """Check that a source was synced less than max_age seconds ago."""
+        synced_at = self.synced_at(source)
+        return synced_at is not None and (max_age is None or time.time() - synced_at <= max_age)
+
+    def feed_validators(self, url):
+        """
+        Get the cache validators stored with a feed.
+
+        Returns:
+            tuple: (etag, last_modified), either may be None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM feeds WHERE url = ?", (url,)).fetchone()
+        return row if row else (None, None)
+
+    def replace_feed(self, source, url, rank, entries, etag=None, last_modified=None):
+        """
+        Replace the entries of a changed feed.
+
+        Args:
+            source (str): FLATHUB or SNAPCRAFT
+            url (str): Feed URL
+            rank (int): Position of the feed, used to order merged categories
+            entries (list): (name, app_id, categories) tuples
+            etag (str): ETag response header of the feed
+            last_modified (str): Last-Modified response header of the feed
+        """
+        rows = [
+            (source, url, rank, normalize_app_name(name), app_id, name, json.dumps(list(categories)))
+            for name, app_id, categories in entries
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE feed = ?", (url,))
+            self._conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?, ?)",
+                (source, url, rank, etag, last_modified, time.time())
+            )
+
+    def touch_feed(self, url):
+        """Mark an unchanged feed as synced now."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE feeds SET synced_at = ? WHERE url = ?", (time.time(), url))
+
+    def drop_feeds(self, source, keep):
+        """
+        Delete the feeds of a source that are no longer listed, and their entries.
+
+        Args:
+            source (str): FLATHUB or SNAPCRAFT
+            keep (iterable): URLs of the feeds still listed
+
+        Returns:
+            int: Number of deleted feeds
+        """
+        keep = set(keep)
+        with self._lock, self._conn:
+            urls = [url for (url,) in self._conn.execute("SELECT url FROM feeds WHERE source = ?", (source,))]
+            stale = [(url,) for url in urls if url not in keep]
+            self._conn.executemany("DELETE FROM entries WHERE feed = ?", stale)
+            self._conn.executemany("DELETE FROM feeds WHERE url = ?", stale)
+        return len(stale)
+
+    def stats(self):
+        """
+        Get the size of the mirror.
+
+        Returns:
+            dict: Source mapped to its number of applications, feeds and last
+            sync time
+        """
+        with self._lock:
+            feeds = self._conn.execute(
+                "SELECT source, COUNT(*), MAX(synced_at) FROM feeds GROUP BY source"
+            ).fetchall()
+            apps = dict(self._conn.execute(
+                "SELECT source, COUNT(DISTINCT app_key) FROM entries GROUP BY source"
+            ).fetchall())
+        return {
+            source: {"apps": apps.get(source, 0), "feeds": count, "synced_at": synced_at}
+            for source, count, synced_at in feeds
+        }
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def _fetch_feed(session, mirror, url, full, **kwargs):
+    """
+    Fetch a feed with a conditional request.
+
+    Returns:
+        tuple: (decoded JSON, etag, last_modified), or None if the feed is
+        unchanged since the last sync
+    """
+    headers = {}
+    if not full:
+        etag, last_modified = mirror.feed_validators(url)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    response = session.get(url, headers=headers, **kwargs)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    return response.json(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+
+def _sync_feeds(mirror, source, session, feeds, full):
+    """
+    Sync a list of (url, parse) feeds of a source.
+
+    Returns:
+        dict: Number of feeds, changed feeds and mirrored applications
+    """
+    changed = 0
+    for rank, (url, parse) in enumerate(feeds):
+        result = _fetch_feed(session, mirror, url, full)
+        if result is None:
+            mirror.touch_feed(url)
+            continue
+        data, etag, last_modified = result
+        mirror.replace_feed(source, url, rank, parse(data), etag, last_modified)
+        changed += 1
+
+    mirror.drop_feeds(source, [url for url, _ in feeds])
+    return {"feeds": len(feeds), "changed": changed, "apps": mirror.stats().get(source, {}).get("apps", 0)}
+
+
+def sync_flathub(mirror, full=False):
+    """
+    Mirror the Flathub catalog, one feed per main category.
+
+    The listings only give each application's main category; the full
+    category list of every application comes from its details (the request
+    flathub.get_categories would make), fetched once per sync and only for
+    applications not mirrored yet unless full is set. Applications whose
+    details are gone (404/410) are left out.
+
+    Args:
+        mirror (CatalogMirror): Mirror to update
+        full (bool): Re-download every feed and every application's details
+            instead of only changed feeds and new applications
+
+    Returns:
+        dict: Number of feeds, changed feeds and mirrored applications
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from . import flathub
+    from .pages import NOT_FOUND_STATUSES
+    from .session import get_session
+
+    session = get_session("general")
+    known = {} if full else mirror.app_categories(FLATHUB)
+
+    def fetch_categories(app_id):
+        response = session.get(flathub._details_url(app_id))
+        if response.status_code in NOT_FOUND_STATUSES:
+            return None
+        response.raise_for_status()
+        return flathub._parse_categories(response.json())
+
+    def parse(data):
+        apps = [(app["name"], app["flatpakAppId"]) for app in data if app.get("name") and app.get("flatpakAppId")]
+        new_ids = list(dict.fromkeys(app_id for _, app_id in apps if app_id not in known))
+        if new_ids:
+            with ThreadPoolExecutor(max_workers=CATALOG_DETAILS_WORKERS) as executor:
+                known.update(zip(new_ids, executor.map(fetch_categories, new_ids)))
+        return [(name, app_id, known[app_id]) for name, app_id in apps if known[app_id] is not None]
+
+    feeds = [(f"{FLATHUB_API_URL}/compat/apps/category/{category}", parse) for category in FLATHUB_CATEGORIES]
+    return _sync_feeds(mirror, FLATHUB, session, feeds, full)
+
+
+def sync_snapcraft(mirror, full=False):
+    """
+    Mirror the Snapcraft catalog, one feed per store category.
+
+    Args:
+        mirror (CatalogMirror): Mirror to update
+        full (bool): Re-download every feed instead of only changed ones
+
+    Returns:
+        dict: Number of feeds, changed feeds and mirrored applications
+    """
+    from .session import get_session
+
+    session = get_session("snap")
+    response = session.get(f"{SNAPCRAFT_API_URL}/snaps/categories")
+    response.raise_for_status()
+    categories = [category["name"] for category in response.json().get("categories", [])]
+
+    def parser(category):
+        def parse(data):
+            entries = []
+            for result in data.get("results", []):
+                snap_categories = [cat["name"] for cat in result.get("snap", {}).get("categories", [])]
+                if result.get("name"):
+                    entries.append((result["name"], result.get("snap-id"), snap_categories or [category]))
+            return entries
+        return parse
+
+    feeds = [
+        (f"{SNAPCRAFT_API_URL}/snaps/find?category={category}&fields=title,categories", parser(category))
+        for category in categories
+    ]
+    return _sync_feeds(mirror, SNAPCRAFT, session, feeds, full)
+
+
+SYNCERS = {
+    FLATHUB: sync_flathub,
+    SNAPCRAFT: sync_snapcraft,
+}
+
+
+_mirror = None
+_lock = threading.Lock()
+
+
+def get_mirror():
+    """
+    Get the shared mirror of CATALOG_PATH.
+
+    Returns:
+        CatalogMirror: Open mirror, or None if no catalog was synced yet
+    """
+    global _mirror
+    if _mirror is None and os.path.exists(CATALOG_PATH):
+        with _lock:
+            if _mirror is None:
+                _mirror = CatalogMirror(CATALOG_PATH)
+    return _mirror
+
+
+def lookup(source, app_name):
+    """
+    Look up an application in the shared mirror.
+
+    Args:
+        source (str): FLATHUB or SNAPCRAFT
+        app_name (str): Application name (Flathub) or snap name (Snapcraft)
+
+    Returns:
+        list: Mirrored categories, or None if the lookup must go to the store
+    """
+    mirror = get_mirror()
+    if mirror is None:
+        return None
+    try:
+        categories = mirror.lookup(source, app_name)
+    except sqlite3.Error:
+        return None
+    if categories is not None:
+        metrics.record_cache_hit()
+    return categories
+
+
+def lookup_id(source, app_name):
+    """
+    Look up the store ID of an application in the shared mirror.
+
+    Args:
+        source (str): FLATHUB or SNAPCRAFT
+        app_name (str): Application name
+
+    Returns:
+        str: Mirrored store ID, or None if the store must be searched
+    """
+    mirror = get_mirror()
+    if mirror is None:
+        return None
+    try:
+        app_id = mirror.lookup_id(source, app_name)
+    except sqlite3.Error:
+        return None
+    if app_id is not None:
+        metrics.record_cache_hit()
+    return app_id
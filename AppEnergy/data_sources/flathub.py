@@ -1,97 +1,226 @@
 """
-Flathub API integration for fetching application categories.
+Flathub API integration for fetching application categories and descriptions.
 """
-import requests
-from bs4 import BeautifulSoup
-from AppEnergy.config import GENERAL_HEADERS
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import time
-import sys
+from AppEnergy.config import GENERAL_HEADERS, FLATHUB_API_URL
+from . import aio, catalog_mirror, resolution
+from .pages import failed_lookup, memoize_page
+
+SOURCE_NAME = "Flathub"
+HOST = "flathub.org"  # Health key of the hosts queried by get_categories (see health.py)
+
+
+def _search_url(app_name):
+    """Build the Flathub search API URL for an application name."""
+    return f"{FLATHUB_API_URL}/compat/apps/search/{app_name}?locale=en"
+
+
+def _details_url(app_id):
+    """Build the Flathub details API URL for a Flatpak application ID."""
+    return f"{FLATHUB_API_URL}/compat/apps/{app_id}"
+
+
+def _match_app_id(search_data, app_name):
+    """
+    Pick the Flatpak ID of the best search hit (exact name match, else first hit).
+    
+    Returns:
+        str: Flatpak application ID, or None if there is no usable hit
+    """
+    if not search_data:
+        return None
+
+    target_name = app_name.lower()
+    matched_app = next(
+        (app for app in search_data if app.get('name', '').lower() == target_name),
+        search_data[0]
+    )
+    return matched_app.get('flatpakAppId')
+
+
+def _parse_categories(details_data):
+    """Extract category names from a Flathub details API response."""
+    return [cat['name'] for cat in details_data.get('categories', [])]
+
+
+def _parse_description(details_data):
+    """Convert the HTML description of a Flathub details API response to text."""
+    from bs4 import BeautifulSoup
+
+    description_html = details_data.get('description')
+    if not description_html:
+        return None
+    return BeautifulSoup(description_html, 'html.parser').get_text(separator='\n', strip=True) or None
+
+
+def _parse_details(app_id, app_name, details_data):
+    """Build the page of an application from its Flathub details API response."""
+    name = details_data.get('name') or ''
+    return {
+        "app_id": app_id,
+        "name": name,
+        "exact_match": name.strip().lower() == app_name.strip().lower(),
+        "categories": _parse_categories(details_data),
+        "description": _parse_description(details_data),
+    }
+
+
+@memoize_page
+def fetch_app_page(app_name):
+    """
+    Resolve an application on Flathub and fetch its details once.
+    
+    Applications found in the local catalog mirror skip the search request.
+    
+    Args:
+        app_name (str): Name of the application
+        
+    Returns:
+        dict: Page with app_id, name, exact_match (whether the hit's name
+        equals app_name), categories and description, or None if the search
+        has no usable hit
+        
+    Raises:
+        requests.exceptions.RequestException: If a request fails
+        ValueError: If a response is not valid JSON
+    """
+    from .session import get_session
+
+    def search(app_name):
+        app_id = catalog_mirror.lookup_id(catalog_mirror.FLATHUB, app_name)
+        if app_id:
+            return app_id
+        response = get_session("general").get(_search_url(app_name))
+        response.raise_for_status()
+        search_data = response.json()
+        return _match_app_id(search_data, app_name)
+
+    def fetch(app_id):
+        response = get_session("general").get(_details_url(app_id))
+        response.raise_for_status()
+        return _parse_details(app_id, app_name, response.json())
+
+    return resolution.resolve(SOURCE_NAME, app_name, search, fetch)
 
 
 def get_categories(app_name):
     """
     Get categories for an application from Flathub.
     
+    Applications found in the local catalog mirror are answered from it
+    without any request.
+    
     Args:
         app_name (str): Name of the application
         
     Returns:
         list: List of categories for the application
+        (empty if not found), or None if the lookup failed
     """
+    mirrored = catalog_mirror.lookup(catalog_mirror.FLATHUB, app_name)
+    if mirrored is not None:
+        return mirrored
+
     try:
-        search_url = f"https://flathub.org/api/v2/compat/apps/search/{app_name}?locale=en"
-        search_data = requests.get(search_url, headers=GENERAL_HEADERS).json()
+        page = fetch_app_page(app_name)
+        return page["categories"] if page else []
         
-        if not search_data:
-            return []
-
-        target_name = app_name.lower()
-        matched_app = next(
-            (app for app in search_data if app.get('name', '').lower() == target_name),
-            search_data[0]
-        )
-
-        app_id = matched_app.get('flatpakAppId')
-        if not app_id:      
-            return []
-
-        details_url = f"https://flathub.org/api/v2/compat/apps/{app_id}"
-        details_data = requests.get(details_url, headers=GENERAL_HEADERS).json()
-        return [cat['name'] for cat in details_data.get('categories', [])]
-        
-    except Exception:
-        return []
+    except Exception as e:
+        return failed_lookup(e)
+
+
+async def async_get_categories(app_name, session):
+    """
+    Asyncio variant of get_categories.
     
+    Args:
+        app_name (str): Name of the application
+        session: aiohttp-compatible client session
+        
+    Returns:
+        list: List of categories for the application
+        (empty if not found), or None if the lookup failed
+    """
+    mirrored = catalog_mirror.lookup(catalog_mirror.FLATHUB, app_name)
+    if mirrored is not None:
+        return mirrored
 
-def get_description(app_name):
-    # Set up headless Chrome
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--disable-gpu')
-    options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    driver = webdriver.Chrome(options=options)
-
-
-    # Step 1: Search for the application
-    search_url = f"https://flathub.org/apps/search?q={app_name}"
-    driver.get(search_url)
-    time.sleep(2)  # Wait for JS to render
-
-    # Find the app link by aria-label (case-insensitive)
-    app_link = None
-    a_tags = driver.find_elements(By.CSS_SELECTOR, 'a[aria-label]')
-    for a in a_tags:
-        if a.get_attribute('aria-label').strip().lower() == app_name.strip().lower():
-            app_link = a.get_attribute('href')
-            break
-
-    if not app_link:
-        driver.quit()
-        return None
+    async def search(app_name):
+        app_id = catalog_mirror.lookup_id(catalog_mirror.FLATHUB, app_name)
+        if app_id:
+            return app_id
+        search_data = await aio.fetch_json(session, _search_url(app_name), headers=GENERAL_HEADERS)
+        return _match_app_id(search_data, app_name)
+
+    async def fetch(app_id):
+        details_data = await aio.fetch_json(session, _details_url(app_id), headers=GENERAL_HEADERS)
+        return _parse_details(app_id, app_name, details_data)
 
-    # Step 2: Go to the app page
-    driver.get(app_link)
-    time.sleep(2)  # Wait for JS to render
+    try:
+        page = await resolution.async_resolve(SOURCE_NAME, app_name, search, fetch)
+        fetch_app_page.prime(app_name, page)
+        return page["categories"] if page else []
+
+    except Exception as e:
+        return failed_lookup(e)
+    
 
-    # Step 3: Click "See more" if present
+def get_description(app_name):
+    """
+    Get the full description of an application from its Flathub page.
+    
+    Args:
+        app_name (str): Name of the application
+        
+    Returns:
+        str: Description text, or None if not found
+    """
     try:
-        see_more_btn = WebDriverWait(driver, 3).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'See more')]"))
-        )
-        driver.execute_script("arguments[0].click();", see_more_btn)
-        time.sleep(1)  # Wait for content to expand
+        page = fetch_app_page(app_name)
     except Exception:
-        pass  # "See more" button not present
+        page = None
+
+    # The details API has the same text as the page; the website search only
+    # accepts an exact name match, so fuzzy API hits still go to the browser
+    if page and page["exact_match"] and page["description"]:
+        return page["description"]
+
+    from bs4 import BeautifulSoup
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from .browser import get_pool, wait_for
+
+    with get_pool().driver() as driver:
+        # Step 1: Search for the application
+        search_url = f"https://flathub.org/apps/search?q={app_name}"
+        driver.get(search_url)
+        wait_for(driver, 'a[aria-label]')  # Wait for JS to render
+
+        # Find the app link by aria-label (case-insensitive)
+        app_link = None
+        a_tags = driver.find_elements(By.CSS_SELECTOR, 'a[aria-label]')
+        for a in a_tags:
+            if a.get_attribute('aria-label').strip().lower() == app_name.strip().lower():
+                app_link = a.get_attribute('href')
+                break
+
+        if not app_link:
+            return None
+
+        # Step 2: Go to the app page
+        driver.get(app_link)
+        wait_for(driver, "div[class*='prose']")  # Wait for JS to render
 
-    # Step 4: Get the full description
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    prose_div = soup.find('div', class_=lambda x: x and 'prose' in x)
-    description = prose_div.get_text(separator='\n', strip=True) if prose_div else None
+        # Step 3: Click "See more" if present
+        see_more = (By.XPATH, "//button[contains(., 'See more')]")
+        try:
+            see_more_btn = WebDriverWait(driver, 3).until(EC.element_to_be_clickable(see_more))
+            driver.execute_script("arguments[0].click();", see_more_btn)
+            WebDriverWait(driver, 3).until(EC.invisibility_of_element_located(see_more))  # Wait for content to expand
+        except Exception:
+            pass  # "See more" button not present
 
-    driver.quit()
-    return description
\ No newline at end of file
+        # Step 4: Get the full description
+        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        prose_div = soup.find('div', class_=lambda x: x and 'prose' in x)
+        return prose_div.get_text(separator='\n', strip=True) if prose_div else None
@@ -1,33 +1,44 @@
 """
-GOG.com integration for fetching game tags.
+GOG.com integration for fetching game tags and descriptions.
 """
 import re
-import time
-import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
-def get_categories(app_name):
+from . import aio
+from .pages import failed_lookup, memoize_page
+
+HOST = "gog.com"  # Health key of the hosts queried by get_categories (see health.py)
+
+
+def _game_url(app_name):
+    """Build the GOG.com game page URL for a game name."""
+    formatted_name = re.sub(r"[^a-zA-Z0-9\s]", "", app_name).lower().replace(" ", "_").replace("__", "_")
+    return f"https://www.gog.com/game/{formatted_name}"
+
+
+def _description_text(desc_div):
+    """Get the text of a GOG.com description element, without its images."""
+    # Remove all images
+    for img in desc_div.find_all("img"):
+        img.decompose()
+
+    # Get all text, including from nested tags, as a single string
+    return desc_div.get_text(separator=' ', strip=True)
+
+
+def _parse_game_page(game_url, content):
     """
-    Get categories (tags) for a game from GOG.com.
+    Parse every field used from a GOG.com game page in a single pass.
     
     Args:
-        app_name (str): Name of the game
+        game_url (str): URL of the game page
+        content: Body of the game page
         
     Returns:
-        list: List of tags/categories for the game, or None if not found
+        dict: Page with url, categories (the unique tags, in page order) and
+        description (None if the description is only rendered by JavaScript)
     """
-    # Format the game name for GOG URL
-    formatted_name = re.sub(r"[^a-zA-Z0-9\s]", "", app_name).lower().replace(" ", "_").replace("__", "_")
-    game_url = f"https://www.gog.com/game/{formatted_name}"
-
-    try:
-        response = requests.get(game_url)
-        response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return []
+    from bs4 import BeautifulSoup
 
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = BeautifulSoup(content, "html.parser")
     tags = []  # List to store tags in order
     seen_tags = set()  # Set to track unique tags
 
@@ -41,44 +52,110 @@ def get_categories(app_name):
                 tags.append(tag)
                 seen_tags.add(tag)    
 
-    return tags
+    desc_div = soup.find("div", class_="description")
+    description = _description_text(desc_div) if desc_div else None
+
+    return {
+        "url": game_url,
+        "categories": tags,
+        "description": description or None,
+    }
+
+
+@memoize_page
+def fetch_app_page(app_name):
+    """
+    Fetch and parse the GOG.com page of a game once.
+    
+    Args:
+        app_name (str): Name of the game
+        
+    Returns:
+        dict: Parsed page (see _parse_game_page)
+        
+    Raises:
+        requests.exceptions.RequestException: If the request fails
+    """
+    from .session import get_session
+
+    game_url = _game_url(app_name)
+    response = get_session("plain").get(game_url)
+    response.raise_for_status()
+    return _parse_game_page(game_url, response.content)
+
+
+def get_categories(app_name):
+    """
+    Get categories (tags) for a game from GOG.com.
+    
+    Args:
+        app_name (str): Name of the game
+        
+    Returns:
+        list: List of tags/categories for the game
+        (empty if not found), or None if the lookup failed
+    """
+    try:
+        page = fetch_app_page(app_name)
+    except Exception as e:
+        return failed_lookup(e)
+
+    return page["categories"]
+
+
+async def async_get_categories(app_name, session):
+    """
+    Asyncio variant of get_categories.
+    
+    Args:
+        app_name (str): Name of the game
+        session: aiohttp-compatible client session
+        
+    Returns:
+        list: List of tags/categories for the game
+        (empty if not found), or None if the lookup failed
+    """
+    try:
+        game_url = _game_url(app_name)
+        page = _parse_game_page(game_url, await aio.fetch_bytes(session, game_url))
+        fetch_app_page.prime(app_name, page)
+        return page["categories"]
+    except Exception as e:
+        return failed_lookup(e)
 
 
 def get_description(app_name):
     """
     Get the description for a game from GOG.com.
+    
+    The description is read from the page shared with get_categories; the
+    headless browser is only used when the page does not contain it.
+    
     Args:
         app_name (str): Name of the game
     Returns:
         str: Description text, or None if not found
     """
-    # Format the game name for GOG URL
-    formatted_name = re.sub(r"[^a-zA-Z0-9\s]", "", app_name).lower().replace(" ", "_").replace("__", "_")
-    game_url = f"https://www.gog.com/game/{formatted_name}"
+    from bs4 import BeautifulSoup
+    from .browser import get_pool, wait_for
 
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--disable-gpu')
-    driver = webdriver.Chrome(options=options)
+    game_url = _game_url(app_name)
 
     try:
-        driver.get(game_url)
-        time.sleep(2)  # Wait for JS to render
+        page = fetch_app_page(app_name)
+        if page["description"]:
+            return page["description"]
+
+        with get_pool().driver() as driver:
+            driver.get(game_url)
+            wait_for(driver, 'div.description')  # Wait for JS to render
+            page_source = driver.page_source
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = BeautifulSoup(page_source, "html.parser")
         desc_div = soup.find("div", class_="description")
         if not desc_div:
-            driver.quit()
             return None
 
-        # Remove all images
-        for img in desc_div.find_all("img"):
-            img.decompose()
-
-        # Get all text, including from nested tags, as a single string
-        description = desc_div.get_text(separator=' ', strip=True)
-        driver.quit()
-        return description
+        return _description_text(desc_div)
     except Exception:
-        driver.quit()
-        return None
\ No newline at end of file
+        return None
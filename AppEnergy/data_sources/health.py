@@ -0,0 +1,256 @@
+"""
+Per-host health tracking for the data sources.
+
+Every request made through the shared sessions (session.py) and the asyncio
+helpers (aio.py) is recorded against its host:
+
+* a circuit breaker opens after CIRCUIT_FAILURE_THRESHOLD consecutive
+  failures (connection errors, timeouts, 429 and 5xx responses); while it is
+  open, requests to the host fail immediately with CircuitOpenError and the
+  calculator skips the sources on that host. After CIRCUIT_COOLDOWN seconds
+  the circuit is half-open: one trial request is let through, and its
+  outcome closes the circuit or opens it again.
+* an adaptive (AIMD) limit bounds the number of concurrent requests per
+  host: it grows by one per window of successful requests and halves on
+  errors, 429s and requests slower than HOST_SLOW_REQUEST seconds.
+
+Hosts are keyed by their last two labels, so ``apps.apple.com`` and
+``www.apple.com`` (or game pages on ``*.itch.io``) share one state.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+from AppEnergy.config import (
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN, HOST_MIN_CONCURRENCY, HOST_MAX_CONCURRENCY,
+    HOST_SLOW_REQUEST
+)
+
+# HTTP statuses counted as host failures
+FAILURE_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(ConnectionError):
+    """A request was refused because the circuit of its host is open."""
+
+
+def host_key(url_or_host):
+    """
+    Get the health key of a URL or host name.
+
+    Args:
+        url_or_host (str): URL or bare host name
+
+    Returns:
+        str: Last two labels of the host name (e.g. "itch.io"), or the whole
+        host for IP addresses
+    """
+    host = (urlsplit(url_or_host).hostname if "//" in url_or_host else url_or_host) or ""
+    if ":" in host or host.replace(".", "").isdigit():
+        return host
+    return ".".join(host.lower().split(".")[-2:])
+
+
+class HostHealth:
+    """Circuit breaker and adaptive concurrency limit of one host"""
+
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN,
+                 min_concurrency=HOST_MIN_CONCURRENCY, max_concurrency=HOST_MAX_CONCURRENCY,
+                 slow_request=HOST_SLOW_REQUEST):
+        """
+        Args:
+            host (str): Host key
+            failure_threshold (int): Consecutive failures that open the circuit
+            cooldown (float): Seconds the circuit stays open
+            min_concurrency (int): Lowest concurrency limit
+            max_concurrency (int): Highest concurrency limit
+            slow_request (float): Latency in seconds treated as congestion
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.slow_request = slow_request
+
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.trial_in_flight = False
+        self.latency = None  # Exponentially weighted moving average, in seconds
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def _state(self, now):
+        if self.opened_until == 0.0:
+            return CLOSED
+        return OPEN if now < self.opened_until else HALF_OPEN
+
+    @property
+    def state(self):
+        """Current circuit state: "closed", "open" or "half-open"."""
+        with self._condition:
+            return self._state(time.monotonic())
+
+    def available(self):
+        """Check whether a request to the host may be attempted now."""
+        with self._condition:
+            state = self._state(time.monotonic())
+            return state == CLOSED or (state == HALF_OPEN and not self.trial_in_flight)
+
+    def acquire(self, timeout=None, enforce_limit=True):
+        """
+        Reserve a request slot, waiting while the concurrency limit is reached.
+
+        Args:
+            timeout (float): Longest wait for a slot, in seconds (None waits
+                as long as needed)
+            enforce_limit (bool): Wait for the concurrency limit (False only
+                checks the circuit, for callers that cannot block)
+
+        Returns:
+            bool: True if the request is the trial request of a half-open
+            circuit (pass it on to release)
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or its half-open trial
+                request is already in flight)
+            TimeoutError: If no slot freed up within timeout
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                state = self._state(time.monotonic())
+                if state == OPEN or (state == HALF_OPEN and self.trial_in_flight):
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit open for {self.host}")
+                if state == HALF_OPEN:
+                    self.trial_in_flight = True
+                    self.in_flight += 1
+                    return True
+                if not enforce_limit or self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return False
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No request slot for {self.host} within {timeout} seconds")
+                self._condition.wait(remaining)
+
+    def release(self, latency, failed, trial=False):
+        """
+        Return a request slot and record the request's outcome.
+
+        Args:
+            latency (float): Duration of the request in seconds
+            failed (bool): Whether the request failed (error, 429 or 5xx)
+            trial (bool): Value returned by acquire
+        """
+        with self._condition:
+            now = time.monotonic()
+            self.in_flight = max(0, self.in_flight - 1)
+            if trial:
+                self.trial_in_flight = False
+            self.requests += 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+            if failed:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                if trial or self.consecutive_failures >= self.failure_threshold:
+                    self.opened_until = now + self.cooldown
+            else:
+                self.consecutive_failures = 0
+                if trial:
+                    self.opened_until = 0.0
+                if latency > self.slow_request:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def cancel(self, trial=False):
+        """
+        Return a request slot without recording an outcome.
+
+        Args:
+            trial (bool): Value returned by acquire
+        """
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if trial:
+                self.trial_in_flight = False
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Get the health counters of the host.
+
+        Returns:
+            dict: Circuit state, concurrency limit, in-flight requests,
+            latency average and request/failure/rejection counts
+        """
+        with self._condition:
+            return {
+                "state": self._state(time.monotonic()),
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency": self.latency,
+                "requests": self.requests,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+
+
+_hosts = {}
+_lock = threading.Lock()
+
+
+def get_host(url_or_host):
+    """
+    Get the health state of a host, creating it on first use.
+
+    Args:
+        url_or_host (str): URL or host name
+
+    Returns:
+        HostHealth: Health state shared by every request to the host
+    """
+    key = host_key(url_or_host)
+    health = _hosts.get(key)
+    if health is None:
+        with _lock:
+            health = _hosts.get(key)
+            if health is None:
+                health = _hosts[key] = HostHealth(key)
+    return health
+
+
+def available(url_or_host):
+    """Check whether requests to a host may be attempted now (its circuit is not open)."""
+    return get_host(url_or_host).available()
+
+
+def snapshot():
+    """
+    Get the health counters of every host seen so far.
+
+    Returns:
+        dict: Host key mapped to HostHealth.stats()
+    """
+    with _lock:
+        hosts = dict(_hosts)
+    return {key: health.stats() for key, health in sorted(hosts.items())}
+
+
+def reset():
+    """Forget the health state of every host."""
+    with _lock:
+        _hosts.clear()
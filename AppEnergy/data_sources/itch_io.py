@@ -1,8 +1,123 @@
 """
-Itch.io integration for fetching game categories.
+Itch.io integration for fetching game categories and descriptions.
 """
-import requests
-from bs4 import BeautifulSoup
+from . import aio, resolution
+from .pages import failed_lookup, memoize_page
+
+SOURCE_NAME = "Itch.io"
+HOST = "itch.io"  # Health key of the hosts queried by get_categories (see health.py)
+
+
+def _search_url(app_name):
+    """Build the Itch.io game search URL for a game name."""
+    formatted_app_name = app_name.replace(":","%3A").replace(" ","%20").replace("/","%2F").replace("(","%28").replace(")","%29")
+    return f"https://itch.io/search?classification=game&q={formatted_app_name}&type=games"
+
+
+def _find_game_link(search_text, app_name):
+    """
+    Find the link of the search result whose title matches the game name.
+    
+    Returns:
+        str: Game page URL, or None if no result matches
+        
+    Raises:
+        ValueError: If the page has no search results grid (not a search
+        page), so it is not taken for "no match"
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(search_text, 'html.parser')
+    results = soup.find('div', class_='game_grid_widget')
+    if results is None:
+        raise ValueError("Itch.io search page has no results grid")
+    for game_element in results.find_all('a', class_='title game_link'):
+        if game_element.text.strip().lower() == app_name.lower():
+            return game_element['href']
+    return None
+
+
+def _parse_game_page(game_link, content):
+    """
+    Parse every field used from an Itch.io game page in a single pass.
+    
+    Args:
+        game_link (str): URL of the game page
+        content: Body of the game page
+        
+    Returns:
+        dict: Page with url, categories (the tags, or the genre if there are
+        no tags) and description (text of the description, or an empty list
+        if there is none)
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+
+    tags = []
+    genre = []
+    
+    # Parse table rows
+    for tr in soup.find_all("tr"):
+        cells = tr.find_all("td")
+        if len(cells) >= 2:
+            key = cells[0].get_text(strip=True).lower()
+            value = cells[1]
+                
+            if key == "tags":
+                tags = [a.get_text(strip=True) for a in value.find_all("a")]
+            elif key == "genre":
+                genre = [a.get_text(strip=True) for a in value.find_all("a")]
+
+    # Find the div containing the game description
+    description = []
+    description_div = soup.find('div', class_='formatted_description user_formatted')
+    if description_div:
+        # Extract text from all child elements, ignoring images and links
+        for element in description_div.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'span', 'li']):
+            if element.name in ['img', 'a']:
+                continue
+            text = element.get_text(strip=True)
+            if text:
+                description.append(text)
+
+    return {
+        "url": game_link,
+        "categories": tags or genre,  # Tags if available, otherwise genre
+        "description": "\n".join(description) if description else [],
+    }
+
+
+@memoize_page
+def fetch_app_page(app_name):
+    """
+    Resolve a game to its Itch.io page, fetching and parsing it once.
+    
+    Args:
+        app_name (str): Name of the game
+        
+    Returns:
+        dict: Parsed page (see _parse_game_page), or None if no search
+        result matches
+        
+    Raises:
+        requests.exceptions.RequestException: If a request fails
+    """
+    from .session import get_session
+
+    def search(app_name):
+        # Fetch the search page
+        response = get_session("plain").get(_search_url(app_name))
+        response.raise_for_status()
+        return _find_game_link(response.text, app_name)
+
+    def fetch(game_link):
+        response = get_session("plain").get(game_link)
+        response.raise_for_status()
+        return _parse_game_page(game_link, response.content)
+
+    return resolution.resolve(SOURCE_NAME, app_name, search, fetch)
+
 
 def get_categories(app_name):
     """
@@ -13,88 +128,59 @@ def get_categories(app_name):
         
     Returns:
         list: List of categories for the game
+        (empty if not found), or None if the lookup failed
     """
     try:
-        # Step 1: Construct the search URL with proper character handling
-        formatted_app_name = app_name.replace(":","%3A").replace(" ","%20").replace("/","%2F").replace("(","%28").replace(")","%29")
-        search_url = f"https://itch.io/search?classification=game&q={formatted_app_name}&type=games"
-        
-        # Fetch the search page
-        response = requests.get(search_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        game_link = None
-        
-        for game_element in soup.find_all('a', class_='title game_link'):
-            if game_element.text.strip().lower() == app_name.lower():
-                game_link = game_element['href']
-                break  # Exit the loop once a match is found
-                
-        if not game_link:
-            return []
-            
-        response = requests.get(game_link)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        page = fetch_app_page(app_name)
+    except Exception as e:
+        return failed_lookup(e)
+
+    return page["categories"] if page else []
 
-        tags = []
-        genre = []
+
+async def async_get_categories(app_name, session):
+    """
+    Asyncio variant of get_categories.
+    
+    Args:
+        app_name (str): Name of the game
+        session: aiohttp-compatible client session
         
-        # Parse table rows
-        for tr in soup.find_all("tr"):
-            cells = tr.find_all("td")
-            if len(cells) >= 2:
-                key = cells[0].get_text(strip=True).lower()
-                value = cells[1]
-                    
-                if key == "tags":
-                    tags = [a.get_text(strip=True) for a in value.find_all("a")]
-                elif key == "genre":
-                    genre = [a.get_text(strip=True) for a in value.find_all("a")]
-
-        return tags or genre  # Return tags if available, otherwise genre
-
-    except requests.exceptions.RequestException:
-        return []
+    Returns:
+        list: List of categories for the game
+        (empty if not found), or None if the lookup failed
+    """
+    async def search(app_name):
+        search_text = await aio.fetch_text(session, _search_url(app_name))
+        return _find_game_link(search_text, app_name)
+
+    async def fetch(game_link):
+        return _parse_game_page(game_link, await aio.fetch_bytes(session, game_link))
+
+    try:
+        page = await resolution.async_resolve(SOURCE_NAME, app_name, search, fetch)
+        fetch_app_page.prime(app_name, page)
+        return page["categories"] if page else []
+
+    except Exception as e:
+        return failed_lookup(e)
     
 
 def get_description(app_name):
-    try:
-        # Step 1: Construct the search URL with proper character handling
-        formatted_app_name = app_name.replace(":", "%3A").replace(" ", "%20").replace("/", "%2F").replace("(", "%28").replace(")", "%29")
-        search_url = f"https://itch.io/search?classification=game&q={formatted_app_name}&type=games"
-        
-        # Fetch the search page
-        response = requests.get(search_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        game_link = None
-        
-        for game_element in soup.find_all('a', class_='title game_link'):
-            if game_element.text.strip().lower() == app_name.lower():
-                game_link = game_element['href']
-                break  # Exit the loop once a match is found
-                
-        if not game_link:
-            return []
-        
-        response = requests.get(game_link)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Find the div containing the game description
-        description_div = soup.find('div', class_='formatted_description user_formatted')
+    """
+    Get the description for a game from Itch.io.
+    
+    Args:
+        app_name (str): Name of the game
         
-        if description_div:
-            # Extract text from all child elements, ignoring images and links
-            description = []
-            for element in description_div.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'span', 'li']):
-                if element.name in ['img', 'a']:
-                    continue
-                text = element.get_text(strip=True)
-                if text:
-                    description.append(text)
-            return "\n".join(description) if description else []
-        else:
-            return []
+    Returns:
+        str: Description text, or an empty list if not found
+    """
+    import requests
+
+    try:
+        page = fetch_app_page(app_name)
+        return page["description"] if page else []
             
     except requests.RequestException as e:
         print(f"Request error: {e}")
@@ -102,4 +188,3 @@ def get_description(app_name):
     except Exception as e:
         print(f"An error occurred: {e}")
         return []
-    
\ No newline at end of file
@@ -2,8 +2,71 @@
 MyAbandonware integration for fetching game categories.
 """
 import re
-import requests
-from bs4 import BeautifulSoup
+from . import aio, resolution
+from .pages import failed_lookup
+
+SOURCE_NAME = "My Abandonware"
+HOST = "myabandonware.com"  # Health key of the hosts queried by get_categories (see health.py)
+
+
+def _search_url(app_name):
+    """Build the MyAbandonware search URL for a game name."""
+    formatted_app_name = app_name.replace(":", "%3A").replace(" ", "+")
+    return f"https://www.myabandonware.com/search/q/{formatted_app_name}"
+
+
+def _game_url(game_path):
+    """Build the full MyAbandonware URL of a game page path."""
+    return f"https://www.myabandonware.com{game_path}"
+
+
+def _find_game_path(search_text, app_name):
+    """
+    Find the page path of the search result whose name matches the game name.
+    
+    Returns:
+        str: Game page path, or None if no result matches
+        
+    Raises:
+        ValueError: If the page has no results list (not a search page), so
+        it is not taken for "no match"
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(search_text, 'html.parser')
+    
+    # Find the div with class "items games"
+    items_games_div = soup.find('div', class_='items games')
+    if not items_games_div:
+        raise ValueError("MyAbandonware search page has no results list")
+    
+    # Match the app_name with elements with class 'name c-item-game__name'
+    app_name = re.sub(r"^'|'$", "", app_name)
+    for game_element in items_games_div.find_all('a', class_='name c-item-game__name'):
+        if game_element.text.strip().lower() == app_name.lower():
+            return game_element['href']
+    return None
+
+
+def _parse_genre(game_text):
+    """
+    Extract the genre from a MyAbandonware game page.
+    
+    Returns:
+        list: List containing the genre if found, otherwise empty list
+    """
+    from bs4 import BeautifulSoup
+
+    game_soup = BeautifulSoup(game_text, 'html.parser')
+    
+    for row in game_soup.find_all('tr'):
+        th = row.find('th', scope="row")
+        if th and th.text.strip() == "Genre":
+            genre_link = row.find('td').find('a')
+            if genre_link:
+                return [genre_link.text.strip()]
+    return []
+
 
 def get_categories(app_name):
     """
@@ -13,47 +76,49 @@ def get_categories(app_name):
         app_name (str): Name of the game
         
     Returns:
-        list: List containing the genre if found, otherwise empty list
+        list: List containing the genre if found, otherwise empty list;
+        None if the lookup failed
     """
+    from .session import get_session
+
+    # Step 1: Fetch the search page and find the game page (skipped when already resolved)
+    def search(app_name):
+        response = get_session("plain").get(_search_url(app_name))
+        response.raise_for_status()
+        return _find_game_path(response.text, app_name)
+
+    # Step 2: Fetch the game page and read its genre
+    def fetch(game_path):
+        game_response = get_session("plain").get(_game_url(game_path))
+        game_response.raise_for_status()
+        return _parse_genre(game_response.text)
+
     try:
-        # Step 1: Construct the search URL with proper character handling
-        formatted_app_name = app_name.replace(":", "%3A").replace(" ", "+")
-        
-        search_url = f"https://www.myabandonware.com/search/q/{formatted_app_name}"
-        # Fetch the search page
-        response = requests.get(search_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Step 2: Find the div with class "items games"
-        items_games_div = soup.find('div', class_='items games')
-        if not items_games_div:
-            return []
-        
-        # Step 3: Match the app_name with elements with class 'name c-item-game__name'
-        app_name = re.sub(r"^'|'$", "", app_name)
-        game_link = None
-        for game_element in items_games_div.find_all('a', class_='name c-item-game__name'):
-            if game_element.text.strip().lower() == app_name.lower():
-                game_link = game_element['href']
-                break  # Exit the loop once a match is found
-
-        if not game_link:
-            return []
-        
-        # Step 4: Get the href and construct full URL
-        game_url = f"https://www.myabandonware.com{game_link}"
-        
-        # Fetch the game page
-        game_response = requests.get(game_url)
-        game_soup = BeautifulSoup(game_response.text, 'html.parser')
+        return resolution.resolve(SOURCE_NAME, app_name, search, fetch) or []
+    except Exception as e:
+        return failed_lookup(e)
+
+
+async def async_get_categories(app_name, session):
+    """
+    Asyncio variant of get_categories.
+    
+    Args:
+        app_name (str): Name of the game
+        session: aiohttp-compatible client session
         
-        # Step 5: Find the Genre information
-        for row in game_soup.find_all('tr'):
-            th = row.find('th', scope="row")
-            if th and th.text.strip() == "Genre":
-                genre_link = row.find('td').find('a')
-                if genre_link:
-                    return [genre_link.text.strip()]
-        return []
-    except:
-        return []
\ No newline at end of file
+    Returns:
+        list: List containing the genre if found, otherwise empty list;
+        None if the lookup failed
+    """
+    async def search(app_name):
+        search_text = await aio.fetch_text(session, _search_url(app_name))
+        return _find_game_path(search_text, app_name)
+
+    async def fetch(game_path):
+        return _parse_genre(await aio.fetch_text(session, _game_url(game_path)))
+
+    try:
+        return await resolution.async_resolve(SOURCE_NAME, app_name, search, fetch) or []
+    except Exception as e:
+        return failed_lookup(e)
@@ -0,0 +1,126 @@
+"""
+Resolved app page layer shared by get_categories and get_description.
+
+Each source exposes ``fetch_app_page(app_name)``, which performs the search
+and detail-page requests once and parses every field the source offers
+(categories, description, ...) into a plain dictionary. The ``memoize_page``
+decorator keeps those pages for a short time, so calling several accessors
+for the same application only fetches and parses its pages once. The
+asyncio variants of get_categories parse the same pages and ``prime`` the
+memo with them, so a later fetch_app_page call does not fetch them again.
+
+``get_categories`` tells a page that does not exist (an empty list) apart
+from a lookup that failed (None, see failed_lookup): only the former may be
+cached as "not found".
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from AppEnergy import metrics
+from AppEnergy.config import APP_PAGE_TTL, APP_PAGE_CACHE_SIZE
+
+
+# HTTP statuses meaning the requested page does not exist
+NOT_FOUND_STATUSES = (404, 410)
+
+
+def is_not_found(error):
+    """Check whether a request error means the page does not exist (404/410)."""
+    status = getattr(error, "status", None)  # aiohttp.ClientResponseError
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)  # requests.HTTPError
+    return status in NOT_FOUND_STATUSES
+
+
+def failed_lookup(error):
+    """
+    Get the get_categories result of a lookup that raised an error.
+    
+    Args:
+        error (Exception): Error raised by the lookup
+        
+    Returns:
+        list or None: Empty list if the page does not exist (404/410),
+        otherwise None (the lookup failed; the error is recorded in the
+        lookup's metrics)
+    """
+    if is_not_found(error):
+        return []
+    metrics.record_error(error)
+    return None
+
+
+def _page_key(app_name):
+    """Normalize an application name for use as a memo key."""
+    return " ".join(str(app_name).lower().split())
+
+
+def memoize_page(fetch=None, ttl=APP_PAGE_TTL, maxsize=APP_PAGE_CACHE_SIZE):
+    """
+    Memoize a ``fetch_app_page(app_name)`` function for ttl seconds.
+    
+    Both found pages and "not found" results (None) are memoized; exceptions
+    propagate and are not, so network errors are retried on the next call.
+    The wrapper gains ``prime(app_name, page)`` (memoize a page fetched
+    elsewhere), ``peek(app_name)`` (the memoized page, or None, without
+    fetching) and ``cache_clear()`` methods.
+    
+    Args:
+        fetch (callable): Function taking an application name
+        ttl (float): Seconds a result is reused
+        maxsize (int): Maximum number of memoized applications
+        
+    Returns:
+        callable: Memoized function
+    """
+    if fetch is None:
+        return functools.partial(memoize_page, ttl=ttl, maxsize=maxsize)
+
+    entries = OrderedDict()  # key -> (expires_at, page)
+    lock = threading.Lock()
+
+    def lookup(key, now):
+        with lock:
+            entry = entries.get(key)
+            if entry is not None and entry[0] > now:
+                entries.move_to_end(key)
+                return entry
+        return None
+
+    def store(key, now, page):
+        with lock:
+            entries[key] = (now + ttl, page)
+            entries.move_to_end(key)
+            while len(entries) > maxsize:
+                entries.popitem(last=False)
+
+    @functools.wraps(fetch)
+    def wrapper(app_name):
+        key = _page_key(app_name)
+        now = time.monotonic()
+        entry = lookup(key, now)
+        if entry is not None:
+            metrics.record_cache_hit()
+            return entry[1]
+
+        page = fetch(app_name)
+        store(key, now, page)
+        return page
+
+    def prime(app_name, page):
+        store(_page_key(app_name), time.monotonic(), page)
+
+    def peek(app_name):
+        entry = lookup(_page_key(app_name), time.monotonic())
+        return None if entry is None else entry[1]
+
+    def cache_clear():
+        with lock:
+            entries.clear()
+
+    wrapper.prime = prime
+    wrapper.peek = peek
+    wrapper.cache_clear = cache_clear
+    return wrapper
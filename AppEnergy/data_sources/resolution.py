@@ -0,0 +1,122 @@
+"""
+Name -> store ID/URL resolution shared by the search-based data sources.
+
+Flathub, the Apple App Store, Itch.io and MyAbandonware first search for the
+application name and then fetch the page of the matching result. When an
+index (see cache.ResolutionIndex) is installed with ``set_index``, the
+resolved ID or URL of every search is stored, including "no match" results,
+and later lookups of the same name skip the search request. A stored target
+whose page has disappeared (404/410) is dropped and searched again.
+"""
+import threading
+
+from AppEnergy import metrics
+from .pages import is_not_found
+
+_lock = threading.Lock()
+_index = None
+_refresh = False
+
+def set_index(index, refresh=False):
+    """
+    Install the resolution index used by the data sources.
+
+    Args:
+        index: ResolutionIndex-compatible object (None disables the index)
+        refresh (bool): Ignore stored resolutions but still store new ones
+    """
+    global _index, _refresh
+    with _lock:
+        _index = index
+        _refresh = refresh
+
+
+def get_index():
+    """Get the installed resolution index, or None."""
+    return _index
+
+
+def _stored(source, app_name):
+    """Return the stored target of a lookup, or None if it must be searched."""
+    index, refresh = _index, _refresh
+    if index is None or refresh:
+        return None
+    return index.get(source, app_name)
+
+
+def _store(source, app_name, target):
+    """Record the result of a search."""
+    index = _index
+    if index is not None:
+        index.set(source, app_name, target)
+
+
+def _forget(source, app_name):
+    """Drop a stale resolution."""
+    index = _index
+    if index is not None:
+        index.delete(source, app_name)
+
+
+def resolve(source, app_name, search, fetch):
+    """
+    Resolve a name through the index (or a search) and fetch its page.
+
+    Args:
+        source (str): Data source name
+        app_name (str): Name of the application
+        search (callable): ``search(app_name)`` returning the ID/URL of the
+            matching result, or None if there is none
+        fetch (callable): ``fetch(target)`` returning the parsed page
+
+    Returns:
+        Result of fetch, or None if the search has no match
+    """
+    target = _stored(source, app_name)
+    if target is not None:
+        metrics.record_cache_hit()
+    if target == "":
+        return None
+    if target is not None:
+        try:
+            return fetch(target)
+        except Exception as e:
+            if not is_not_found(e):
+                raise
+            _forget(source, app_name)
+
+    target = search(app_name)
+    _store(source, app_name, target)
+    return fetch(target) if target else None
+
+
+async def async_resolve(source, app_name, search, fetch):
+    """
+    Asyncio variant of resolve; search and fetch are coroutine functions.
+
+    Args:
+        source (str): Data source name
+        app_name (str): Name of the application
+        search (callable): Coroutine function returning the ID/URL of the
+            matching result, or None if there is none
+        fetch (callable): Coroutine function returning the parsed page
+
+    Returns:
+        Result of fetch, or None if the search has no match
+    """
+    target = _stored(source, app_name)
+    if target is not None:
+        metrics.record_cache_hit()
+    if target == "":
+        return None
+    if target is not None:
+        try:
+            return await fetch(target)
+        except Exception as e:
+            if not is_not_found(e):
+                raise
+            _forget(source, app_name)
+
+    target = await search(app_name)
+    _store(source, app_name, target)
+    return await fetch(target) if target else None
@@ -0,0 +1,237 @@
+"""
+Shared, pooled HTTP sessions for the data sources.
+
+Every source fetches through one of a few long-lived ``requests`` sessions
+instead of the module-level ``requests.get``, so connections (and TLS
+handshakes) to each store are reused across calls and threads. Each session
+profile carries its default headers, set once when the session is created.
+Every request is also recorded in the per-host health state (health.py), which
+refuses requests to hosts whose circuit is open and bounds the number of
+concurrent requests per host.
+
+A lookup can run its requests under a ``deadline``: each request's timeout is
+then capped by the time left, and requests started after the deadline fail
+immediately with DeadlineExceeded.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from AppEnergy import metrics
+from . import health
+from AppEnergy.config import (
+    SNAP_HEADERS, GENERAL_HEADERS, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE,
+    HTTP_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_RETRY_AFTER_MAX
+)
+
+# Default headers of each session profile
+SESSION_HEADERS = {
+    "snap": SNAP_HEADERS,
+    "general": GENERAL_HEADERS,
+    "plain": {},
+}
+
+_settings = {
+    "pool_connections": HTTP_POOL_CONNECTIONS,
+    "pool_maxsize": HTTP_POOL_MAXSIZE,
+    "timeout": HTTP_TIMEOUT,
+    "retries": HTTP_RETRIES,
+    "backoff_factor": HTTP_BACKOFF_FACTOR,
+}
+_sessions = {}
+_lock = threading.Lock()
+
+# time.monotonic() deadline of the requests made in the current context
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """A request was started after the deadline of its lookup."""
+
+
+class CircuitOpen(health.CircuitOpenError, requests.exceptions.ConnectionError):
+    """A request was refused because its host's circuit breaker is open."""
+
+
+@contextmanager
+def deadline(at):
+    """
+    Run the requests made inside the block under a deadline.
+    
+    Args:
+        at (float): time.monotonic() value by which requests must complete
+            (None removes the deadline)
+    """
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """
+    Get the time left before the current deadline.
+    
+    Returns:
+        float: Seconds left (may be negative), or None without a deadline
+    """
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def _cap_timeout(timeout, remaining):
+    """Cap a requests timeout (float or (connect, read) tuple) by the time left."""
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class DeadlineRetry(Retry):
+    """
+    Retry policy that stops retrying (and backing off) at the current deadline.
+
+    Retry-After waits are capped by HTTP_RETRY_AFTER_MAX and by the time left.
+    """
+
+    def is_exhausted(self):
+        remaining = remaining_time()
+        return super().is_exhausted() or (remaining is not None and remaining <= 0)
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        remaining = remaining_time()
+        return backoff if remaining is None else max(0.0, min(backoff, remaining))
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        retry_after = min(retry_after, HTTP_RETRY_AFTER_MAX)
+        remaining = remaining_time()
+        return retry_after if remaining is None else max(0.0, min(retry_after, remaining))
+
+
+class PooledSession(requests.Session):
+    """requests.Session that applies a default timeout to every request."""
+
+    def __init__(self, timeout=None):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded before requesting {url}")
+        
+        host = health.get_host(url)
+        try:
+            trial = host.acquire(timeout=remaining)
+        except health.CircuitOpenError as e:
+            raise CircuitOpen(str(e)) from None
+        except TimeoutError:
+            raise DeadlineExceeded(f"Deadline exceeded waiting to request {url}") from None
+        
+        started = time.monotonic()
+        try:
+            remaining = remaining_time()
+            if remaining is not None:
+                kwargs["timeout"] = _cap_timeout(kwargs["timeout"], remaining)
+            response = super().request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            metrics.record_request(0)
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                host.cancel(trial)  # Cut short by our own deadline, not the host's fault
+            else:
+                host.release(time.monotonic() - started, True, trial)
+            raise
+        except BaseException:
+            host.cancel(trial)
+            raise
+        
+        host.release(time.monotonic() - started, response.status_code in health.FAILURE_STATUSES, trial)
+        metrics.record_request(0 if kwargs.get("stream") else len(response.content))
+        return response
+
+
+def _create_session(profile):
+    """Create a session for a profile using the current settings."""
+    session = PooledSession(timeout=_settings["timeout"])
+    session.headers.update(SESSION_HEADERS[profile])
+
+    retry = DeadlineRetry(
+        total=_settings["retries"],
+        backoff_factor=_settings["backoff_factor"],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=_settings["pool_connections"],
+        pool_maxsize=_settings["pool_maxsize"],
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(profile="general"):
+    """
+    Get the shared session of a profile, creating it on first use.
+    
+    Args:
+        profile (str): One of SESSION_HEADERS ("snap", "general" or "plain")
+        
+    Returns:
+        requests.Session: Pooled keep-alive session with the profile headers
+    """
+    session = _sessions.get(profile)
+    if session is None:
+        with _lock:
+            session = _sessions.get(profile)
+            if session is None:
+                session = _sessions[profile] = _create_session(profile)
+    return session
+
+
+def configure(pool_connections=None, pool_maxsize=None, timeout=None, retries=None, backoff_factor=None):
+    """
+    Change the pool sizes, timeout or retry policy of the shared sessions.
+    
+    Open sessions are closed, so the next request of every source uses a
+    session built with the new settings.
+    
+    Args:
+        pool_connections (int): Number of per-host connection pools kept alive
+        pool_maxsize (int): Keep-alive connections per host
+        timeout (float or tuple): Default (connect, read) timeout in seconds
+        retries (int): Retries on connection errors, 429 and 5xx responses
+        backoff_factor (float): Exponential backoff between retries
+    """
+    updates = {
+        "pool_connections": pool_connections,
+        "pool_maxsize": pool_maxsize,
+        "timeout": timeout,
+        "retries": retries,
+        "backoff_factor": backoff_factor,
+    }
+    with _lock:
+        _settings.update({k: v for k, v in updates.items() if v is not None})
+    close_sessions()
+
+
+def close_sessions():
+    """Close all shared sessions and their pooled connections."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
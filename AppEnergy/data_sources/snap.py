@@ -1,73 +1,155 @@
 """
-Snapcraft API integration for fetching application categories.
+Snapcraft API integration for fetching application categories and descriptions.
 """
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import time
-from AppEnergy.config import SNAP_HEADERS
+from AppEnergy.config import SNAP_HEADERS, SNAPCRAFT_API_URL
+from . import aio, catalog_mirror
+from .pages import failed_lookup, memoize_page
+
+HOST = "snapcraft.io"  # Health key of the hosts queried by get_categories (see health.py)
+SNAP_INFO_PARAMS = {"fields": "snap-id,categories,title,description"}
+
+
+def _info_url(snap_name):
+    """Build the Snapcraft info API URL for a snap."""
+    return f"{SNAPCRAFT_API_URL}/snaps/info/{snap_name}"
+
+
+def _parse_categories(data):
+    """Extract category names from a Snapcraft info API response."""
+    return [cat["name"] for cat in data.get("snap", {}).get("categories", [])]
+
+
+def _parse_description(data):
+    """Extract the description text from a Snapcraft info API response."""
+    description = data.get("snap", {}).get("description")
+    return " ".join(description.split()) if description else None
+
+
+@memoize_page
+def fetch_app_page(snap_name):
+    """
+    Fetch and parse the Snapcraft info of a snap once.
+    
+    Args:
+        snap_name (str): Name of the snap application
+        
+    Returns:
+        dict: Page with title, categories and description
+        
+    Raises:
+        requests.exceptions.RequestException: If the request fails
+    """
+    from .session import get_session
+
+    response = get_session("snap").get(_info_url(snap_name), params=SNAP_INFO_PARAMS)
+    response.raise_for_status()
+    return _parse_info(response.json())
+
+
+def _parse_info(data):
+    """Build the page of a snap from its Snapcraft info API response."""
+    return {
+        "title": data.get("snap", {}).get("title"),
+        "categories": _parse_categories(data),
+        "description": _parse_description(data),
+    }
+
 
 def get_categories(snap_name):
     """
     Fetch Snap Application details from Snapcraft API.
     
+    Snaps found in the local catalog mirror are answered without a request.
+    
     Args:
         snap_name (str): Name of the snap application
         
     Returns:
         list: List of categories for the application
+        (empty if not found), or None if the lookup failed
     """
-    url = f"https://api.snapcraft.io/v2/snaps/info/{snap_name}"
-    params = {"fields": "snap-id,categories"}
+    mirrored = catalog_mirror.lookup(catalog_mirror.SNAPCRAFT, snap_name)
+    if mirrored is not None:
+        return mirrored
 
     try:
-        response = requests.get(url, headers=SNAP_HEADERS, params=params)
-        response.raise_for_status()
-        data = response.json()
-        return [cat["name"] for cat in data.get("snap", {}).get("categories", [])]
-    except Exception:
-        return []
+        return fetch_app_page(snap_name)["categories"]
+    except Exception as e:
+        return failed_lookup(e)
+
+
+async def async_get_categories(snap_name, session):
+    """
+    Asyncio variant of get_categories.
+    
+    Args:
+        snap_name (str): Name of the snap application
+        session: aiohttp-compatible client session
+        
+    Returns:
+        list: List of categories for the application
+        (empty if not found), or None if the lookup failed
+    """
+    mirrored = catalog_mirror.lookup(catalog_mirror.SNAPCRAFT, snap_name)
+    if mirrored is not None:
+        return mirrored
+
+    try:
+        data = await aio.fetch_json(session, _info_url(snap_name), headers=SNAP_HEADERS, params=SNAP_INFO_PARAMS)
+        page = _parse_info(data)
+        fetch_app_page.prime(snap_name, page)
+        return page["categories"]
+    except Exception as e:
+        return failed_lookup(e)
     
 
 def get_description(app_name):
-    options = Options()
-    options.add_argument('--headless')
-    driver = webdriver.Chrome(options=options)
-
-    # Step 1: Search for the application
-    search_url = f"https://snapcraft.io/store?q={app_name}"
-    driver.get(search_url)
-    time.sleep(2)  # Wait for JS to render
-
-    # Step 2: Find the app link
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    app_link = None
-    for a in soup.find_all('a', class_='sc-package-card__heading-link'):
-        if a.text.strip().lower() == app_name.strip().lower():
-            app_link = "https://snapcraft.io" + a['href']
-            break
-
-    if not app_link:
-        driver.quit()
-        return None
+    """
+    Get the description of an application from its Snapcraft store page.
+    
+    Args:
+        app_name (str): Name of the snap application
+        
+    Returns:
+        str: Description text, or None if not found
+    """
+    try:
+        page = fetch_app_page(app_name.strip().lower())
+    except Exception:
+        page = None
+
+    # Use the info API text when the snap's title is the requested name, as
+    # the store search below would find the same snap
+    if page and page["description"] and (page["title"] or "").strip().lower() == app_name.strip().lower():
+        return page["description"]
+
+    from bs4 import BeautifulSoup
+    from .browser import get_pool, wait_for
 
-    # Step 3: Go to the app page
-    driver.get(app_link)
-    time.sleep(2)
+    with get_pool().driver() as driver:
+        # Step 1: Search for the application
+        search_url = f"https://snapcraft.io/store?q={app_name}"
+        driver.get(search_url)
+        wait_for(driver, 'a.sc-package-card__heading-link')  # Wait for JS to render
 
-    # Step 4: Extract the description
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    desc_div = soup.find('div', class_='col-8 u-text-wrap')
-    if desc_div:
-        description = desc_div.get_text(separator=' ', strip=True)
-    else:
-        description = None
+        # Step 2: Find the app link
+        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        app_link = None
+        for a in soup.find_all('a', class_='sc-package-card__heading-link'):
+            if a.text.strip().lower() == app_name.strip().lower():
+                app_link = "https://snapcraft.io" + a['href']
+                break
 
-    driver.quit()
-    return description
\ No newline at end of file
+        if not app_link:
+            return None
+
+        # Step 3: Go to the app page
+        driver.get(app_link)
+        wait_for(driver, 'div.col-8.u-text-wrap')
+
+        # Step 4: Extract the description
+        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        desc_div = soup.find('div', class_='col-8 u-text-wrap')
+        if desc_div:
+            return desc_div.get_text(separator=' ', strip=True)
+        return None
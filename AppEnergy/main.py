@@ -1,20 +1,96 @@
 import re
-import difflib
-from typing import Dict, List, Tuple, Optional
-from collections import defaultdict
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import AsyncExitStack, nullcontext
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+from collections import defaultdict, deque
 
 # Import your existing modules
-from .data_sources import snap, flathub, apple_store, gog, itch_io, myabandonware
-from .config import CATEGORIES, ENERGY_TAGS
+from .data_sources import snap, flathub, apple_store, gog, itch_io, myabandonware, aio, resolution, health
+from . import metrics
+from .cache import CategoryCache, ResolutionIndex, normalize_app_name
+from .matching import FUZZY_MATCH_CUTOFF, DescriptionScanner, KeywordIndex, TagScoreCache, batch_confidences
+from .similarity import SimilarityEngine
+from .singleflight import SingleFlight, SOURCE_FLIGHTS, WaitTimeout
+from .config import (
+    CATEGORIES, ENERGY_TAGS, FETCH_MAX_WORKERS, BATCH_CONCURRENCY, EARLY_EXIT_THRESHOLD,
+    EARLY_EXIT_TAG_BUDGET, HEDGE_AFTER, CLASSIFY_CHUNK_SIZE, DESCRIPTION_WEIGHT,
+)
+
+
+# Data sources queried by fetch_app_data, in result order
+DATA_SOURCES = {
+    "Snapcraft": snap,
+    "Flathub": flathub,
+    "Apple Store": apple_store,
+    "Gog": gog,
+    "Itch.io": itch_io,
+    "My Abandonware": myabandonware,
+}
+
+class SourceError(Exception):
+    """A data source failed to answer (request or parsing error)."""
+
+
+# Fuzzy comparisons of calculate_category_confidence for keyword sets outside the index
+_SIMILARITY = SimilarityEngine(FUZZY_MATCH_CUTOFF)
+
+# Sources whose fetch_app_page has a "description", read when use_descriptions is set
+DESCRIPTION_SOURCES = {
+    "Snapcraft": snap,
+    "Flathub": flathub,
+    "Apple Store": apple_store,
+    "Gog": gog,
+    "Itch.io": itch_io,
+}
 
 
 class EnergyConsumptionCalculator:
     """Professional Energy Consumption Calculator for Applications"""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, cache: Optional[CategoryCache] = None,
+                 refresh_cache: bool = False, early_exit_threshold: Optional[float] = None,
+                 hedge_after: Optional[float] = None, single_flight: Optional[SingleFlight] = SOURCE_FLIGHTS,
+                 collect_metrics: bool = False, use_descriptions: bool = False):
+        """
+        Args:
+            max_workers: Number of threads used to query the data sources
+                concurrently (defaults to FETCH_MAX_WORKERS, 1 disables
+                concurrency)
+            cache: Persistent lookup cache read before querying a source and
+                updated with its result (no caching when omitted)
+            refresh_cache: Ignore cached entries but still store fresh results
+            early_exit_threshold: Stop querying sources once the best category
+                reaches this confidence and the pending sources are not
+                expected to change it (see fetch_app_data); None waits for
+                every source
+            hedge_after: Send a second, identical request to a source that
+                has not answered after this many seconds and use whichever
+                answers first (None disables hedging)
+            single_flight: Coalesces concurrent lookups of the same source
+                and application so they share one fetch (defaults to the
+                process-wide SOURCE_FLIGHTS, None disables coalescing)
+            collect_metrics: Add per-stage timings and per-source counters
+                to every result under "metrics" and to metrics.REGISTRY
+            use_descriptions: Also score the store descriptions of the
+                sources that found the application (see match_categories);
+                the early exit only considers tags
+        """
+        self.tag_score_cache = TagScoreCache()
         self.categories = CATEGORIES
         self.energy_tags = ENERGY_TAGS
         self.confidence_threshold = 0.3
+        self.description_weight = DESCRIPTION_WEIGHT
+        self.max_workers = FETCH_MAX_WORKERS if max_workers is None else max_workers
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        self.early_exit_threshold = early_exit_threshold
+        self.hedge_after = hedge_after
+        self.single_flight = single_flight
+        self.collect_metrics = collect_metrics
+        self.use_descriptions = use_descriptions
         
     def normalize_tags(self, raw_tags: List[str]) -> str:
         """
@@ -66,10 +142,107 @@ class EnergyConsumptionCalculator:
         
         return ", ".join(unique_tags)
     
+    @property
+    def categories(self) -> Dict[str, set]:
+        """Category name to keyword set mapping used for matching."""
+        return self._categories
+    
+    @categories.setter
+    def categories(self, categories: Dict[str, set]) -> None:
+        self._categories = categories
+        self._keyword_index = None
+        self._description_scanner = None
+        self.tag_score_cache.clear()
+    
+    def _get_keyword_index(self) -> KeywordIndex:
+        """
+        Return the keyword index of self.categories, rebuilding it (and
+        dropping the memoized tag scores) if the categories were edited.
+        """
+        index = self._keyword_index
+        if index is None or not index.matches(self._categories):
+            self.tag_score_cache.clear()
+            index = self._keyword_index = KeywordIndex(self._categories)
+        return index
+    
+    def _get_description_scanner(self) -> DescriptionScanner:
+        """Return the description scanner of self.categories, rebuilding it if the categories were edited."""
+        scanner = self._description_scanner
+        if scanner is None or not scanner.matches(self._categories):
+            scanner = self._description_scanner = DescriptionScanner(self._categories)
+        return scanner
+    
+    def description_scores(self, description: str) -> Dict[str, float]:
+        """
+        Score a store description against every category.
+        
+        Category keywords are counted in a single pass over the text
+        (multi-word keywords such as video_call match the phrase "video
+        call"), and each category gets its share of all keyword hits.
+        
+        Args:
+            description: Description text
+            
+        Returns:
+            Dictionary of category name to score (0.0 to 1.0); all scores
+            are 0.0 if the text contains no keyword
+        """
+        scanner = self._get_description_scanner()
+        hits = scanner.category_hits(description) if description else [0] * len(scanner.category_names)
+        total = sum(hits)
+        return {
+            name: count / total if total else 0.0
+            for name, count in zip(scanner.category_names, hits)
+        }
+    
+    def _score_tags(self, tag_list: List[str]) -> Tuple[KeywordIndex, List[Tuple[float, ...]]]:
+        """
+        Get the per-category score vector of every tag, from the tag score
+        cache when possible.
+        
+        Returns:
+            Tuple of (keyword index, score vectors in tag_list order)
+        """
+        index = self._get_keyword_index()
+        cache = self.tag_score_cache
+        score_vectors = []
+        for tag in tag_list:
+            scores = cache.get(tag)
+            if scores is None:
+                scores = index.score_tag(tag)
+                cache.put(tag, scores)
+            score_vectors.append(scores)
+        return index, score_vectors
+    
+    def tag_cache_info(self) -> Dict[str, int]:
+        """
+        Get the hit/miss counters of the tag score cache.
+        
+        Returns:
+            Dictionary with hits, misses, size and maxsize
+        """
+        return self.tag_score_cache.stats()
+    
+    def coalescing_info(self) -> Dict[str, int]:
+        """
+        Get the counters of the source lookup coalescing.
+        
+        Returns:
+            Dictionary with calls, executed, deduplicated and in_flight (all
+            zero when coalescing is disabled)
+        """
+        if self.single_flight is None:
+            return {"calls": 0, "executed": 0, "deduplicated": 0, "in_flight": 0}
+        return self.single_flight.stats()
+    
     def calculate_category_confidence(self, normalized_tags: str, category_name: str, category_keywords: set) -> float:
         """
         Calculate confidence score for a category based on tag matching.
         
+        Categories of self.categories are scored through the precompiled
+        keyword index; any other keyword set falls back to comparing every tag
+        with every keyword. Both give identical scores.
+        
         Args:
             normalized_tags: Normalized tag string
             category_name: Name of the category
@@ -80,8 +253,24 @@ class EnergyConsumptionCalculator:
         """
         if not normalized_tags:
             return 0.0
+        
+        index = self._get_keyword_index()
+        position = index.position(category_name, category_keywords)
+        if position is None:
+            return self._fuzzy_category_confidence(normalized_tags, category_keywords)
             
         tag_list = [tag.strip() for tag in normalized_tags.split(',')]
+        
+        total_score = 0.0
+        for scores in self._score_tags(tag_list)[1]:
+            total_score += scores[position]
+        
+        return total_score / len(tag_list)
+    
+    @staticmethod
+    def _fuzzy_category_confidence(normalized_tags: str, category_keywords: set) -> float:
+        """Score tags against a keyword set by comparing every tag with every keyword."""
+        tag_list = [tag.strip() for tag in normalized_tags.split(',')]
         if not tag_list:
             return 0.0
             
@@ -102,8 +291,8 @@ class EnergyConsumptionCalculator:
                         similarity = max(len(tag), len(keyword)) / max(len(tag), len(keyword))
                         best_match_score = max(best_match_score, similarity * 0.8)
                     else:
-                        # Use difflib for fuzzy matching
-                        similarity = difflib.SequenceMatcher(None, tag, keyword).ratio()
+                        # Use difflib for fuzzy matching (0.0 when it cannot reach the cut-off)
+                        similarity = _SIMILARITY.ratio(tag, keyword)
                         if similarity > 0.7:  # Only consider good matches
                             best_match_score = max(best_match_score, similarity * 0.6)
             
@@ -111,24 +300,48 @@ class EnergyConsumptionCalculator:
         
         return total_score / max_possible_score if max_possible_score > 0 else 0.0
     
-    def match_categories(self, normalized_tags: str) -> Tuple[str, float]:
+    def match_categories(self, normalized_tags: str, description: Optional[str] = None) -> Tuple[str, float]:
         """
         Match normalized tags with predefined categories and return best match.
         
+        When a description containing category keywords is given, each
+        category's confidence becomes ``(1 - w) * tag score + w *
+        description score`` with w = description_weight (see
+        description_scores).
+        
         Args:
             normalized_tags: Normalized tag string
+            description: Store description text of the application
             
         Returns:
             Tuple of (best_category_name, confidence_score)
         """
-        if not normalized_tags:
+        description_scores = self.description_scores(description) if description else None
+        if description_scores is not None and not any(description_scores.values()):
+            description_scores = None
+        if not normalized_tags and description_scores is None:
             return "others", 0.0
-            
+        
         category_scores = {}
         
-        for category_name, keywords in self.categories.items():
-            confidence = self.calculate_category_confidence(normalized_tags, category_name, keywords)
-            category_scores[category_name] = confidence
+        if normalized_tags:
+            tag_list = [tag.strip() for tag in normalized_tags.split(',')]
+            index, score_vectors = self._score_tags(tag_list)
+            
+            for position, category_name in enumerate(index.category_names):
+                total_score = 0.0
+                for scores in score_vectors:
+                    total_score += scores[position]
+                category_scores[category_name] = total_score / len(tag_list)
+        else:
+            category_scores = dict.fromkeys(self.categories, 0.0)
+        
+        if description_scores is not None:
+            weight = self.description_weight
+            for category_name in category_scores:
+                category_scores[category_name] = (
+                    (1 - weight) * category_scores[category_name] + weight * description_scores[category_name]
+                )
         
         # Find the best matching category
         best_category = max(category_scores, key=category_scores.get)
@@ -140,6 +353,53 @@ class EnergyConsumptionCalculator:
             
         return best_category, best_confidence
     
+    def match_categories_batch(self, normalized_tags_list: Iterable[str],
+                               use_numpy: Optional[bool] = None) -> List[Tuple[str, float]]:
+        """
+        Match many normalized tag strings at once, e.g. to re-score a stored
+        tag dataset offline.
+        
+        Every distinct tag is scored once (through the tag score cache) into
+        a vocabulary x category matrix, and the confidences of all
+        applications are then summed from its rows with NumPy when available.
+        The results equal calling match_categories on each string.
+        
+        Args:
+            normalized_tags_list: Normalized tag strings
+            use_numpy: Force (True) or disable (False) the NumPy path; None
+                uses NumPy if it is installed
+            
+        Returns:
+            List of (best_category_name, confidence_score), in input order
+        """
+        vocabulary = {}
+        tag_lists = []
+        for normalized_tags in normalized_tags_list:
+            if not normalized_tags:
+                tag_lists.append(None)
+                continue
+            tag_lists.append([
+                vocabulary.setdefault(tag.strip(), len(vocabulary))
+                for tag in normalized_tags.split(',')
+            ])
+        
+        index, score_vectors = self._score_tags(list(vocabulary))
+        confidences = batch_confidences([tags or [] for tags in tag_lists], score_vectors, use_numpy)
+        
+        results = []
+        for tags, scores in zip(tag_lists, confidences):
+            if tags is None:
+                results.append(("others", 0.0))
+                continue
+            best_position = max(range(len(scores)), key=scores.__getitem__)
+            best_category = index.category_names[best_position]
+            best_confidence = scores[best_position]
+            if best_confidence < self.confidence_threshold:
+                results.append(("others", best_confidence))
+            else:
+                results.append((best_category, best_confidence))
+        return results
+    
     def get_energy_level(self, category: str) -> str:
         """
         Map category to energy consumption level.
@@ -152,80 +412,536 @@ class EnergyConsumptionCalculator:
         """
         return self.energy_tags.get(category, "moderate-cpu")
     
-    def fetch_app_data(self, app_name: str) -> Dict[str, List[str]]:
-        """Fetch application data from all sources."""
-        # Fetch data from all sources
-        snap_cats = snap.get_categories(app_name)
-        flat_cats = flathub.get_categories(app_name)
-        apple_cats = apple_store.get_categories(app_name)
-        gog_cats = gog.get_categories(app_name)
-        itch_cats = itch_io.get_categories(app_name)
-        abandon_cats = myabandonware.get_categories(app_name)
-
-        # Organize all results in a dictionary
-        raw_categories = {
-            "Snapcraft": snap_cats,
-            "Flathub": flat_cats,
-            "Apple Store": apple_cats,
-            "Gog": gog_cats,
-            "Itch.io": itch_cats,
-            "My Abandonware": abandon_cats,
+    def _read_cache(self, source_name: str, app_name: str) -> Optional[List[str]]:
+        """Return the cached categories of a source, or None if they must be fetched."""
+        if self.cache is None or self.refresh_cache:
+            return None
+        return self.cache.get(source_name, app_name)
+    
+    @staticmethod
+    def _source_available(source_name: str) -> bool:
+        """Check that the circuit breaker of a source's host is not open."""
+        host = getattr(DATA_SOURCES[source_name], "HOST", None)
+        return host is None or health.available(host)
+    
+    def _fetch_source(self, source_name: str, app_name: str, deadline: Optional[float] = None,
+                      coalesce: bool = True) -> List[str]:
+        """
+        Query one data source and store its result in the cache.
+        
+        Concurrent lookups of the same source and (normalized) application
+        name share one query through single_flight. A caller joining a query
+        started by another one waits at most until its own deadline and gets
+        that query's outcome, except a TimeoutError caused by the other
+        caller's earlier deadline: with time left, it then starts (or joins)
+        a new query.
+        
+        Args:
+            source_name: Name of the source in DATA_SOURCES
+            app_name: Name of the application
+            deadline: time.monotonic() value capping the source's requests
+            coalesce: Share the query with concurrent identical lookups
+                (hedged requests pass False to really send a second query)
+            
+        Raises:
+            TimeoutError: If the lookup failed and the deadline passed
+            health.CircuitOpenError: If the lookup failed and the source's
+                host's circuit is open
+            SourceError: If the lookup failed for another reason
+            (failed lookups are not cached; only a genuine "not found",
+            an empty list, is)
+        """
+        with metrics.source(source_name):
+            if not coalesce or self.single_flight is None:
+                return self._query_source(source_name, app_name, deadline)
+            
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    categories = self.single_flight.do(
+                        (source_name, normalize_app_name(app_name)),
+                        lambda: self._query_source(source_name, app_name, deadline),
+                        timeout
+                    )
+                    return list(categories)
+                except WaitTimeout:
+                    raise
+                except TimeoutError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise
+                    # The shared query ran out of its leader's shorter time
+                    # budget: start (or join) a new one
+    
+    def _query_source(self, source_name: str, app_name: str, deadline: Optional[float] = None) -> List[str]:
+        """Query one data source without coalescing (see _fetch_source)."""
+        if deadline is None:
+            categories = DATA_SOURCES[source_name].get_categories(app_name)
+        else:
+            from .data_sources.session import deadline as request_deadline
+            
+            with request_deadline(deadline):
+                categories = DATA_SOURCES[source_name].get_categories(app_name)
+            if categories is None and time.monotonic() >= deadline:
+                raise TimeoutError(f"{source_name} did not answer before the deadline")
+        if categories is None:
+            self._raise_failure(source_name)
+        self._write_cache(source_name, app_name, categories)
+        return categories
+    
+    def _write_cache(self, source_name: str, app_name: str, categories: List[str]) -> None:
+        """Cache the categories of a source, with the description of the page they were read from."""
+        if self.cache is None:
+            return
+        description = None
+        module = DESCRIPTION_SOURCES.get(source_name)
+        if categories and module is not None:
+            # The page was just fetched and memoized by get_categories
+            page = module.fetch_app_page.peek(app_name)
+            if page is not None:
+                description = page.get("description")
+                description = description if isinstance(description, str) else ""
+        self.cache.set(source_name, app_name, categories, description)
+    
+    def _raise_failure(self, source_name: str) -> None:
+        """Raise the error of a failed source lookup (CircuitOpenError or SourceError)."""
+        if not self._source_available(source_name):
+            raise health.CircuitOpenError(f"{source_name} is unavailable (circuit open)")
+        raise SourceError(f"{source_name} lookup failed")
+    
+    async def _async_fetch_source(self, source_name: str, app_name: str, session, coalesce: bool = True) -> List[str]:
+        """
+        Asyncio variant of _fetch_source.
+        
+        Only lookups sharing the same session (and event loop) are coalesced,
+        so a shared query never outlives the session it runs on.
+        """
+        with metrics.source(source_name):
+            if not coalesce or self.single_flight is None:
+                return await self._async_query_source(source_name, app_name, session)
+            
+            categories = await self.single_flight.async_do(
+                (source_name, normalize_app_name(app_name), session),
+                lambda: self._async_query_source(source_name, app_name, session)
+            )
+            return list(categories)
+    
+    async def _async_query_source(self, source_name: str, app_name: str, session) -> List[str]:
+        """Query one data source without coalescing (see _async_fetch_source)."""
+        categories = await DATA_SOURCES[source_name].async_get_categories(app_name, session)
+        if categories is None:
+            self._raise_failure(source_name)
+        self._write_cache(source_name, app_name, categories)
+        return categories
+    
+    def _can_exit_early(self, raw_categories: Dict[str, Optional[List[str]]], pending: List[str]) -> bool:
+        """
+        Check whether the sources still pending are not expected to change the result.
+        
+        Each pending source is assumed to add at most
+        EARLY_EXIT_TAG_BUDGET[source] to any category's summed score (and as
+        many tags). The best category is kept if it reaches
+        early_exit_threshold now, leads every other category by more than the
+        total budget and stays above confidence_threshold even if every
+        budgeted tag scores 0 for it. The budget only bounds sources returning
+        a single category; a pending source returning more tags than its
+        budget can still change the result.
+        
+        Args:
+            raw_categories: Category lists received so far (None if pending)
+            pending: Names of the sources not answered yet
+            
+        Returns:
+            True if the lookup can stop without waiting for pending
+        """
+        all_tags = []
+        for tags in raw_categories.values():
+            if tags:
+                all_tags.extend(tags)
+        
+        normalized_tags = self.normalize_tags(all_tags)
+        if not normalized_tags:
+            return False
+        
+        tag_list = [tag.strip() for tag in normalized_tags.split(',')]
+        index, score_vectors = self._score_tags(tag_list)
+        
+        totals = [0.0] * len(index.category_names)
+        for scores in score_vectors:
+            for position, score in enumerate(scores):
+                totals[position] += score
+        
+        best = max(range(len(totals)), key=totals.__getitem__)
+        budget = sum(EARLY_EXIT_TAG_BUDGET.get(name, 1.0) for name in pending)
+        
+        return (
+            totals[best] / len(tag_list) >= self.early_exit_threshold
+            and totals[best] / (len(tag_list) + budget) >= self.confidence_threshold
+            and all(totals[best] > total + budget for position, total in enumerate(totals) if position != best)
+        )
+    
+    def _collect_app_data(self, app_name: str, timeout: Optional[float] = None
+                          ) -> Tuple[Dict[str, List[str]], List[str], Dict[str, str]]:
+        """
+        Fetch application data from all sources within an optional time budget.
+        
+        Sources whose host's circuit breaker is open are not queried.
+        
+        Returns:
+            Tuple of (non-empty category lists in DATA_SOURCES order, names of
+            the sources skipped by the early exit, sources without an answer
+            mapped to the reason: "timeout", "circuit_open" or "error")
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        raw_categories = {name: self._read_cache(name, app_name) for name in DATA_SOURCES}
+        uncached = [name for name, categories in raw_categories.items() if categories is None]
+        missing = {name: "circuit_open" for name in uncached if not self._source_available(name)}
+        to_fetch = [name for name in uncached if name not in missing]
+        early_exit = self.early_exit_threshold is not None
+        workers = min(self.max_workers, len(to_fetch))
+        skipped = []
+        
+        if early_exit and to_fetch and self._can_exit_early(raw_categories, to_fetch):
+            skipped = to_fetch
+        elif workers > 1 or (to_fetch and (self.hedge_after is not None or deadline is not None)):
+            # Hedged requests need the pool even with a single worker, and so
+            # does a deadline: a source overrunning its socket timeouts (slow
+            # bodies, several requests) is abandoned when it passes
+            skipped = self._fetch_concurrently(app_name, to_fetch, raw_categories, missing, workers, deadline)
+        else:
+            # Query the sources one after another, in DATA_SOURCES (priority) order
+            for position, name in enumerate(to_fetch):
+                try:
+                    raw_categories[name] = self._fetch_source(name, app_name)
+                except health.CircuitOpenError:
+                    missing[name] = "circuit_open"
+                    continue
+                except SourceError:
+                    missing[name] = "error"
+                    continue
+                remaining = to_fetch[position + 1:]
+                if early_exit and remaining and self._can_exit_early(raw_categories, remaining):
+                    skipped = remaining
+                    break
+        
+        missing = {
+            name: missing.get(name, "timeout") for name in uncached
+            if raw_categories[name] is None and name not in skipped
         }
-
+        if metrics.active():
+            self._record_outcomes(raw_categories, uncached, skipped, missing)
+        
         # Filter empty results
-        non_empty_results = {k: v for k, v in raw_categories.items() if v}
-
-        # Use wikidata only when no other source data is available
-        if len(non_empty_results) == 0 and wiki_cats:
-            non_empty_results = {"Wikidata": wiki_cats}
-
-        return non_empty_results
+        return {k: v for k, v in raw_categories.items() if v}, skipped, missing
     
-    def process_application(self, app_name: str) -> Dict[str, any]:
+    @staticmethod
+    def _record_outcomes(raw_categories: Dict[str, Optional[List[str]]], uncached: List[str],
+                         skipped: List[str], missing: Dict[str, str]) -> None:
+        """Record the outcome of every source in the metrics of the current lookup."""
+        for name, categories in raw_categories.items():
+            if name not in uncached:
+                metrics.record_cache_hit(name)
+                status = "cached"
+            elif name in skipped:
+                status = "skipped"
+            elif name in missing:
+                status = missing[name]
+            else:
+                status = "found" if categories else "empty"
+            metrics.set_status(name, status)
+    
+    def _hedge_wake_times(self, first_started: Dict[str, float], in_flight: set, hedged: set) -> List[float]:
+        """Times at which sources still in flight are due for a hedged request."""
+        if self.hedge_after is None:
+            return []
+        return [first_started[name] + self.hedge_after for name in in_flight - hedged]
+    
+    def _fetch_concurrently(self, app_name: str, to_fetch: List[str], raw_categories: Dict[str, Optional[List[str]]],
+                            missing: Dict[str, str], workers: int, deadline: Optional[float]) -> List[str]:
         """
-        Main processing function for the energy consumption calculator.
+        Query sources on a thread pool, filling raw_categories as they answer
+        (and missing with the sources that failed or whose circuit opened).
+        
+        At most ``workers`` sources are queried at a time, in to_fetch order.
+        Sources still running at the deadline are abandoned. With hedge_after
+        set, a source that has not answered after hedge_after seconds gets a
+        second, identical request (not counted in ``workers``) and the first
+        answer wins.
+        
+        Returns:
+            Names of the sources skipped by the early exit
+        """
+        early_exit = self.early_exit_threshold is not None
+        hedging = self.hedge_after is not None
+        executor = ThreadPoolExecutor(max_workers=workers + (len(to_fetch) if hedging else 0))
+        futures = {}
+        pending = set()
+        first_requests = set()
+        queued = list(to_fetch)
+        first_started = {}
+        hedged = set()
+        skipped = []
+        
+        def submit(name: str, hedge: bool = False) -> None:
+            # Each fetch runs in a copy of this context (deadline, metrics)
+            future = executor.submit(contextvars.copy_context().run, self._fetch_source, name, app_name,
+                                     deadline, not hedge)
+            futures[future] = name
+            pending.add(future)
+            if not hedge:
+                first_requests.add(future)
+        
+        def start_queued() -> None:
+            while queued and len(pending & first_requests) < workers:
+                name = queued.pop(0)
+                first_started[name] = time.monotonic()
+                submit(name)
+        
+        try:
+            start_queued()
+            while pending:
+                in_flight = {futures[future] for future in pending}
+                wake_times = self._hedge_wake_times(first_started, in_flight, hedged)
+                if deadline is not None:
+                    wake_times.append(deadline)
+                
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                wait_timeout = max(0.0, min(wake_times) - now) if wake_times else None
+                done, _ = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    pending.discard(future)
+                    name = futures[future]
+                    if raw_categories[name] is None:
+                        try:
+                            raw_categories[name] = future.result()
+                        except TimeoutError:
+                            pass  # Reported as missing unless a hedged request answers
+                        except health.CircuitOpenError:
+                            missing[name] = "circuit_open"
+                        except SourceError:
+                            missing[name] = "error"
+                
+                # Abandon the other request of sources that answered
+                for future in [f for f in pending if raw_categories[futures[f]] is not None]:
+                    future.cancel()
+                    pending.discard(future)
+                start_queued()
+                
+                in_flight = {futures[future] for future in pending}
+                now = time.monotonic()
+                for name in in_flight - hedged:
+                    if hedging and now >= first_started[name] + self.hedge_after:
+                        hedged.add(name)
+                        submit(name, hedge=True)
+                
+                unanswered = [name for name in to_fetch if name in in_flight or name in queued]
+                if early_exit and unanswered and self._can_exit_early(raw_categories, unanswered):
+                    skipped = unanswered
+                    break
+        finally:
+            # Requests still running (past the deadline, losing hedges or
+            # abandoned by the early exit) finish in the background; their
+            # results still reach the cache
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return skipped
+    
+    def fetch_app_data(self, app_name: str, timeout: Optional[float] = None) -> Dict[str, List[str]]:
+        """
+        Fetch application data from all sources.
+        
+        Sources with a fresh cache entry are answered from the cache. The
+        others are queried concurrently on up to ``max_workers`` threads, so a
+        lookup takes as long as the slowest source. With ``max_workers`` set
+        to 1 they are queried one after another, in DATA_SOURCES order
+        (hedged requests, when hedge_after is set, still run alongside, and
+        with a timeout each source runs on a worker thread so the lookup
+        returns at the deadline).
+        
+        When early_exit_threshold is set, the tags are re-scored as each
+        source answers and the remaining sources are abandoned as soon as
+        they are not expected to change the winning category (see
+        _can_exit_early).
         
         Args:
             app_name: Name of the application
+            timeout: Time budget in seconds; every request of every source is
+                capped by the time left, and sources that have not answered
+                when it runs out are left out of the result
             
         Returns:
-            Dictionary containing processing results and energy level
+            Dictionary mapping source name to its non-empty category list,
+            in DATA_SOURCES order
         """
-        try:
-            # Step 1: Fetch app data from different sources
-            raw_data = self.fetch_app_data(app_name)
-            
-            if not raw_data:
-                return {
-                    "app_name": app_name,
-                    "energy_level": "moderate-cpu",
-                }
-            
-            # Step 2: Combine all tags from different sources
-            all_tags = []
-            for source, tags in raw_data.items():
-                if tags:
-                    all_tags.extend(tags)
-            
-            # Step 3: Normalize tags
-            normalized_tags = self.normalize_tags(all_tags)
+        return self._collect_app_data(app_name, timeout)[0]
+    
+    def fetch_description(self, app_name: str, raw_data: Dict[str, List[str]]) -> str:
+        """
+        Collect the store descriptions of an application.
+        
+        Descriptions are read from the cache, where they are stored with the
+        categories, or else from the pages the DESCRIPTION_SOURCES already
+        fetch for their categories (memoized, so usually without a request),
+        only for sources that found the application; the headless browser
+        fallbacks of get_description are never used.
+        
+        Args:
+            app_name: Name of the application
+            raw_data: Category lists keyed by source name, as returned by
+                fetch_app_data
             
-            # Step 4: Match with predefined categories
-            best_category, confidence = self.match_categories(normalized_tags)
-            # Step 5: Get energy level
-            energy_level = self.get_energy_level(best_category)
+        Returns:
+            The descriptions joined by blank lines ("" if there are none)
+        """
+        descriptions = []
+        for source_name, module in DESCRIPTION_SOURCES.items():
+            if not raw_data.get(source_name):
+                continue
+            description = None if self.cache is None else self.cache.get_description(source_name, app_name)
+            if description is None:
+                with metrics.source(source_name):
+                    try:
+                        page = module.fetch_app_page(app_name)
+                    except Exception as e:
+                        metrics.record_error(e)
+                        continue
+                description = page.get("description") if page else None
+                description = description if isinstance(description, str) else ""
+                if page and self.cache is not None:
+                    self.cache.set_description(source_name, app_name, description)
+            if description:
+                descriptions.append(description)
+        return "\n\n".join(descriptions)
+    
+    async def _async_collect_app_data(self, app_name: str, session=None, timeout: Optional[float] = None
+                                      ) -> Tuple[Dict[str, List[str]], List[str], Dict[str, str]]:
+        """Asyncio variant of _collect_app_data."""
+        import asyncio
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        raw_categories = {name: self._read_cache(name, app_name) for name in DATA_SOURCES}
+        uncached = [name for name, categories in raw_categories.items() if categories is None]
+        missing = {name: "circuit_open" for name in uncached if not self._source_available(name)}
+        to_fetch = [name for name in uncached if name not in missing]
+        early_exit = self.early_exit_threshold is not None
+        skipped = []
+        
+        if early_exit and to_fetch and self._can_exit_early(raw_categories, to_fetch):
+            skipped = to_fetch
+        elif to_fetch:
+            async with AsyncExitStack() as stack:
+                if session is None:
+                    session = await stack.enter_async_context(aio.create_session())
+                
+                tasks = {}
+                pending = set()
+                first_started = {}
+                hedged = set()
+                
+                def submit(name: str, hedge: bool = False) -> None:
+                    task = asyncio.ensure_future(self._async_fetch_source(name, app_name, session, not hedge))
+                    tasks[task] = name
+                    pending.add(task)
+                
+                try:
+                    for name in to_fetch:
+                        first_started[name] = time.monotonic()
+                        submit(name)
+                    
+                    while pending:
+                        in_flight = {tasks[task] for task in pending}
+                        wake_times = self._hedge_wake_times(first_started, in_flight, hedged)
+                        if deadline is not None:
+                            wake_times.append(deadline)
+                        
+                        now = time.monotonic()
+                        if deadline is not None and now >= deadline:
+                            break
+                        wait_timeout = max(0.0, min(wake_times) - now) if wake_times else None
+                        done, _ = await asyncio.wait(pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED)
+                        
+                        for task in done:
+                            pending.discard(task)
+                            if raw_categories[tasks[task]] is None:
+                                try:
+                                    raw_categories[tasks[task]] = task.result()
+                                except health.CircuitOpenError:
+                                    missing[tasks[task]] = "circuit_open"
+                                except SourceError:
+                                    missing[tasks[task]] = "error"
+                        
+                        # Cancel the other request of sources that answered
+                        for task in [t for t in pending if raw_categories[tasks[t]] is not None]:
+                            task.cancel()
+                            pending.discard(task)
+                        
+                        in_flight = {tasks[task] for task in pending}
+                        now = time.monotonic()
+                        for name in in_flight - hedged:
+                            if self.hedge_after is not None and now >= first_started[name] + self.hedge_after:
+                                hedged.add(name)
+                                submit(name, hedge=True)
+                        
+                        if early_exit and in_flight and self._can_exit_early(raw_categories, list(in_flight)):
+                            skipped = [name for name in to_fetch if name in in_flight]
+                            break
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        
+        missing = {
+            name: missing.get(name, "timeout") for name in uncached
+            if raw_categories[name] is None and name not in skipped
+        }
+        if metrics.active():
+            self._record_outcomes(raw_categories, uncached, skipped, missing)
+
+        # Filter empty results
+        return {k: v for k, v in raw_categories.items() if v}, skipped, missing
+    
+    async def async_fetch_app_data(self, app_name: str, session=None, timeout: Optional[float] = None
+                                   ) -> Dict[str, List[str]]:
+        """
+        Asyncio variant of fetch_app_data.
+        
+        All sources without a fresh cache entry are awaited concurrently on
+        the running event loop; requests still running when the time budget
+        runs out, or once early_exit_threshold makes them irrelevant, are
+        cancelled.
+        
+        Args:
+            app_name: Name of the application
+            session: aiohttp-compatible client session; when omitted a
+                temporary pooled session is opened for this call
+            timeout: Time budget in seconds (None waits for every source)
             
-            return {
-                "app_name": app_name,
-                "energy_level": energy_level,
-                "confidence": confidence,
-                "category": best_category,
-                "normalized_tags": normalized_tags,
-                "raw_data": raw_data,
-                "error": None
-            }
+        Returns:
+            Dictionary mapping source name to its non-empty category list,
+            in DATA_SOURCES order
+        """
+        return (await self._async_collect_app_data(app_name, session, timeout))[0]
+    
+    def _build_result(self, app_name: str, raw_data: Dict[str, List[str]],
+                      skipped_sources: Optional[List[str]] = None,
+                      missing_sources: Optional[Dict[str, str]] = None,
+                      description: Optional[str] = None) -> Dict[str, any]:
+        """
+        Score fetched source data and build the process_application result.
+        
+        Args:
+            app_name: Name of the application
+            raw_data: Non-empty category lists keyed by source name
+            skipped_sources: Sources not queried because of the early exit
+            missing_sources: Sources without an answer, mapped to the reason
+            description: Store descriptions (see fetch_description)
             
-        except Exception as e:
+        Returns:
+            Dictionary containing processing results and energy level
+        """
+        if not raw_data:
             return {
                 "app_name": app_name,
                 "energy_level": "moderate-cpu",
@@ -233,23 +949,341 @@ class EnergyConsumptionCalculator:
                 "category": "others",
                 "normalized_tags": "",
                 "raw_data": {},
-                "error": str(e)
+                "skipped_sources": list(skipped_sources or []),
+                "missing_sources": dict(missing_sources or {}),
+                "error": None
             }
+        
+        # Combine all tags from different sources
+        all_tags = []
+        for source, tags in raw_data.items():
+            if tags:
+                all_tags.extend(tags)
+        
+        # Normalize tags
+        with metrics.stage("normalize"):
+            normalized_tags = self.normalize_tags(all_tags)
+        
+        # Match with predefined categories
+        with metrics.stage("match"):
+            best_category, confidence = self.match_categories(normalized_tags, description)
+        # Get energy level
+        energy_level = self.get_energy_level(best_category)
+        
+        return {
+            "app_name": app_name,
+            "energy_level": energy_level,
+            "confidence": confidence,
+            "category": best_category,
+            "normalized_tags": normalized_tags,
+            "raw_data": raw_data,
+            "skipped_sources": list(skipped_sources or []),
+            "missing_sources": dict(missing_sources or {}),
+            "error": None
+        }
+    
+    def _error_result(self, app_name: str, error: Exception) -> Dict[str, any]:
+        """Build the process_application result for a failed lookup."""
+        return {
+            "app_name": app_name,
+            "energy_level": "moderate-cpu",
+            "confidence": 0.0,
+            "category": "others",
+            "normalized_tags": "",
+            "raw_data": {},
+            "skipped_sources": [],
+            "missing_sources": {},
+            "error": str(error)
+        }
+    
+    def process_application(self, app_name: str, timeout: Optional[float] = None) -> Dict[str, any]:
+        """
+        Main processing function for the energy consumption calculator.
+        
+        Args:
+            app_name: Name of the application
+            timeout: Time budget in seconds; when it runs out the application
+                is classified from the sources that answered and the others
+                are listed in the result's missing_sources
+            
+        Returns:
+            Dictionary containing processing results and energy level (and
+            its "metrics" when collect_metrics is set, see metrics.py)
+        """
+        recorder = metrics.LookupMetrics() if self.collect_metrics else None
+        with metrics.lookup(recorder):
+            try:
+                with metrics.stage("fetch"):
+                    raw_data, skipped_sources, missing_sources = self._collect_app_data(app_name, timeout)
+                    description = self.fetch_description(app_name, raw_data) if self.use_descriptions else None
+                result = self._build_result(app_name, raw_data, skipped_sources, missing_sources, description)
+            except Exception as e:
+                result = self._error_result(app_name, e)
+        return self._add_metrics(result, recorder)
+    
+    async def async_process_application(self, app_name: str, session=None,
+                                        timeout: Optional[float] = None) -> Dict[str, any]:
+        """
+        Asyncio variant of process_application that never blocks the event loop
+        on network I/O.
+        
+        Args:
+            app_name: Name of the application
+            session: aiohttp-compatible client session shared between lookups
+                (a temporary one is opened when omitted)
+            timeout: Time budget in seconds (see process_application)
+            
+        Returns:
+            Dictionary containing processing results and energy level
+        """
+        recorder = metrics.LookupMetrics() if self.collect_metrics else None
+        with metrics.lookup(recorder):
+            try:
+                with metrics.stage("fetch"):
+                    raw_data, skipped_sources, missing_sources = await self._async_collect_app_data(
+                        app_name, session, timeout
+                    )
+                    description = None
+                    if self.use_descriptions:
+                        import asyncio
+                        
+                        # Cached descriptions and the pages the async
+                        # adapters memoized need no request
+                        description = await asyncio.to_thread(self.fetch_description, app_name, raw_data)
+                result = self._build_result(app_name, raw_data, skipped_sources, missing_sources, description)
+            except Exception as e:
+                result = self._error_result(app_name, e)
+        return self._add_metrics(result, recorder)
+    
+    @staticmethod
+    def _add_metrics(result: Dict[str, any], recorder: Optional[metrics.LookupMetrics]) -> Dict[str, any]:
+        """Attach the metrics of a lookup to its result and fold them into metrics.REGISTRY."""
+        if recorder is not None:
+            result["metrics"] = recorder.as_dict()
+            metrics.REGISTRY.observe(result["metrics"])
+        return result
+    
+    def process_applications(self, app_names: Iterable[str], concurrency: int = BATCH_CONCURRENCY,
+                             ordered: bool = True, timeout: Optional[float] = None) -> Iterator[Dict[str, any]]:
+        """
+        Process many applications concurrently, yielding results as they are ready.
+        
+        Names are pulled from app_names lazily and at most ``2 * concurrency``
+        lookups are in flight at any time, so any iterable (e.g. a generator
+        over a very large file) can be processed in constant memory.
+        
+        Args:
+            app_names: Iterable of application names
+            concurrency: Number of applications processed at the same time
+            ordered: Yield results in input order (True) or as soon as each
+                lookup completes (False)
+            timeout: Time budget in seconds of each lookup (see
+                process_application)
+            
+        Yields:
+            process_application result dictionaries
+        """
+        return self._map_applications(self.process_application, app_names, concurrency, ordered, timeout)
     
-    def calculate_energy_consumption(self, app_name: str) -> str:
+    def _collect_entry(self, app_name: str, timeout: Optional[float] = None):
+        """
+        Fetch the data of one application for classify_applications.
+        
+        Returns:
+            Tuple of (app_name, raw_data, skipped_sources, missing_sources,
+            description, fetch metrics or None), or the error result if the
+            lookup failed
+        """
+        recorder = metrics.LookupMetrics() if self.collect_metrics else None
+        with metrics.lookup(recorder):
+            try:
+                with metrics.stage("fetch"):
+                    raw_data, skipped_sources, missing_sources = self._collect_app_data(app_name, timeout)
+                    description = self.fetch_description(app_name, raw_data) if self.use_descriptions else None
+            except Exception as e:
+                result = self._error_result(app_name, e)
+                if recorder is not None:
+                    result["metrics"] = recorder.as_dict()
+                return result
+        fetch_metrics = None if recorder is None else recorder.as_dict()
+        return app_name, raw_data, skipped_sources, missing_sources, description, fetch_metrics
+    
+    def collect_applications(self, app_names: Iterable[str], concurrency: int = BATCH_CONCURRENCY,
+                             ordered: bool = True, timeout: Optional[float] = None) -> Iterator:
+        """
+        Fetch the data of many applications concurrently without classifying
+        them, e.g. to feed classify_applications.
+        
+        Takes the same arguments as process_applications.
+        
+        Yields:
+            (app_name, raw_data, skipped_sources, missing_sources,
+            description, fetch_metrics) tuples, or error result dictionaries
+            for failed lookups; fetch_metrics is None unless collect_metrics
+            is set
+        """
+        return self._map_applications(self._collect_entry, app_names, concurrency, ordered, timeout)
+    
+    def classify_applications(self, entries: Iterable, processes: Optional[int] = None,
+                              chunk_size: int = CLASSIFY_CHUNK_SIZE) -> Iterator[Dict[str, any]]:
+        """
+        Classify already fetched application data in worker processes.
+        
+        Scoring is pure Python (difflib), so threads do not speed it up;
+        this spreads it over processes instead. Entries are sent in chunks
+        to workers that each hold one calculator with this calculator's
+        categories, energy tags, confidence threshold and description
+        weight (and keep its keyword index and tag scores warm across
+        chunks). At most ``2 * processes`` chunks are in flight and results
+        are yielded in the order of entries.
+        
+        Workers are started with the "spawn" method, so a script calling
+        this needs the usual ``if __name__ == "__main__":`` guard.
+        
+        Entries carrying fetch metrics get them back in their result, with
+        the normalize and match timings of the worker, and are folded into
+        metrics.REGISTRY here.
+        
+        Args:
+            entries: Iterable of (app_name, raw_data) to (app_name, raw_data,
+                skipped_sources, missing_sources, description, fetch_metrics)
+                tuples, as yielded by collect_applications; result
+                dictionaries (failed lookups) are passed through unchanged
+            processes: Number of worker processes (defaults to the number of
+                CPUs)
+            chunk_size: Number of entries sent to a worker at a time
+            
+        Yields:
+            process_application result dictionaries
+        """
+        import multiprocessing
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        
+        processes = max(1, processes or os.cpu_count() or 1)
+        chunk_size = max(1, chunk_size)
+        entries = iter(entries)
+        # Workers are spawned, not forked: the lookup threads (and their
+        # locks and connection pools) are already running in this process
+        executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+            initargs=(self.categories, self.energy_tags, self.confidence_threshold, self.description_weight)
+        )
+        pending = deque()
+        
+        def submit_next() -> None:
+            chunk = list(islice(entries, chunk_size))
+            if chunk:
+                pending.append(executor.submit(_classify_chunk, chunk))
+        
+        try:
+            for _ in range(2 * processes):
+                submit_next()
+            
+            while pending:
+                results = pending.popleft().result()
+                submit_next()
+                for result in results:
+                    if "metrics" in result:
+                        metrics.REGISTRY.observe(result["metrics"])
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+    
+    def _map_applications(self, function, app_names: Iterable[str], concurrency: int, ordered: bool,
+                          timeout: Optional[float]) -> Iterator:
+        """Run function(app_name, timeout) over app_names in a bounded thread pool (see process_applications)."""
+        concurrency = max(1, concurrency)
+        names = iter(app_names)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        pending = deque() if ordered else set()
+        
+        def submit_next() -> None:
+            for app_name in islice(names, 1):
+                future = executor.submit(function, app_name, timeout)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+        
+        try:
+            for _ in range(2 * concurrency):
+                submit_next()
+            
+            if ordered:
+                while pending:
+                    result = pending.popleft().result()
+                    submit_next()
+                    yield result
+            else:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.discard(future)
+                        submit_next()
+                        yield future.result()
+        finally:
+            # Stop queued lookups if the consumer stops early
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+    
+    def calculate_energy_consumption(self, app_name: str, timeout: Optional[float] = None) -> str:
         """
         Simple function that returns just the energy level for an application.
         
         Args:
             app_name: Name of the application
+            timeout: Time budget in seconds (see process_application)
             
         Returns:
             Energy level string (low-cpu, moderate-cpu, high-cpu)
         """
-        result = self.process_application(app_name)
+        result = self.process_application(app_name, timeout)
         return result["energy_level"]
 
 
+# Calculator of a classify_applications worker process
+_worker_calculator = None
+
+
+def _init_worker(categories: Dict[str, set], energy_tags: Dict[str, str], confidence_threshold: float,
+                 description_weight: float = DESCRIPTION_WEIGHT) -> None:
+    """Build the calculator of a classify_applications worker process."""
+    global _worker_calculator
+    calculator = EnergyConsumptionCalculator(max_workers=1, single_flight=None)
+    calculator.categories = categories
+    calculator.energy_tags = energy_tags
+    calculator.confidence_threshold = confidence_threshold
+    calculator.description_weight = description_weight
+    calculator._get_keyword_index()  # Compile the index once, before the first chunk
+    _worker_calculator = calculator
+
+
+def _classify_chunk(entries: List) -> List[Dict[str, any]]:
+    """Classify a chunk of classify_applications entries in a worker process."""
+    calculator = _worker_calculator
+    results = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            results.append(entry)
+            continue
+        fetch_metrics = entry[5] if len(entry) > 5 else None
+        recorder = None if fetch_metrics is None else metrics.LookupMetrics()
+        try:
+            with metrics.lookup(recorder):
+                result = calculator._build_result(*entry[:5])
+        except Exception as e:
+            result = calculator._error_result(entry[0], e)
+        if recorder is not None:
+            timings = recorder.as_dict()
+            result["metrics"] = dict(fetch_metrics, normalize_ms=timings["normalize_ms"], match_ms=timings["match_ms"])
+        results.append(result)
+    return results
+
+
 # Main functions for use in main.py
 def normalize_tags(raw_tags: List[str]) -> str:
     """Normalize tags from different sources."""
@@ -268,6 +1302,258 @@ def get_energy_level(category: str) -> str:
     calculator = EnergyConsumptionCalculator()
     return calculator.get_energy_level(category)
 
+def _build_parser():
+    """Build the argument parser of the AppEnergy command-line interface."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        prog="AppEnergy",
+        description="Estimate the energy consumption level of an application."
+    )
+    parser.add_argument("app_name", nargs="*", help="Name of the application")
+    
+    batch_group = parser.add_argument_group("batch mode")
+    batch_group.add_argument("--batch", metavar="FILE",
+                             help="Read one application name per line from FILE ('-' for stdin) "
+                                  "and write one JSON result per line")
+    batch_group.add_argument("--output", "-o", metavar="FILE", default="-",
+                             help="Write batch results to FILE instead of stdout")
+    batch_group.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                             help="Number of applications looked up at the same time (default: %(default)s)")
+    batch_group.add_argument("--unordered", action="store_true",
+                             help="Write batch results as they complete instead of in input order")
+    batch_group.add_argument("--processes", type=int, nargs="?", const=0, default=None, metavar="N",
+                             help="Classify in N worker processes (default N: number of CPUs) while "
+                                  "lookups stay in this process")
+    batch_group.add_argument("--chunk-size", type=int, default=CLASSIFY_CHUNK_SIZE,
+                             help="Applications sent to a worker process at a time (default: %(default)s)")
+    
+    lookup_group = parser.add_argument_group("lookup")
+    lookup_group.add_argument("--early-exit", metavar="THRESHOLD", type=float, nargs="?",
+                              const=EARLY_EXIT_THRESHOLD, default=None,
+                              help="Stop querying sources once the category reaches THRESHOLD confidence "
+                                   "and the remaining sources are not expected to change it, based on their "
+                                   "usual tag counts (default THRESHOLD: %(const)s)")
+    lookup_group.add_argument("--descriptions", action="store_true",
+                              help="Also classify from the store descriptions of the sources that found the "
+                                   "application (weighted by DESCRIPTION_WEIGHT in config.py)")
+    lookup_group.add_argument("--timeout", metavar="SECONDS", type=float, default=None,
+                              help="Time budget of each lookup; sources that have not answered by then are "
+                                   "left out and listed in missing_sources")
+    lookup_group.add_argument("--hedge-after", metavar="SECONDS", type=float, nargs="?",
+                              const=HEDGE_AFTER, default=None,
+                              help="Re-send the requests of a source that has not answered after SECONDS "
+                                   "and use the first answer (default SECONDS: %(const)s)")
+    
+    metrics_group = parser.add_argument_group("metrics")
+    metrics_group.add_argument("--metrics", action="store_true",
+                               help="Add per-stage timings and per-source counters to each batch result")
+    metrics_group.add_argument("--metrics-output", metavar="FILE", default=None,
+                               help="Write the totals of all lookups to FILE at exit (Prometheus text if FILE "
+                                    "ends in .prom, JSON otherwise); implies --metrics")
+    
+    profile_group = parser.add_argument_group("profiling")
+    profile_group.add_argument("--profile", metavar="FILE", nargs="?", const="-", default=None,
+                               help="Run under cProfile and tracemalloc and write a time breakdown (network, "
+                                    "parsing, normalization, matching), a peak memory summary and the hottest "
+                                    "functions to FILE (default: stderr)")
+    profile_group.add_argument("--profile-sort", choices=("cumulative", "tottime", "calls"), default="cumulative",
+                               help="Order of the hot function list (default: %(default)s)")
+    profile_group.add_argument("--profile-limit", type=int, default=25, metavar="N",
+                               help="Number of hot functions listed (default: %(default)s)")
+    
+    cache_group = parser.add_argument_group("cache")
+    cache_mode = cache_group.add_mutually_exclusive_group()
+    cache_mode.add_argument("--no-cache", action="store_true",
+                            help="Bypass the lookup cache (neither read nor write it)")
+    cache_mode.add_argument("--refresh-cache", action="store_true",
+                            help="Ignore cached lookups and store fresh results")
+    cache_group.add_argument("--prune-cache", action="store_true",
+                             help="Delete expired cache entries")
+    cache_group.add_argument("--cache-path", default=None,
+                             help="Location of the cache file (default: $APPENERGY_CACHE or ~/.cache/AppEnergy/cache.sqlite3)")
+    return parser
+
+
+def _read_app_names(stream) -> Iterator[str]:
+    """Yield the non-blank lines of a text stream, stripped, one at a time."""
+    for line in stream:
+        app_name = line.strip()
+        if app_name:
+            yield app_name
+
+
+def _run_batch(calculator: EnergyConsumptionCalculator, args) -> None:
+    """
+    Stream the applications listed in args.batch through the calculator and
+    write one JSON line per result to args.output.
+    """
+    import json
+    import sys
+    
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        if args.processes is not None:
+            entries = calculator.collect_applications(
+                _read_app_names(source), concurrency=args.concurrency, ordered=not args.unordered,
+                timeout=args.timeout
+            )
+            results = calculator.classify_applications(entries, args.processes or None, args.chunk_size)
+        else:
+            results = calculator.process_applications(
+                _read_app_names(source), concurrency=args.concurrency, ordered=not args.unordered,
+                timeout=args.timeout
+            )
+        for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+        else:
+            output.flush()
+
+
+def _write_metrics(path: Optional[str]) -> None:
+    """Write the process-wide metrics to path (Prometheus text for .prom files, JSON otherwise)."""
+    if path is None:
+        return
+    import json
+    
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".prom"):
+            f.write(metrics.prometheus())
+        else:
+            json.dump(metrics.snapshot(), f, indent=2)
+
+
+def _write_profile(profiler, args, title: str) -> None:
+    """Write the report of a profiled run to args.profile ('-' for stderr)."""
+    if profiler is None or not profiler.threads:
+        return
+    import sys
+    
+    report = profiler.report(title, sort=args.profile_sort, limit=args.profile_limit)
+    if args.profile == "-":
+        sys.stderr.write(report)
+    else:
+        with open(args.profile, "w", encoding="utf-8") as f:
+            f.write(report)
+
+
+def _sync_catalog(argv: List[str]) -> None:
+    """
+    ``AppEnergy sync-catalog``: download or refresh the local Flathub and
+    Snapcraft catalog mirror used by their get_categories.
+    
+    The mirror is written to CATALOG_PATH, the file lookups read
+    ($APPENERGY_CATALOG moves both).
+    """
+    import argparse
+    import sys
+    from .data_sources import catalog_mirror
+    
+    parser = argparse.ArgumentParser(
+        prog="AppEnergy sync-catalog",
+        description="Mirror the Flathub and Snapcraft catalogs locally for offline lookups "
+                    "(in $APPENERGY_CATALOG, default ~/.cache/AppEnergy/catalog.sqlite3)."
+    )
+    parser.add_argument("--source", choices=sorted(catalog_mirror.SYNCERS), action="append",
+                        help="Store to mirror (repeatable; default: all)")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-download every listing instead of only the changed ones")
+    args = parser.parse_args(argv)
+    
+    mirror = catalog_mirror.CatalogMirror()
+    failed = False
+    try:
+        for source in args.source or list(catalog_mirror.SYNCERS):
+            try:
+                summary = catalog_mirror.SYNCERS[source](mirror, full=args.full)
+            except Exception as e:
+                print(f"{source}: sync failed ({e})", file=sys.stderr)
+                failed = True
+                continue
+            print(f"{source}: {summary['apps']} apps, {summary['changed']} of {summary['feeds']} listings updated")
+    finally:
+        mirror.close()
+    sys.exit(1 if failed else 0)
+
+
+def _serve(argv: List[str]) -> None:
+    """
+    ``AppEnergy serve``: answer classifications over HTTP/JSON from one warm
+    calculator (see server.py).
+    """
+    import argparse
+    from .config import SERVE_HOST, SERVE_PORT
+    from .server import ClassificationServer, warm_up
+    
+    parser = argparse.ArgumentParser(
+        prog="AppEnergy serve",
+        description="Serve classifications over local HTTP/JSON with warm caches and connections."
+    )
+    parser.add_argument("--host", default=SERVE_HOST, help="Address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="Port to listen on (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="Applications looked up at the same time per batch request (default: %(default)s)")
+    parser.add_argument("--quiet", action="store_true", help="Do not log requests")
+    parser.add_argument("--early-exit", metavar="THRESHOLD", type=float, nargs="?",
+                        const=EARLY_EXIT_THRESHOLD, default=None,
+                        help="See AppEnergy --help (default THRESHOLD: %(const)s)")
+    parser.add_argument("--hedge-after", metavar="SECONDS", type=float, nargs="?",
+                        const=HEDGE_AFTER, default=None,
+                        help="See AppEnergy --help (default SECONDS: %(const)s)")
+    parser.add_argument("--descriptions", action="store_true", help="See AppEnergy --help")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the lookup cache")
+    parser.add_argument("--cache-path", default=None, help="Location of the cache file")
+    parser.add_argument("--no-metrics", action="store_true",
+                        help="Do not instrument lookups (GET /metrics then stays empty)")
+    args = parser.parse_args(argv)
+    
+    cache, resolutions = _open_caches(args.cache_path, args.no_cache)
+    resolution.set_index(resolutions)
+    calculator = EnergyConsumptionCalculator(cache=cache, early_exit_threshold=args.early_exit,
+                                             hedge_after=args.hedge_after, collect_metrics=not args.no_metrics,
+                                             use_descriptions=args.descriptions)
+    calculator._get_keyword_index()
+    warm_up()
+    
+    server = ClassificationServer((args.host, args.port), calculator, args.concurrency, quiet=args.quiet)
+    print(f"AppEnergy serving on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# Subcommands of the command-line interface, dispatched on the first argument
+COMMANDS = {
+    "sync-catalog": _sync_catalog,
+    "serve": _serve,
+}
+
+
+def _open_caches(cache_path: Optional[str], no_cache: bool) -> Tuple[Optional[CategoryCache], Optional[ResolutionIndex]]:
+    """
+    Open the lookup cache and the resolution index of the CLI.
+    
+    Returns:
+        Tuple of (cache, resolutions), both None if caching is disabled or
+        the cache file is unusable
+    """
+    if no_cache:
+        return None, None
+    try:
+        return CategoryCache(cache_path), ResolutionIndex(cache_path)
+    except Exception:
+        return None, None  # Run uncached if the cache file is unusable
+
+
 def calculate_energy_consumption():
     """
     Command-line interface to calculate energy consumption for an application.
@@ -280,24 +1566,67 @@ def calculate_energy_consumption():
     """
     import sys
     
+    if sys.argv[1:2] and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+    
+    parser = _build_parser()
+    args = parser.parse_args()
+    app_name = ' '.join(args.app_name)
+    if args.batch and app_name:
+        parser.error("an application name cannot be combined with --batch")
+    
+    cache, resolutions = _open_caches(args.cache_path, args.no_cache)
+    resolution.set_index(resolutions, refresh=args.refresh_cache)
+    
+    if args.prune_cache and cache is not None:
+        pruned = cache.prune() + resolutions.prune()
+        if not app_name and not args.batch:
+            print(f"Pruned {pruned} expired cache entries")
+            sys.exit(0)
+    
+    collect_metrics = args.metrics or args.metrics_output is not None
+    profiler = None
+    if args.profile is not None:
+        from .profiling import Profiler
+        profiler = Profiler()
+    
+    if args.batch:
+        calculator = EnergyConsumptionCalculator(cache=cache, refresh_cache=args.refresh_cache,
+                                                 early_exit_threshold=args.early_exit,
+                                                 hedge_after=args.hedge_after, collect_metrics=collect_metrics,
+                                                 use_descriptions=args.descriptions)
+        try:
+            with profiler or nullcontext():
+                _run_batch(calculator, args)
+        finally:
+            _write_metrics(args.metrics_output)
+            _write_profile(profiler, args, f"AppEnergy --batch {args.batch}")
+        return
+    
     # Check if app name is provided as command line argument
-    if len(sys.argv) < 2:
+    if not app_name:
         print("Opps! Try again Please")
         sys.exit(1)
     
-    app_name = ' '.join(sys.argv[1:])
-    
     # Calculate and output energy level
     try:
-        calculator = EnergyConsumptionCalculator()
-        energy_level = calculator.calculate_energy_consumption(app_name)
+        calculator = EnergyConsumptionCalculator(cache=cache, refresh_cache=args.refresh_cache,
+                                                 early_exit_threshold=args.early_exit,
+                                                 hedge_after=args.hedge_after, collect_metrics=collect_metrics,
+                                                 use_descriptions=args.descriptions)
+        with profiler or nullcontext():
+            energy_level = calculator.calculate_energy_consumption(app_name, timeout=args.timeout)
         print(energy_level)
     except Exception as e:
         print("moderate-cpu")  # Default fallback
         sys.exit(1)
+    finally:
+        _write_metrics(args.metrics_output)
+        _write_profile(profiler, args, f"AppEnergy {app_name!r}")
 
 if __name__ == "__main__":
-    main()
+    calculate_energy_consumption()
 
 
 
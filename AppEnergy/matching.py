@@ -0,0 +1,426 @@
+"""
+Precompiled keyword index for category matching.
+
+The index answers, for one normalized tag, the best-match score the fuzzy
+matcher of EnergyConsumptionCalculator.calculate_category_confidence would
+give it in every category, without comparing the tag against every keyword:
+
+* exact matches come from a keyword -> categories map,
+* keywords containing the tag come from a character trigram inverted index
+  (short tags use a map of all 1-2 character keyword substrings),
+* keywords contained in the tag are looked up among the tag's substrings,
+* fuzzy (difflib) candidates come from character postings, which give the
+  multiset-intersection upper bound of ``SequenceMatcher.ratio`` (the same
+  bound as ``quick_ratio``); only keywords whose bound passes the 0.7 cut-off
+  are compared with difflib.
+
+Because every pruning step only discards keywords that provably cannot score,
+the scores are identical to the exhaustive loop.
+
+Score vectors only depend on the tag, so TagScoreCache memoizes them across
+applications, and batch_confidences scores many applications from one
+vocabulary x category score matrix (with NumPy when it is installed).
+
+DescriptionScanner counts category keywords in free text (store
+descriptions) with a word-level Aho-Corasick automaton: multi-word keywords
+such as ``video_call`` match the phrase "video call", and the whole text is
+scanned in one pass whatever the number of keywords.
+"""
+import difflib
+import math
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, defaultdict, deque
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+from .config import TAG_SCORE_CACHE_SIZE
+
+# Scores given by the fuzzy matcher (see calculate_category_confidence)
+EXACT_MATCH_SCORE = 1.0
+SUBSTRING_MATCH_SCORE = 0.8
+FUZZY_MATCH_WEIGHT = 0.6
+FUZZY_MATCH_CUTOFF = 0.7
+
+NGRAM_SIZE = 3
+
+# Words of descriptions and of (underscore-separated) keywords
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _ngrams(text: str, size: int = NGRAM_SIZE):
+    """Return the set of character n-grams of a string."""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class KeywordIndex:
+    """Inverted index over the keywords of a set of categories"""
+
+    def __init__(self, categories: Dict[str, set]):
+        """
+        Args:
+            categories: Mapping of category name to its keyword set
+        """
+        self.category_names = list(categories)
+        self._snapshot = {name: frozenset(keywords) for name, keywords in categories.items()}
+
+        keyword_categories = defaultdict(list)
+        for position, keywords in enumerate(self._snapshot.values()):
+            for keyword in keywords:
+                keyword_categories[keyword].append(position)
+        self._keyword_categories = {k: tuple(v) for k, v in keyword_categories.items()}
+        self._keyword_lengths = sorted({len(keyword) for keyword in self._keyword_categories})
+
+        self._trigrams = defaultdict(set)
+        self._short_substrings = defaultdict(set)
+        self._char_postings = defaultdict(list)
+        for keyword in self._keyword_categories:
+            for trigram in _ngrams(keyword):
+                self._trigrams[trigram].add(keyword)
+            for size in range(1, NGRAM_SIZE):
+                for substring in _ngrams(keyword, size):
+                    self._short_substrings[substring].add(keyword)
+            for char, count in Counter(keyword).items():
+                self._char_postings[char].append((keyword, count))
+        # Postings sorted by keyword length, so _fuzzy_candidates only visits
+        # the keywords whose length can pass the cut-off
+        self._posting_lengths = {}
+        for char, postings in self._char_postings.items():
+            postings.sort(key=lambda posting: len(posting[0]))
+            self._posting_lengths[char] = [len(keyword) for keyword, _ in postings]
+
+    def matches(self, categories: Dict[str, set]) -> bool:
+        """
+        Check whether the index was built from these categories.
+
+        Args:
+            categories: Mapping of category name to its keyword set
+
+        Returns:
+            True if the category names, order and keywords are unchanged
+        """
+        return _same_categories(self._snapshot, self.category_names, categories)
+
+    def position(self, category_name: str, category_keywords: set):
+        """
+        Get the score-vector position of a category.
+
+        Returns:
+            Index into the vectors returned by score_tag, or None if the
+            category is unknown or its keywords differ from the indexed ones
+        """
+        indexed = self._snapshot.get(category_name)
+        if indexed is None or indexed != category_keywords:
+            return None
+        return self.category_names.index(category_name)
+
+    def _superstrings(self, tag: str):
+        """Keywords that contain the tag."""
+        if not tag:
+            return self._keyword_categories.keys()
+        if len(tag) < NGRAM_SIZE:
+            return self._short_substrings.get(tag, ())
+
+        postings = sorted((self._trigrams.get(trigram, set()) for trigram in _ngrams(tag)), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return [keyword for keyword in candidates if tag in keyword]
+
+    def _substrings(self, tag: str):
+        """Keywords contained in the tag."""
+        found = []
+        for size in self._keyword_lengths:
+            if size > len(tag):
+                break
+            for i in range(len(tag) - size + 1):
+                substring = tag[i:i + size]
+                if substring in self._keyword_categories:
+                    found.append(substring)
+        return found
+
+    def _fuzzy_candidates(self, tag: str) -> List[str]:
+        """Keywords whose ratio upper bound exceeds the fuzzy cut-off."""
+        tag_length = len(tag)
+        # Length bound: 2 * min(lengths) / (sum of lengths) must exceed the
+        # cut-off (rounded outwards; the exact test is the multiset bound below)
+        shortest = math.floor(FUZZY_MATCH_CUTOFF * tag_length / (2 - FUZZY_MATCH_CUTOFF))
+        longest = math.ceil((2 - FUZZY_MATCH_CUTOFF) * tag_length / FUZZY_MATCH_CUTOFF)
+
+        intersections = defaultdict(int)
+        for char, tag_count in Counter(tag).items():
+            postings = self._char_postings.get(char)
+            if not postings:
+                continue
+            lengths = self._posting_lengths[char]
+            for keyword, keyword_count in islice(postings, bisect_left(lengths, shortest),
+                                                 bisect_right(lengths, longest)):
+                intersections[keyword] += tag_count if tag_count < keyword_count else keyword_count
+
+        return [
+            keyword for keyword, matches in intersections.items()
+            if 2.0 * matches / (tag_length + len(keyword)) > FUZZY_MATCH_CUTOFF
+        ]
+
+    def score_tag(self, tag: str) -> Tuple[float, ...]:
+        """
+        Compute the best-match score of a tag in every category.
+
+        Args:
+            tag: Single normalized tag
+
+        Returns:
+            Tuple of scores in category_names order
+        """
+        scores = [0.0] * len(self.category_names)
+
+        # Direct match
+        for position in self._keyword_categories.get(tag, ()):
+            scores[position] = EXACT_MATCH_SCORE
+
+        # Tag is substring of keyword or vice versa
+        for keyword in (*self._superstrings(tag), *self._substrings(tag)):
+            for position in self._keyword_categories[keyword]:
+                if scores[position] < SUBSTRING_MATCH_SCORE:
+                    scores[position] = SUBSTRING_MATCH_SCORE
+
+        # Fuzzy matching only matters for categories without a better match
+        if not all(scores):
+            for keyword in self._fuzzy_candidates(tag):
+                positions = self._keyword_categories[keyword]
+                if all(scores[position] >= SUBSTRING_MATCH_SCORE for position in positions):
+                    continue
+                similarity = difflib.SequenceMatcher(None, tag, keyword).ratio()
+                if similarity > FUZZY_MATCH_CUTOFF:
+                    score = similarity * FUZZY_MATCH_WEIGHT
+                    for position in positions:
+                        if scores[position] < score:
+                            scores[position] = score
+
+        return tuple(scores)
+
+
+def _same_categories(snapshot: Dict[str, frozenset], category_names: List[str], categories: Dict[str, set]) -> bool:
+    """Check whether categories has the names, order and keywords of a snapshot."""
+    return (
+        len(categories) == len(snapshot)
+        and all(categories.get(name) == keywords for name, keywords in snapshot.items())
+        and list(categories) == category_names
+    )
+
+
+class DescriptionScanner:
+    """Word-level Aho-Corasick automaton over the keywords of a set of categories"""
+
+    def __init__(self, categories: Dict[str, set]):
+        """
+        Args:
+            categories: Mapping of category name to its keyword set
+        """
+        self.category_names = list(categories)
+        self._snapshot = {name: frozenset(keywords) for name, keywords in categories.items()}
+
+        phrases = defaultdict(list)
+        for position, keywords in enumerate(self._snapshot.values()):
+            for keyword in keywords:
+                words = tuple(_WORD.findall(keyword.lower()))
+                if words:
+                    phrases[words].append(position)
+
+        # Trie of the keyword phrases, one word per edge
+        goto = [{}]
+        outputs = [[]]
+        for words, positions in phrases.items():
+            state = 0
+            for word in words:
+                next_state = goto[state].get(word)
+                if next_state is None:
+                    next_state = goto[state][word] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].extend(positions)
+
+        # Failure links in breadth-first order. Each state keeps the
+        # transitions of its failure chain except the root's, which are the
+        # fallback of every state, so the scan never walks the chain.
+        fail = [0] * len(goto)
+        transitions = [{} for _ in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            outputs[state].extend(outputs[fail[state]])
+            for word, child in goto[state].items():
+                target = transitions[fail[state]].get(word)
+                fail[child] = target if target is not None else goto[0].get(word, 0)
+                queue.append(child)
+
+        self._root = goto[0]
+        self._transitions = transitions
+        self._outputs = [tuple(positions) for positions in outputs]
+
+    def matches(self, categories: Dict[str, set]) -> bool:
+        """
+        Check whether the scanner was built from these categories.
+
+        Args:
+            categories: Mapping of category name to its keyword set
+
+        Returns:
+            True if the category names, order and keywords are unchanged
+        """
+        return _same_categories(self._snapshot, self.category_names, categories)
+
+    def category_hits(self, text: str) -> List[int]:
+        """
+        Count the keyword occurrences of every category in a text.
+
+        Words are compared case-insensitively; a keyword listed in several
+        categories counts for each of them.
+
+        Args:
+            text: Free text, e.g. a store description
+
+        Returns:
+            Hit count per category, in category_names order
+        """
+        root = self._root
+        transitions = self._transitions
+        outputs = self._outputs
+        hits = [0] * len(self.category_names)
+        state = 0
+        for word in _WORD.findall(text.lower()):
+            if state:
+                next_state = transitions[state].get(word)
+                state = next_state if next_state is not None else root.get(word, 0)
+            else:
+                state = root.get(word, 0)
+            if state:
+                for position in outputs[state]:
+                    hits[position] += 1
+        return hits
+
+
+def batch_confidences(tag_lists: List[List[int]], score_vectors: List[Tuple[float, ...]],
+                      use_numpy: Optional[bool] = None) -> List[List[float]]:
+    """
+    Compute the category confidences of many applications.
+
+    Tags are given as rows of the vocabulary score matrix. Every
+    application's scores are summed tag by tag, in tag order, exactly like
+    match_categories does, so both paths give bit-identical confidences.
+
+    Args:
+        tag_lists: Per application, the vocabulary positions of its tags
+            (an empty list scores 0.0 everywhere)
+        score_vectors: Score vector of every vocabulary tag
+        use_numpy: Use NumPy (True), the pure-Python loop (False), or NumPy
+            only if it can be imported (None)
+
+    Returns:
+        Per application, its confidence in every category
+    """
+    width = len(score_vectors[0]) if score_vectors else 0
+    if use_numpy is None:
+        try:
+            import numpy  # noqa: F401
+            use_numpy = True
+        except ImportError:
+            use_numpy = False
+
+    if not use_numpy:
+        confidences = []
+        for tags in tag_lists:
+            totals = [0.0] * width
+            for tag in tags:
+                scores = score_vectors[tag]
+                for position in range(width):
+                    totals[position] += scores[position]
+            confidences.append([total / len(tags) for total in totals] if tags else [0.0] * width)
+        return confidences
+
+    import numpy as np
+
+    # One extra all-zero row pads shorter tag lists; adding 0.0 is exact
+    matrix = np.zeros((len(score_vectors) + 1, width))
+    if score_vectors:
+        matrix[:-1] = score_vectors
+    lengths = np.array([len(tags) for tags in tag_lists], dtype=np.intp)
+    rows = np.full((len(tag_lists), int(lengths.max(initial=0))), len(score_vectors), dtype=np.intp)
+    for i, tags in enumerate(tag_lists):
+        rows[i, :len(tags)] = tags
+
+    # Column by column rather than matrix.sum(), whose pairwise summation
+    # could round differently from the sequential loop
+    totals = np.zeros((len(tag_lists), width))
+    for column in rows.T:
+        totals += matrix[column]
+    return (totals / np.maximum(lengths, 1)[:, None]).tolist()
+
+
+class TagScoreCache:
+    """Thread-safe LRU cache mapping a normalized tag to its score vector"""
+
+    def __init__(self, maxsize: int = TAG_SCORE_CACHE_SIZE):
+        """
+        Args:
+            maxsize: Maximum number of cached tags (0 disables caching)
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, tag: str) -> Optional[Tuple[float, ...]]:
+        """
+        Look up the score vector of a tag.
+
+        Returns:
+            Cached score vector, or None on a miss
+        """
+        with self._lock:
+            scores = self._entries.get(tag)
+            if scores is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(tag)
+            self.hits += 1
+            return scores
+
+    def put(self, tag: str, scores: Tuple[float, ...]) -> None:
+        """Store the score vector of a tag, evicting the least recently used one."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[tag] = scores
+            self._entries.move_to_end(tag)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached vectors (the hit/miss counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters.
+
+        Returns:
+            Dictionary with hits, misses, size and maxsize
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,306 @@
+"""
+Per-lookup and process-wide instrumentation.
+
+A calculator created with ``collect_metrics=True`` records, for every
+lookup, the time spent fetching (in total and per source), normalizing and
+matching, the HTTP requests and bytes of each source, its cache hits and the
+errors its get_categories swallowed. The numbers are added to the lookup's
+result under "metrics" and folded into the process-wide REGISTRY, which can
+be exported as JSON (``snapshot``) or Prometheus text (``prometheus``).
+
+The recorder of the current lookup (and the source being fetched) is kept
+in a context variable, so the hooks in the data sources need no extra
+arguments. Without a recorder every hook returns after a single context
+variable lookup.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+# Longest error message kept per error
+MAX_ERROR_LENGTH = 200
+
+# (LookupMetrics, source name or None) of the current context
+_scope = contextvars.ContextVar("metrics_scope", default=None)
+
+_NULL = nullcontext()
+
+
+class LookupMetrics:
+    """Timings and counters of one process_application call"""
+
+    def __init__(self):
+        self.stages = {}
+        self.sources = {}
+        self._lock = threading.Lock()  # Sources are fetched from several threads
+
+    def source(self, name: str) -> Dict[str, Any]:
+        """Get the counters of a source, creating them on first use."""
+        with self._lock:
+            entry = self.sources.get(name)
+            if entry is None:
+                entry = self.sources[name] = {
+                    "status": None, "fetch_ms": 0.0, "requests": 0, "bytes": 0, "cache_hits": 0, "errors": [],
+                }
+            return entry
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage of the lookup (fetch, normalize or match)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Get the metrics of the lookup.
+
+        Returns:
+            Dictionary with fetch_ms, normalize_ms and match_ms, the totals
+            requests, bytes and cache_hits, and per-source details
+        """
+        with self._lock:
+            sources = {name: dict(entry, errors=list(entry["errors"])) for name, entry in self.sources.items()}
+            stages = dict(self.stages)
+        return {
+            "fetch_ms": stages.get("fetch", 0.0),
+            "normalize_ms": stages.get("normalize", 0.0),
+            "match_ms": stages.get("match", 0.0),
+            "requests": sum(entry["requests"] for entry in sources.values()),
+            "bytes": sum(entry["bytes"] for entry in sources.values()),
+            "cache_hits": sum(entry["cache_hits"] for entry in sources.values()),
+            "sources": sources,
+        }
+
+
+def lookup(recorder: Optional[LookupMetrics]):
+    """
+    Make recorder the recorder of the current context.
+
+    Args:
+        recorder: Recorder of the lookup (None: no instrumentation)
+
+    Returns:
+        Context manager
+    """
+    if recorder is None:
+        return _NULL
+    return _bind(recorder, None)
+
+
+@contextmanager
+def _bind(recorder: LookupMetrics, source: Optional[str]):
+    token = _scope.set((recorder, source))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def active() -> bool:
+    """Check whether the current context belongs to an instrumented lookup."""
+    return _scope.get() is not None
+
+
+def stage(name: str):
+    """Time a stage of the current lookup (a no-op without a recorder)."""
+    scope = _scope.get()
+    if scope is None:
+        return _NULL
+    return scope[0].stage(name)
+
+
+@contextmanager
+def _timed_source(recorder: LookupMetrics, name: str):
+    entry = recorder.source(name)
+    started = time.perf_counter()
+    token = _scope.set((recorder, name))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+        elapsed = (time.perf_counter() - started) * 1000
+        with recorder._lock:
+            entry["fetch_ms"] += elapsed
+
+
+def source(name: str):
+    """
+    Attribute the requests, cache hits and errors of the enclosed code to a
+    source, and time it (a no-op without a recorder).
+    """
+    scope = _scope.get()
+    if scope is None:
+        return _NULL
+    return _timed_source(scope[0], name)
+
+
+def _current_source():
+    """(recorder, counters) of the source being fetched in the current context, or None."""
+    scope = _scope.get()
+    if scope is None or scope[1] is None:
+        return None
+    return scope[0], scope[0].source(scope[1])
+
+
+def record_request(nbytes: int) -> None:
+    """Count an HTTP request of the current source and the bytes it downloaded."""
+    current = _current_source()
+    if current is not None:
+        recorder, entry = current
+        with recorder._lock:
+            entry["requests"] += 1
+            entry["bytes"] += nbytes
+
+
+def record_cache_hit(source_name: Optional[str] = None) -> None:
+    """Count a cache hit of a source (default: the current source)."""
+    scope = _scope.get()
+    if scope is None:
+        return
+    recorder = scope[0]
+    name = source_name or scope[1]
+    if name is None:
+        return
+    entry = recorder.source(name)
+    with recorder._lock:
+        entry["cache_hits"] += 1
+
+
+def record_error(error: BaseException) -> None:
+    """Record an error swallowed by the current source."""
+    current = _current_source()
+    if current is not None:
+        recorder, entry = current
+        with recorder._lock:
+            entry["errors"].append(f"{type(error).__name__}: {error}"[:MAX_ERROR_LENGTH])
+
+
+def set_status(source_name: str, status: str) -> None:
+    """Set the outcome of a source in the current lookup (cached, fetched, timeout, ...)."""
+    scope = _scope.get()
+    if scope is not None:
+        recorder = scope[0]
+        entry = recorder.source(source_name)
+        with recorder._lock:
+            entry["status"] = status
+
+
+class Registry:
+    """Process-wide totals of the instrumented lookups"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero every total."""
+        with self._lock:
+            self.lookups = 0
+            self.stage_seconds = {"fetch": 0.0, "normalize": 0.0, "match": 0.0}
+            self.sources = {}
+
+    def observe(self, lookup_metrics: Dict[str, Any]) -> None:
+        """
+        Fold the metrics of a lookup into the totals.
+
+        Args:
+            lookup_metrics: LookupMetrics.as_dict() of the lookup
+        """
+        with self._lock:
+            self.lookups += 1
+            for stage_name in self.stage_seconds:
+                self.stage_seconds[stage_name] += lookup_metrics[f"{stage_name}_ms"] / 1000
+            for name, entry in lookup_metrics["sources"].items():
+                totals = self.sources.setdefault(name, {
+                    "fetches": 0, "fetch_seconds": 0.0, "requests": 0, "bytes": 0, "cache_hits": 0, "errors": 0,
+                    "statuses": {},
+                })
+                if entry["fetch_ms"]:
+                    totals["fetches"] += 1
+                    totals["fetch_seconds"] += entry["fetch_ms"] / 1000
+                totals["requests"] += entry["requests"]
+                totals["bytes"] += entry["bytes"]
+                totals["cache_hits"] += entry["cache_hits"]
+                totals["errors"] += len(entry["errors"])
+                if entry["status"]:
+                    totals["statuses"][entry["status"]] = totals["statuses"].get(entry["status"], 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the totals as a JSON-serializable dictionary.
+
+        Returns:
+            Dictionary with lookups, stage_seconds and per-source totals
+        """
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "stage_seconds": dict(self.stage_seconds),
+                "sources": {
+                    name: dict(totals, statuses=dict(totals["statuses"]))
+                    for name, totals in self.sources.items()
+                },
+            }
+
+    def prometheus(self) -> str:
+        """
+        Get the totals in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text, one sample per line
+        """
+        snapshot = self.snapshot()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP appenergy_{name} {help_text}")
+            lines.append(f"# TYPE appenergy_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                lines.append(f"appenergy_{name}{{{label_text}}} {value}" if label_text else f"appenergy_{name} {value}")
+
+        sources = snapshot["sources"]
+        metric("lookups_total", "counter", "Instrumented process_application calls.", [({}, snapshot["lookups"])])
+        metric("stage_seconds_total", "counter", "Time spent per lookup stage.",
+               [({"stage": name}, value) for name, value in snapshot["stage_seconds"].items()])
+        metric("source_fetch_seconds_total", "counter", "Time spent fetching from each source.",
+               [({"source": name}, totals["fetch_seconds"]) for name, totals in sources.items()])
+        metric("source_fetches_total", "counter", "Fetches from each source.",
+               [({"source": name}, totals["fetches"]) for name, totals in sources.items()])
+        metric("source_requests_total", "counter", "HTTP requests sent by each source.",
+               [({"source": name}, totals["requests"]) for name, totals in sources.items()])
+        metric("source_bytes_total", "counter", "Bytes downloaded by each source.",
+               [({"source": name}, totals["bytes"]) for name, totals in sources.items()])
+        metric("source_cache_hits_total", "counter", "Cache hits of each source.",
+               [({"source": name}, totals["cache_hits"]) for name, totals in sources.items()])
+        metric("source_errors_total", "counter", "Errors swallowed by each source.",
+               [({"source": name}, totals["errors"]) for name, totals in sources.items()])
+        metric("source_results_total", "counter", "Outcome of each source per lookup.",
+               [({"source": name, "status": status}, count)
+                for name, totals in sources.items() for status, count in totals["statuses"].items()])
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY = Registry()
+
+
+def snapshot() -> Dict[str, Any]:
+    """Process-wide totals as JSON (see Registry.snapshot)."""
+    return REGISTRY.snapshot()
+
+
+def prometheus() -> str:
+    """Process-wide totals as Prometheus text (see Registry.prometheus)."""
+    return REGISTRY.prometheus()
@@ -0,0 +1,218 @@
+"""
+Built-in profiling of CLI runs (``AppEnergy --profile``).
+
+Profiler runs a lookup or a batch under cProfile and tracemalloc. Sources
+are fetched from worker threads, which a single cProfile.Profile does not
+see, so every thread started while profiling gets its own profiler and the
+results are merged at the end. The report gives:
+
+* a breakdown of the profiled time into network wait, HTML parsing, tag
+  normalization, category matching, idle time (lock waits and sleeps, e.g.
+  the main thread waiting for its fetch threads) and everything else;
+* the peak traced memory and the allocation sites still holding the most
+  memory at the end of the run;
+* the hottest functions, sorted by cumulative or own time.
+
+Thread times are summed, so with concurrent fetches the breakdown adds up
+to more than the wall time. Classification in worker processes
+(``--processes``) is not profiled. cProfile and tracemalloc slow Python
+code down considerably; compare the shares, not absolute times, with
+unprofiled runs.
+"""
+import cProfile
+import io
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Number of allocation sites listed in the memory summary
+TOP_ALLOCATIONS = 10
+
+# Built-in functions whose own time is spent waiting on the network
+_NETWORK = re.compile(r"(?:'|built-in method )(?:_socket|_ssl|select)\.")
+# Modules whose own time is spent parsing store pages and API responses
+_PARSING_FILES = re.compile(
+    r"[\\/](?:bs4|soupsieve|html5lib|lxml|json)[\\/]|[\\/]html[\\/]parser\.py$|[\\/]_markupbase\.py$"
+)
+_PARSING_BUILTINS = re.compile(r"(?:'|built-in method )(?:_json|lxml\.|pyexpat)")
+# Built-in functions whose own time is spent blocked on another thread or sleeping
+_IDLE = re.compile(r"'_thread\.(?:lock|RLock)' objects|built-in method time\.sleep")
+
+
+def _default_stages() -> Dict[str, Tuple[Callable, ...]]:
+    from .main import EnergyConsumptionCalculator
+
+    return {
+        "tag normalization": (EnergyConsumptionCalculator.normalize_tags,),
+        "category matching": (EnergyConsumptionCalculator.match_categories,),
+    }
+
+
+def _function_key(function: Callable) -> Tuple[str, int, str]:
+    """Get the pstats key (file, line, name) of a Python function."""
+    code = function.__code__
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class Profiler:
+    """Context manager profiling the code it encloses, in every thread"""
+
+    def __init__(self, trace_memory: bool = True, stages: Optional[Dict[str, Iterable[Callable]]] = None):
+        """
+        Args:
+            trace_memory: Also trace allocations with tracemalloc
+            stages: Breakdown stages measured by the cumulative time of their
+                functions (default: normalize_tags and match_categories)
+        """
+        self.trace_memory = trace_memory
+        self.stages = stages
+        self.wall_time = 0.0
+        self.peak_memory = 0
+        self.final_memory = 0
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._started = 0.0
+
+    def __enter__(self) -> "Profiler":
+        if self.trace_memory:
+            tracemalloc.start()
+        main_profile = cProfile.Profile()
+        self._profiles = [main_profile]
+        threading.setprofile(self._start_thread)
+        self._started = time.perf_counter()
+        main_profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._profiles[0].disable()
+        self.wall_time = time.perf_counter() - self._started
+        threading.setprofile(None)
+        if self.trace_memory:
+            self.final_memory, self.peak_memory = tracemalloc.get_traced_memory()
+            self._snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ))
+            tracemalloc.stop()
+
+    def _start_thread(self, frame, event, arg) -> None:
+        """Profile hook of new threads: replace itself with a profiler of the thread."""
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    @property
+    def threads(self) -> int:
+        """Number of profiled threads."""
+        return len(self._profiles)
+
+    def stats(self) -> pstats.Stats:
+        """
+        Get the profile of all threads.
+
+        Returns:
+            Merged pstats.Stats
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            # Stats() disables the profiler, which only unhooks the calling
+            # thread; the other threads have finished or sit idle in their pool
+            stats.add(pstats.Stats(profile))
+        return stats
+
+    def breakdown(self, stats: Optional[pstats.Stats] = None) -> Dict[str, float]:
+        """
+        Split the profiled time into stages.
+
+        Args:
+            stats: Profile to split (default: stats())
+
+        Returns:
+            Seconds per stage (network wait, HTML parsing, tag normalization,
+            category matching, idle, other), summed over threads
+        """
+        stats = stats or self.stats()
+        stages = self.stages if self.stages is not None else _default_stages()
+        seconds = {"network wait": 0.0, "HTML parsing": 0.0}
+        seconds.update((name, 0.0) for name in stages)
+        seconds["idle"] = 0.0
+
+        total = 0.0
+        for (filename, _, name), (_, _, own_time, _, _) in stats.stats.items():
+            total += own_time
+            if filename == "~":
+                if _NETWORK.search(name):
+                    seconds["network wait"] += own_time
+                elif _PARSING_BUILTINS.search(name):
+                    seconds["HTML parsing"] += own_time
+                elif _IDLE.search(name):
+                    seconds["idle"] += own_time
+            elif _PARSING_FILES.search(filename):
+                seconds["HTML parsing"] += own_time
+
+        for name, functions in stages.items():
+            for function in functions:
+                entry = stats.stats.get(_function_key(function))
+                if entry is not None:
+                    seconds[name] += entry[3]  # Cumulative time
+        seconds["other"] = max(0.0, total - sum(seconds.values()))
+        return seconds
+
+    def top_allocations(self, limit: int = TOP_ALLOCATIONS) -> List[tracemalloc.Statistic]:
+        """Get the allocation sites holding the most memory at the end of the run."""
+        if self._snapshot is None:
+            return []
+        return self._snapshot.statistics("lineno")[:limit]
+
+    def report(self, title: str, sort: str = "cumulative", limit: int = 25) -> str:
+        """
+        Format the breakdown, the memory summary and the hottest functions.
+
+        Args:
+            title: What was profiled (first line of the report)
+            sort: pstats sort key of the function list
+            limit: Number of functions listed
+
+        Returns:
+            Report text
+        """
+        stats = self.stats()
+        breakdown = self.breakdown(stats)
+        profiled = sum(breakdown.values()) or 1.0
+
+        lines = [
+            f"Profile of {title}",
+            f"wall time {self.wall_time * 1000:.1f} ms, {self.threads} thread(s) profiled",
+            "",
+            "Breakdown (time summed over threads):",
+        ]
+        for name, value in breakdown.items():
+            lines.append(f"  {name:<20} {value * 1000:10.1f} ms  {value / profiled:6.1%}")
+
+        if self.trace_memory:
+            lines += [
+                "",
+                f"Memory: peak {_mib(self.peak_memory)}, {_mib(self.final_memory)} still allocated at the end",
+                "Largest allocation sites at the end:",
+            ]
+            for statistic in self.top_allocations():
+                frame = statistic.traceback[0]
+                lines.append(f"  {_mib(statistic.size):>10}  {frame.filename}:{frame.lineno} "
+                             f"({statistic.count} blocks)")
+
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+        lines += ["", f"Hot functions (sorted by {sort}):", stream.getvalue().strip("\n")]
+        return "\n".join(lines) + "\n"
+
+
+def _mib(size: int) -> str:
+    return f"{size / (1024 * 1024):.2f} MiB"
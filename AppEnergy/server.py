@@ -0,0 +1,174 @@
+"""
+Long-running HTTP/JSON server (``AppEnergy serve``).
+
+One warm EnergyConsumptionCalculator, the pooled HTTP sessions, the page
+memoization and the lookup cache live for the whole process, so repeated
+classifications skip the interpreter start-up, imports and connection
+set-up of a CLI invocation. Endpoints:
+
+* ``GET /classify?name=NAME[&timeout=SECONDS]``: process_application result
+* ``POST /batch`` with ``{"names": [...], "timeout": SECONDS}``:
+  ``{"results": [...]}`` in input order
+* ``GET /healthz``: liveness probe
+* ``GET /stats``: cache, coalescing, per-host health and lookup metrics
+  counters as JSON
+* ``GET /metrics``: lookup metrics in the Prometheus text format
+"""
+import json
+import math
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import metrics
+from .config import SERVE_MAX_BATCH, SERVE_MAX_BODY
+
+
+class ClassificationHandler(BaseHTTPRequestHandler):
+    """Request handler of the classification server"""
+
+    server_version = "AppEnergy"
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/classify":
+            names = query.get("name")
+            if not names or not names[0].strip():
+                self._send(400, {"error": "missing 'name' query parameter"})
+                return
+            timeout, error = _parse_timeout(query.get("timeout", [None])[0])
+            if error:
+                self._send(400, {"error": error})
+                return
+            self._send(200, self.server.calculator.process_application(names[0].strip(), timeout))
+        elif url.path == "/healthz":
+            self._send(200, {"status": "ok", "uptime": time.monotonic() - self.server.started})
+        elif url.path == "/stats":
+            self._send(200, self.server.stats())
+        elif url.path == "/metrics":
+            self._send_body(200, metrics.prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != "/batch":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > SERVE_MAX_BODY:
+            self._send(413, {"error": f"request body must be at most {SERVE_MAX_BODY} bytes"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "request body is not valid JSON"})
+            return
+
+        names = body.get("names") if isinstance(body, dict) else None
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            self._send(400, {"error": "'names' must be a list of strings"})
+            return
+        if not all(name.strip() for name in names):
+            self._send(400, {"error": "'names' must not contain blank names"})
+            return
+        if len(names) > SERVE_MAX_BATCH:
+            self._send(413, {"error": f"at most {SERVE_MAX_BATCH} names per batch"})
+            return
+        timeout, error = _parse_timeout(body.get("timeout"))
+        if error:
+            self._send(400, {"error": error})
+            return
+
+        results = self.server.calculator.process_applications(
+            [name.strip() for name in names], concurrency=self.server.concurrency, timeout=timeout
+        )
+        self._send(200, {"results": list(results)})
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        """Write a JSON response."""
+        self._send_body(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send_body(self, status: int, body: bytes, content_type: str) -> None:
+        """Write a response."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def _parse_timeout(value) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Parse the optional time budget of a request.
+
+    Returns:
+        Tuple of (timeout in seconds or None, error message or None)
+    """
+    if value is None or value == "":
+        return None, None
+    if isinstance(value, bool):  # float(True) would be a 1 second budget
+        return None, "'timeout' must be a number of seconds"
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return None, "'timeout' must be a number of seconds"
+    if not math.isfinite(timeout):
+        return None, "'timeout' must be a finite number of seconds"
+    if timeout <= 0:
+        return None, "'timeout' must be positive"
+    return timeout, None
+
+
+class ClassificationServer(ThreadingHTTPServer):
+    """HTTP server sharing one calculator between all requests"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], calculator, concurrency: int, quiet: bool = False):
+        """
+        Args:
+            address: (host, port) to listen on
+            calculator: EnergyConsumptionCalculator answering every request
+            concurrency: Applications looked up at the same time per batch
+            quiet: Do not log requests to stderr
+        """
+        super().__init__(address, ClassificationHandler)
+        self.calculator = calculator
+        self.concurrency = concurrency
+        self.quiet = quiet
+        self.started = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters of the warm state.
+
+        Returns:
+            Dictionary with uptime, tag_cache, coalescing, hosts and metrics
+        """
+        from .data_sources import health
+
+        return {
+            "uptime": time.monotonic() - self.started,
+            "tag_cache": self.calculator.tag_cache_info(),
+            "coalescing": self.calculator.coalescing_info(),
+            "hosts": health.snapshot(),
+            "metrics": metrics.snapshot(),
+        }
+
+
+def warm_up() -> None:
+    """Import the HTTP and parsing stack up front, so the first request does not pay for it."""
+    import bs4  # noqa: F401
+    from .data_sources import session  # noqa: F401
@@ -0,0 +1,130 @@
+"""
+Similarity kernel of the fuzzy category matcher.
+
+SimilarityEngine.ratio(tag, keyword) returns exactly
+``difflib.SequenceMatcher(None, tag, keyword).ratio()`` when that ratio is
+above the cut-off, and 0.0 otherwise, but most pairs never reach difflib:
+
+* the length bound ``2 * min(len) / (len(tag) + len(keyword))`` (difflib's
+  ``real_quick_ratio``) rejects pairs of very different lengths;
+* the multiset bound of ``quick_ratio`` rejects pairs with too few common
+  characters;
+* the longest common subsequence, computed bit-parallel on Python integers,
+  rejects the rest that cannot pass: difflib's matching blocks form a common
+  subsequence, so ``2 * LCS / (len(tag) + len(keyword))`` bounds its ratio.
+
+Pairs that survive are compared by a SequenceMatcher kept per keyword, whose
+``set_seq2`` work (the b2j index of the keyword) is done once, and whose
+``set_seq1`` is called with each tag. Matchers are kept per thread because
+SequenceMatcher is not thread-safe.
+"""
+import difflib
+import threading
+from collections import Counter
+from typing import Dict, Tuple
+
+# Keywords whose state is kept before the per-keyword caches are reset
+SIMILARITY_CACHE_SIZE = 4096
+
+
+class SimilarityEngine:
+    """difflib ratio with early rejection against a cut-off"""
+
+    def __init__(self, cutoff: float, maxsize: int = SIMILARITY_CACHE_SIZE):
+        """
+        Args:
+            cutoff: Ratios at or below this value are reported as 0.0
+            maxsize: Keywords whose character counts, bit masks and matcher
+                are cached
+        """
+        self.cutoff = cutoff
+        self.maxsize = maxsize
+        self._keywords: Dict[str, Tuple[Counter, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _keyword_state(self, keyword: str) -> Tuple[Counter, Dict[str, int]]:
+        """Character counts and per-character position bit masks of a keyword."""
+        state = self._keywords.get(keyword)
+        if state is None:
+            masks = {}
+            for position, char in enumerate(keyword):
+                masks[char] = masks.get(char, 0) | (1 << position)
+            state = (Counter(keyword), masks)
+            with self._lock:
+                if len(self._keywords) >= self.maxsize:
+                    self._keywords.clear()
+                self._keywords[keyword] = state
+        return state
+
+    def _matcher(self, keyword: str) -> difflib.SequenceMatcher:
+        """The calling thread's SequenceMatcher with keyword as its second sequence."""
+        matchers = getattr(self._local, "matchers", None)
+        if matchers is None:
+            matchers = self._local.matchers = {}
+        matcher = matchers.get(keyword)
+        if matcher is None:
+            if len(matchers) >= self.maxsize:
+                matchers.clear()
+            matcher = matchers[keyword] = difflib.SequenceMatcher(None, "", keyword)
+        return matcher
+
+    def ratio(self, tag: str, keyword: str) -> float:
+        """
+        Compare a tag with a keyword.
+
+        Args:
+            tag: First sequence (``a`` of SequenceMatcher)
+            keyword: Second sequence (``b`` of SequenceMatcher)
+
+        Returns:
+            SequenceMatcher(None, tag, keyword).ratio() if it exceeds the
+            cut-off, else 0.0
+        """
+        total = len(tag) + len(keyword)
+        if not total:
+            return 1.0 if 1.0 > self.cutoff else 0.0  # difflib's ratio of two empty sequences
+        # Every bound is 2.0 * matches / total, the same expression as
+        # difflib's, so a bound at the cut-off rejects exactly what difflib would
+        if 2.0 * min(len(tag), len(keyword)) / total <= self.cutoff:
+            return 0.0
+
+        counts, masks = self._keyword_state(keyword)
+        available = dict(counts)
+        matches = 0
+        for char in tag:
+            left = available.get(char, 0)
+            if left:
+                available[char] = left - 1
+                matches += 1
+        if 2.0 * matches / total <= self.cutoff:
+            return 0.0
+
+        if 2.0 * lcs_length(masks, len(keyword), tag) / total <= self.cutoff:
+            return 0.0
+
+        matcher = self._matcher(keyword)
+        matcher.set_seq1(tag)
+        similarity = matcher.ratio()
+        return similarity if similarity > self.cutoff else 0.0
+
+
+def lcs_length(masks: Dict[str, int], length: int, text: str) -> int:
+    """
+    Length of the longest common subsequence of a string and text
+    (bit-parallel, Hyyrö 2004).
+
+    Args:
+        masks: Bit mask of the positions of each character of the string
+        length: Length of the string
+        text: Other string
+
+    Returns:
+        LCS length
+    """
+    full = (1 << length) - 1
+    row = full
+    for char in text:
+        matched = row & masks.get(char, 0)
+        row = ((row + matched) | (row - matched)) & full
+    return length - bin(row).count("1")
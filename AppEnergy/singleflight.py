@@ -0,0 +1,148 @@
+"""
+In-process request coalescing ("single-flight") for data source lookups.
+
+Concurrent callers asking for the same key (a data source and a normalized
+application name) share one in-flight call: the first caller runs it, the
+others wait for its result (or exception) instead of sending the same store
+requests again. Only calls that overlap in time are coalesced; nothing is
+remembered once a call has finished (that is the job of the lookup cache).
+"""
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class WaitTimeout(TimeoutError):
+    """A caller's wait for a call started by another caller timed out."""
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.deduplicated = 0
+        self._futures = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run function, or wait for the call already running under key.
+
+        Args:
+            key: Identity of the call
+            function: Callable taking no arguments
+            timeout: Longest wait, in seconds, for a call started by another
+                caller (None waits until it finishes)
+
+        Returns:
+            Result of the (possibly shared) call
+
+        Raises:
+            Exception raised by the shared call (including a TimeoutError of
+            its own), or WaitTimeout if it did not finish within timeout
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = self._futures[key] = Future()
+                self.executed += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            try:
+                return future.result(timeout)
+            except FutureTimeout:
+                # Before Python 3.11 this is not the built-in TimeoutError, so
+                # a TimeoutError of the shared call itself passes through
+                if future.done():
+                    raise  # Raised by the shared call itself
+                raise WaitTimeout(f"Shared call {key!r} did not finish within {timeout} s") from None
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+    async def async_do(self, key: Hashable, coroutine_function: Callable[[], Any]) -> Any:
+        """
+        Asyncio variant of do: await coroutine_function(), or the call
+        already running under key on the same event loop.
+
+        The shared call runs as its own task, so one waiter being cancelled
+        does not cancel it for the others; it is cancelled once every waiter
+        has gone.
+
+        Args:
+            key: Identity of the call
+            coroutine_function: Coroutine function taking no arguments
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.calls += 1
+            entry = self._tasks.get((loop, key))
+            if entry is None:
+                task = asyncio.ensure_future(coroutine_function())
+                entry = self._tasks[(loop, key)] = [task, 0]
+                task.add_done_callback(lambda done, k=(loop, key): self._forget_task(k, done))
+                self.executed += 1
+            else:
+                self.deduplicated += 1
+            entry[1] += 1
+
+        task = entry[0]
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                with self._lock:
+                    entry[1] -= 1
+                    abandoned = entry[1] == 0
+                if abandoned:
+                    task.cancel()
+            raise
+
+    def _forget_task(self, key: Hashable, task) -> None:
+        """Drop a finished shared task (and mark its exception as retrieved)."""
+        with self._lock:
+            if self._tasks.get(key, (None,))[0] is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the coalescing counters.
+
+        Returns:
+            Dictionary with calls, executed (calls that ran), deduplicated
+            (calls that shared another call's result) and in_flight
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self._futures) + len(self._tasks),
+            }
+
+
+# Shared by every calculator of the process (see EnergyConsumptionCalculator)
+SOURCE_FLIGHTS = SingleFlight()
@@ -0,0 +1,336 @@
+"""
+Offline end-to-end benchmark replaying cassettes of store responses.
+
+Every data source module is exercised against the cassettes in cassettes/,
+served by a local fixture server (see replay.py), so the suite runs fully
+offline and gives comparable numbers between versions. The bundled
+cassettes are synthetic fixtures written by hand to match the structure the
+parsers expect, not recordings of the stores: they are much smaller than
+real pages, so parse and end-to-end times understate the live cost. Run
+--record to replace them with live responses. It measures:
+
+* end_to_end: ``process_application`` latency per application (cold: no
+  lookup cache, page memoization or resolutions),
+* sources: ``get_categories`` latency of each data source,
+* parse: time of each HTML parser over the cassette pages,
+* matcher: classification throughput in apps/sec (cold and warm tag score
+  cache, and ``match_categories_batch``).
+
+Usage:
+    python benchmarks/bench_replay.py [--runs 5] [--output results.json]
+    python benchmarks/bench_replay.py --compare baseline.json [--max-regression 0.2]
+    python benchmarks/bench_replay.py --record   # refresh the cassettes from the real stores
+
+Results are written as JSON with a flat "metrics" map; --compare prints the
+change of every metric against an earlier results file and exits non-zero if
+a metric regressed by more than --max-regression.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Keep a synced catalog mirror out of the measurements; must be set before
+# AppEnergy.config is imported
+os.environ["APPENERGY_CATALOG"] = os.path.join(tempfile.mkdtemp(), "catalog.sqlite3")
+
+import replay  # noqa: E402
+
+# Applications looked up end to end; the cassettes cover every source's
+# requests for them (hits and misses)
+APPS = ("GIMP", "Visual Studio Code", "Stardew Valley", "Celeste", "Doom")
+
+# Parsers timed over the cassette pages: (name, module, function, page URL,
+# app name). Search-page parsers are called as function(content, app_name),
+# page parsers (app name None) as function(url, content).
+PARSERS = (
+    ("apple_store.search", "apple_store", "_find_app_link",
+     "https://www.apple.com/us/search/Stardew Valley?src=serp", "Stardew Valley"),
+    ("apple_store.app_page", "apple_store", "_parse_app_page",
+     "https://apps.apple.com/us/app/stardew-valley/id1406710800", None),
+    ("gog.game_page", "gog", "_parse_game_page", "https://www.gog.com/game/stardew_valley", None),
+    ("itch_io.search", "itch_io", "_find_game_link",
+     "https://itch.io/search?classification=game&q=Celeste&type=games", "Celeste"),
+    ("itch_io.game_page", "itch_io", "_parse_game_page", "https://maddymakesgames.itch.io/celeste", None),
+    ("myabandonware.search", "myabandonware", "_find_game_path",
+     "https://www.myabandonware.com/search/q/Doom", "Doom"),
+)
+
+# Metrics where a higher value is better (all others are durations)
+HIGHER_IS_BETTER_SUFFIX = "_per_sec"
+
+
+def _summary(samples_ms):
+    """Median, 95th percentile and minimum of a list of durations in milliseconds."""
+    samples = sorted(samples_ms)
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, round(0.95 * (len(samples) - 1)))],
+        "min_ms": samples[0],
+    }
+
+
+def _reset_state():
+    """Forget every in-process cache of the data sources, so each run starts cold."""
+    from AppEnergy.main import DATA_SOURCES
+    from AppEnergy.data_sources import health, resolution
+
+    for module in DATA_SOURCES.values():
+        fetch_app_page = getattr(module, "fetch_app_page", None)
+        if fetch_app_page is not None:
+            fetch_app_page.cache_clear()
+    resolution.set_index(None)
+    health.reset()
+
+
+def _sessions():
+    from AppEnergy.data_sources.session import SESSION_HEADERS, get_session
+
+    return [get_session(profile) for profile in SESSION_HEADERS]
+
+
+def bench_end_to_end(runs):
+    """Time process_application of every application in APPS."""
+    from AppEnergy.main import EnergyConsumptionCalculator
+
+    results = {}
+    for app_name in APPS:
+        samples = []
+        for _ in range(runs):
+            _reset_state()
+            calculator = EnergyConsumptionCalculator(single_flight=None)
+            started = time.perf_counter()
+            result = calculator.process_application(app_name)
+            samples.append((time.perf_counter() - started) * 1000)
+        results[app_name] = dict(_summary(samples), category=result["category"],
+                                 sources=sorted(result["raw_data"]))
+    return results
+
+
+def bench_sources(runs):
+    """Time get_categories of every data source over APPS."""
+    from AppEnergy.main import DATA_SOURCES
+
+    results = {}
+    for source_name, module in DATA_SOURCES.items():
+        samples = []
+        for _ in range(runs):
+            _reset_state()
+            for app_name in APPS:
+                started = time.perf_counter()
+                module.get_categories(app_name)
+                samples.append((time.perf_counter() - started) * 1000)
+        results[source_name] = _summary(samples)
+    return results
+
+
+def bench_parsers(interactions, runs):
+    """Time the HTML parsers of the scraped sources over cassette pages."""
+    import importlib
+
+    results = {}
+    for name, module_name, function_name, url, app_name in PARSERS:
+        function = getattr(importlib.import_module(f"AppEnergy.data_sources.{module_name}"), function_name)
+        body = interactions[replay.request_key(url)]["body"]
+        content = body.encode("utf-8")
+        repeat = max(5, runs * 4)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            if app_name is None:
+                function(url, content)
+            else:
+                function(content, app_name)
+            samples.append((time.perf_counter() - started) * 1000)
+        results[name] = dict(_summary(samples), bytes=len(content))
+    return results
+
+
+def _matcher_dataset(interactions, size=2000, seed=0):
+    """
+    Build a deterministic set of raw tag lists from the cassette categories
+    and the category keywords.
+    """
+    from AppEnergy.config import CATEGORIES
+
+    vocabulary = sorted({keyword for keywords in CATEGORIES.values() for keyword in keywords})
+    for interaction in interactions.values():
+        if "json" in interaction.get("headers", {}).get("Content-Type", ""):
+            data = json.loads(interaction["body"])
+            if not isinstance(data, dict):
+                continue
+            categories = data.get("categories") or data.get("snap", {}).get("categories") or []
+            vocabulary.extend(category["name"] for category in categories if isinstance(category, dict))
+    rng = random.Random(seed)
+    noise = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+             for _ in range(len(vocabulary))]
+    return [
+        [rng.choice(vocabulary) if rng.random() < 0.6 else rng.choice(noise) for _ in range(rng.randint(2, 12))]
+        for _ in range(size)
+    ]
+
+
+def bench_matcher(interactions):
+    """Measure classification throughput over a synthetic tag dataset."""
+    from AppEnergy.main import EnergyConsumptionCalculator
+
+    dataset = _matcher_dataset(interactions)
+    calculator = EnergyConsumptionCalculator(single_flight=None)
+    normalized = [calculator.normalize_tags(tags) for tags in dataset]
+
+    results = {"apps": len(dataset)}
+    for label in ("cold", "warm"):
+        started = time.perf_counter()
+        for tags in normalized:
+            calculator.match_categories(tags)
+        results[f"{label}_apps_per_sec"] = len(dataset) / (time.perf_counter() - started)
+
+    EnergyConsumptionCalculator(single_flight=None).match_categories_batch(["warm up"])  # Import NumPy
+    calculator = EnergyConsumptionCalculator(single_flight=None)
+    started = time.perf_counter()
+    calculator.match_categories_batch(normalized)
+    results["batch_cold_apps_per_sec"] = len(dataset) / (time.perf_counter() - started)
+    return results
+
+
+def _flatten(results):
+    """Flatten the sections of the results into metric name -> value."""
+    metrics = {}
+    for app_name, entry in results["end_to_end"].items():
+        metrics[f"end_to_end.{app_name}.median_ms"] = entry["median_ms"]
+    metrics["end_to_end.median_ms"] = statistics.median(
+        entry["median_ms"] for entry in results["end_to_end"].values()
+    )
+    for source_name, entry in results["sources"].items():
+        metrics[f"sources.{source_name}.median_ms"] = entry["median_ms"]
+    for name, entry in results["parse"].items():
+        metrics[f"parse.{name}.median_ms"] = entry["median_ms"]
+    for name, value in results["matcher"].items():
+        if name.endswith(HIGHER_IS_BETTER_SUFFIX):
+            metrics[f"matcher.{name}"] = value
+    return metrics
+
+
+def compare(metrics, baseline_path, max_regression):
+    """
+    Print the change of every metric against a baseline results file.
+
+    Returns:
+        list: Names of the metrics that regressed by more than max_regression
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["metrics"]
+
+    regressed = []
+    print(f"\n{'metric':55} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, value in metrics.items():
+        if name not in baseline or not baseline[name]:
+            continue
+        change = value / baseline[name] - 1
+        worse = -change if name.endswith(HIGHER_IS_BETTER_SUFFIX) else change
+        flag = "  REGRESSION" if max_regression is not None and worse > max_regression else ""
+        if flag:
+            regressed.append(name)
+        print(f"{name:55} {baseline[name]:10.2f} {value:10.2f} {change:+8.1%}{flag}")
+    return regressed
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record():
+    """Look up every application in APPS against the real stores and save their responses as cassettes."""
+    from AppEnergy.main import DATA_SOURCES, EnergyConsumptionCalculator
+    from AppEnergy.data_sources import health
+
+    cassettes = {module.HOST: module.__name__.rsplit(".", 1)[-1] for module in DATA_SOURCES.values()}
+    recorder = replay.Recorder(lambda url: cassettes.get(health.host_key(url), "other"))
+    replay.install(_sessions(), lambda **kwargs: replay.RecordingAdapter(recorder, **kwargs))
+
+    _reset_state()
+    calculator = EnergyConsumptionCalculator(single_flight=None)
+    for app_name in APPS:
+        print(f"{app_name}: {calculator.process_application(app_name)['category']}")
+    recorder.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions of each end-to-end and source measurement")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Replay each response after its recorded latency times this factor "
+                             "(default 0: measure AppEnergy's own overhead only)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with an earlier --output file")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="With --compare, fail if a metric is worse by more than this fraction (e.g. 0.2)")
+    parser.add_argument("--record", action="store_true",
+                        help="Refresh the cassettes from the real stores (needs network access)")
+    args = parser.parse_args()
+
+    if args.record:
+        record()
+        return
+
+    interactions = replay.load_cassettes()
+    server = replay.FixtureServer(interactions, args.latency_scale).start()
+    replay.install(_sessions(), lambda **kwargs: replay.ReplayAdapter(server.base_url, **kwargs))
+    try:
+        results = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "git_revision": _git_revision(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "runs": args.runs,
+                "latency_scale": args.latency_scale,
+            },
+            "end_to_end": bench_end_to_end(args.runs),
+            "sources": bench_sources(args.runs),
+            "parse": bench_parsers(interactions, args.runs),
+            "matcher": bench_matcher(interactions),
+        }
+    finally:
+        server.stop()
+    results["replay"] = {"requests": server.requests, "unrecorded": dict(server.unrecorded)}
+    results["metrics"] = _flatten(results)
+
+    for app_name, entry in results["end_to_end"].items():
+        print(f"process_application({app_name!r}): median {entry['median_ms']:.1f} ms "
+              f"(p95 {entry['p95_ms']:.1f}) -> {entry['category']} from {', '.join(entry['sources']) or 'no source'}")
+    for source_name, entry in results["sources"].items():
+        print(f"  {source_name:15} get_categories median {entry['median_ms']:7.2f} ms")
+    for name, entry in results["parse"].items():
+        print(f"  {name:22} parse median {entry['median_ms']:7.2f} ms ({entry['bytes'] // 1024} KiB)")
+    matcher = results["matcher"]
+    print(f"matcher: {matcher['cold_apps_per_sec']:.0f} apps/sec cold, {matcher['warm_apps_per_sec']:.0f} warm, "
+          f"{matcher['batch_cold_apps_per_sec']:.0f} batch")
+    print(f"replayed {server.requests} requests, {sum(server.unrecorded.values())} without a recording (404)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        regressed = compare(results["metrics"], args.compare, args.max_regression)
+        if regressed:
+            print(f"{len(regressed)} metrics regressed by more than {args.max_regression:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Micro-benchmark of the fuzzy matcher's similarity kernel.
+
+Compares every tag of a tag set with every keyword of the real CATEGORIES
+vocabulary using:
+
+* difflib: a new ``SequenceMatcher(None, tag, keyword).ratio()`` per pair,
+  as calculate_category_confidence originally did;
+* quick bounds: the same, skipping pairs whose ``real_quick_ratio`` or
+  ``quick_ratio`` is at or below the cut-off;
+* engine: AppEnergy.similarity.SimilarityEngine (length, multiset and
+  bit-parallel LCS bounds, then cached per-keyword matchers).
+
+The engine is used by the exhaustive matcher of calculate_category_confidence;
+KeywordIndex.score_tag compares its pruned candidates with plain difflib,
+because the index already applies the length and multiset bounds and the
+engine measured no gain there. Every kernel must give the same scores; the
+exit status is non-zero otherwise.
+
+Tags are the keywords themselves, one-character edits of them and common
+store genres, so pairs are near the cut-off as often as in real lookups.
+
+Usage:
+    python benchmarks/bench_similarity.py [--runs 5] [--output similarity.json]
+"""
+import argparse
+import difflib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AppEnergy.config import CATEGORIES  # noqa: E402
+from AppEnergy.matching import FUZZY_MATCH_CUTOFF  # noqa: E402
+from AppEnergy.similarity import SimilarityEngine  # noqa: E402
+
+# Genres and tags as stores return them (after normalization)
+STORE_TAGS = (
+    "action", "adventure", "arcade", "audio", "audiovideo", "board", "casual", "chat", "development",
+    "education", "email", "emulator", "fantasy", "file_manager", "finance", "game", "graphics",
+    "ide", "indie", "instant_messaging", "music", "network", "office", "photography", "platformer",
+    "productivity", "puzzle", "rpg", "science", "shooter", "simulation", "strategy", "system",
+    "text_editor", "utilities", "video", "web_browser", "word_processor",
+)
+
+
+def _tags(seed=1):
+    """Keywords, one-character edits of each keyword and STORE_TAGS."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz_"
+    keywords = sorted({keyword for keywords in CATEGORIES.values() for keyword in keywords})
+    tags = list(keywords)
+    for keyword in keywords:
+        position = rng.randrange(len(keyword))
+        edit = rng.choice(("replace", "delete", "insert"))
+        if edit == "replace":
+            tags.append(keyword[:position] + rng.choice(letters) + keyword[position + 1:])
+        elif edit == "delete" and len(keyword) > 1:
+            tags.append(keyword[:position] + keyword[position + 1:])
+        else:
+            tags.append(keyword[:position] + rng.choice(letters) + keyword[position:])
+    tags.extend(STORE_TAGS)
+    return list(dict.fromkeys(tags)), keywords
+
+
+def _difflib_ratio(tag, keyword):
+    similarity = difflib.SequenceMatcher(None, tag, keyword).ratio()
+    return similarity if similarity > FUZZY_MATCH_CUTOFF else 0.0
+
+
+def _quick_bounds_ratio(tag, keyword):
+    matcher = difflib.SequenceMatcher(None, tag, keyword)
+    if matcher.real_quick_ratio() <= FUZZY_MATCH_CUTOFF or matcher.quick_ratio() <= FUZZY_MATCH_CUTOFF:
+        return 0.0
+    similarity = matcher.ratio()
+    return similarity if similarity > FUZZY_MATCH_CUTOFF else 0.0
+
+
+def _time(function, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def bench_pairs(tags, keywords, runs):
+    """Time every kernel over all tag x keyword pairs and check they agree."""
+    engine = SimilarityEngine(FUZZY_MATCH_CUTOFF)
+    kernels = {
+        "difflib": _difflib_ratio,
+        "quick_bounds": _quick_bounds_ratio,
+        "engine": engine.ratio,
+    }
+    engine_scores = [engine.ratio(tag, keyword) for tag in tags for keyword in keywords]  # Warm the caches
+
+    results = {}
+    reference = None
+    for name, ratio in kernels.items():
+        seconds, scores = _time(lambda: [ratio(tag, keyword) for tag in tags for keyword in keywords], runs)
+        if reference is None:
+            reference = scores
+        results[name] = {
+            "seconds": seconds,
+            "pairs_per_sec": len(scores) / seconds,
+            "mismatches": sum(1 for a, b in zip(reference, scores) if a != b),
+        }
+    results["engine"]["mismatches"] += sum(1 for a, b in zip(reference, engine_scores) if a != b)
+    results["pairs"] = len(reference)
+    results["above_cutoff"] = sum(1 for score in reference if score)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions of each measurement (median is reported)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    tags, keywords = _tags()
+    pairs = bench_pairs(tags, keywords, args.runs)
+
+    print(f"{len(tags)} tags x {len(keywords)} keywords = {pairs['pairs']} pairs, "
+          f"{pairs['above_cutoff']} above the {FUZZY_MATCH_CUTOFF} cut-off")
+    baseline = pairs["difflib"]["seconds"]
+    for name in ("difflib", "quick_bounds", "engine"):
+        entry = pairs[name]
+        print(f"  {name:<13} {entry['seconds'] * 1000:9.1f} ms  {entry['pairs_per_sec']:12.0f} pairs/sec  "
+              f"x{baseline / entry['seconds']:5.1f}  ({entry['mismatches']} mismatches)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"pairs": pairs}, f, indent=2)
+
+    mismatches = sum(pairs[name]["mismatches"] for name in ("quick_bounds", "engine"))
+    if mismatches:
+        print(f"FAIL: {mismatches} scores differ from difflib")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
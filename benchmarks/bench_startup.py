@@ -0,0 +1,108 @@
+"""
+Startup-time benchmark for the AppEnergy command-line interface.
+
+Every ``AppEnergy`` invocation pays for importing ``AppEnergy.main``. This
+script measures that cost with ``python -X importtime`` in fresh interpreters
+and checks that heavy dependencies (selenium, bs4, requests, ...) are not
+imported at startup; they must only load on the code paths that use them.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--max-ms 100] [--output startup.json]
+
+The exit status is non-zero if a heavy module is imported at startup or the
+median import time exceeds --max-ms, so the script can guard against
+regressions in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported by "import AppEnergy.main"
+HEAVY_MODULES = ("selenium", "bs4", "requests", "urllib3", "aiohttp", "asyncio", "numpy")
+
+TARGET_MODULE = "AppEnergy.main"
+
+
+def measure_import(python=sys.executable):
+    """
+    Import TARGET_MODULE in a fresh interpreter under -X importtime.
+
+    Returns:
+        dict: Total import time of the AppEnergy package in milliseconds,
+        the set of imported top-level modules and the slowest imports
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {TARGET_MODULE}"],
+        env=env, capture_output=True, text=True, check=True
+    )
+
+    total_us = 0
+    imported = set()
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        if name == "site":
+            # Everything so far was interpreter startup, not our import
+            imported.clear()
+            entries.clear()
+            continue
+        imported.add(name.split(".")[0])
+        entries.append((int(cumulative_us), int(self_us), name))
+        if name == "AppEnergy":
+            total_us = max(total_us, int(cumulative_us))
+
+    slowest = sorted(entries, reverse=True)[:15]
+    return {
+        "total_ms": total_us / 1000,
+        "imported": imported,
+        "slowest": [{"module": name, "cumulative_ms": cum / 1000, "self_ms": own / 1000} for cum, own, name in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters to time")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median import time exceeds this")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(args.runs)]
+    timings = [run["total_ms"] for run in runs]
+    heavy = sorted(set(HEAVY_MODULES) & runs[-1]["imported"])
+
+    results = {
+        "module": TARGET_MODULE,
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "heavy_modules_imported": heavy,
+        "slowest_imports": runs[-1]["slowest"],
+    }
+
+    print(f"import {TARGET_MODULE}: median {results['median_ms']:.1f} ms "
+          f"(min {results['min_ms']:.1f}, max {results['max_ms']:.1f}) over {args.runs} runs")
+    for entry in results["slowest_imports"][:8]:
+        print(f"  {entry['cumulative_ms']:8.2f} ms  {entry['module']}")
+    if heavy:
+        print(f"heavy modules imported at startup: {', '.join(heavy)}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = bool(heavy) or (args.max_ms is not None and results["median_ms"] > args.max_ms)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Offline replay of store responses for the benchmarks.
+
+Cassettes are JSON files (one per data source module, see cassettes/) of
+interactions::
+
+    {"interactions": [{"url": "https://...", "status": 200,
+                       "headers": {"Content-Type": "..."},
+                       "body": "...", "latency_ms": 120}]}
+
+FixtureServer serves them from a local stdlib HTTP server. ReplayAdapter is
+mounted on the shared sessions of AppEnergy.data_sources.session and
+rewrites every request to ``http://127.0.0.1:PORT/<host><path>?<query>``, so
+the requests still go through the real session, retry and health stack and
+over a real socket, but never leave the machine. ReplaySession does the
+same for the aiohttp session passed to the ``async_get_categories``
+adapters. Requests without a recording get a 404, like a store page that
+does not exist, and are counted as unrecorded.
+
+RecordingAdapter does the opposite: it lets requests go to the real stores
+and appends their responses to cassettes (``bench_replay.py --record``).
+The cassettes shipped in cassettes/ are synthetic fixtures, not recordings;
+recording merges live responses over them by URL.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+CASSETTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes")
+
+# Response headers kept when recording
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def request_key(url):
+    """
+    Get the lookup key of a URL, independent of percent-encoding and
+    query parameter order.
+
+    Returns:
+        str: "host/path?sorted query"
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.hostname}{unquote(parts.path)}" + (f"?{query}" if query else "")
+
+
+def load_cassettes(directory=CASSETTE_DIR):
+    """
+    Load every cassette of a directory.
+
+    Returns:
+        dict: request_key mapped to its recorded interaction
+    """
+    interactions = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            for interaction in json.load(f)["interactions"]:
+                interactions[request_key(interaction["url"])] = interaction
+    return interactions
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        # The path is /<host>/<path>, as rewritten by ReplayAdapter
+        key = request_key("https:/" + self.path)
+        interaction = server.interactions.get(key)
+        with server.lock:
+            server.requests += 1
+            if interaction is None:
+                server.unrecorded[key] += 1
+
+        if interaction is None:
+            status, headers, body = 404, {"Content-Type": "text/html"}, "<html><body>Not Found</body></html>"
+        else:
+            status, headers, body = interaction["status"], interaction.get("headers", {}), interaction["body"]
+            if server.latency_scale:
+                time.sleep(interaction.get("latency_ms", 0) / 1000 * server.latency_scale)
+
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Local HTTP server replaying cassettes"""
+
+    daemon_threads = True
+
+    def __init__(self, interactions, latency_scale=0.0):
+        """
+        Args:
+            interactions (dict): Recorded interactions (see load_cassettes)
+            latency_scale (float): Delay each response by its recorded
+                latency_ms times this factor (0 answers immediately)
+        """
+        super().__init__(("127.0.0.1", 0), _ReplayHandler)
+        self.interactions = interactions
+        self.latency_scale = latency_scale
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.unrecorded = defaultdict(int)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+def replay_url(base_url, url):
+    """Rewrite a store URL to its FixtureServer URL (``base_url/<host><path>?<query>``)."""
+    parts = urlsplit(url)
+    return f"{base_url}/{parts.hostname}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter sending every request to a FixtureServer"""
+
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = replay_url(self.base_url, request.url)
+        return super().send(request, **kwargs)
+
+
+class ReplaySession:
+    """aiohttp-compatible session sending every request to a FixtureServer"""
+
+    def __init__(self, base_url, session):
+        """
+        Args:
+            base_url (str): FixtureServer.base_url
+            session: aiohttp.ClientSession used for the requests
+        """
+        self.base_url = base_url
+        self.session = session
+
+    def get(self, url, **kwargs):
+        return self.session.get(replay_url(self.base_url, url), **kwargs)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter recording the real responses it receives"""
+
+    def __init__(self, recorder, **kwargs):
+        self.recorder = recorder
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        started = time.monotonic()
+        response = super().send(request, **kwargs)
+        self.recorder.add(request.url, response, (time.monotonic() - started) * 1000)
+        return response
+
+
+class Recorder:
+    """Collects recorded interactions into one cassette per data source"""
+
+    def __init__(self, cassette_for_host, directory=CASSETTE_DIR):
+        """
+        Args:
+            cassette_for_host (callable): Maps a URL to its cassette name
+            directory (str): Cassette directory
+        """
+        self.cassette_for_host = cassette_for_host
+        self.directory = directory
+        self.cassettes = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def add(self, url, response, latency_ms):
+        interaction = {
+            "url": url,
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            "body": response.text,
+            "latency_ms": round(latency_ms),
+        }
+        with self.lock:
+            self.cassettes[self.cassette_for_host(url)][request_key(url)] = interaction
+
+    def save(self):
+        """Merge the recorded interactions into the cassette files."""
+        os.makedirs(self.directory, exist_ok=True)
+        for name, recorded in self.cassettes.items():
+            path = os.path.join(self.directory, f"{name}.json")
+            existing = {}
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    existing = {request_key(i["url"]): i for i in json.load(f)["interactions"]}
+            existing.update(recorded)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"interactions": list(existing.values())}, f, indent=1, ensure_ascii=False)
+                f.write("\n")
+
+
+def install(sessions, adapter_factory):
+    """
+    Replace the transport adapters of sessions, keeping their pool and retry settings.
+
+    Args:
+        sessions (iterable): requests sessions
+        adapter_factory (callable): Builds the adapter from HTTPAdapter
+            keyword arguments
+    """
+    for session in sessions:
+        current = session.get_adapter("https://")
+        adapter = adapter_factory(
+            pool_connections=current._pool_connections,
+            pool_maxsize=current._pool_maxsize,
+            max_retries=current.max_retries,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
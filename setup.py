@@ -12,6 +12,10 @@ setuptools.setup(
         "Requests==2.32.4",
         "selenium==4.33.0",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.9"],
+        "numpy": ["numpy>=1.21"],
+    },
     entry_points={
         "console_scripts": [
             "AppEnergy=AppEnergy.main:calculate_energy_consumption",
@@ -0,0 +1,159 @@
+"""
+Shared fixtures: the stores are replayed from benchmarks/cassettes by a
+local FixtureServer (see benchmarks/replay.py), so no test touches the
+network.
+"""
+import os
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import replay  # noqa: E402
+from AppEnergy.data_sources import catalog_mirror, health, resolution  # noqa: E402
+from AppEnergy.data_sources.session import SESSION_HEADERS, get_session  # noqa: E402
+from AppEnergy import main  # noqa: E402
+from AppEnergy.main import DATA_SOURCES  # noqa: E402
+
+# Applications recorded in the cassettes
+APPS = ["GIMP", "Visual Studio Code", "Stardew Valley", "Celeste", "Doom"]
+
+
+def reset_sources():
+    """Forget the page memos, resolution index and host health of the data sources."""
+    for module in DATA_SOURCES.values():
+        fetch_app_page = getattr(module, "fetch_app_page", None)
+        if fetch_app_page is not None:
+            fetch_app_page.cache_clear()
+    resolution.set_index(None)
+    health.reset()
+
+
+def install_adapters(base_url, retries=True):
+    """Send the requests of every shared session to base_url."""
+    def factory(**kwargs):
+        if not retries:
+            kwargs["max_retries"] = 0
+        return replay.ReplayAdapter(base_url, **kwargs)
+
+    replay.install([get_session(profile) for profile in SESSION_HEADERS], factory)
+
+
+@pytest.fixture(autouse=True)
+def isolated_sources(tmp_path, monkeypatch):
+    """Start every test with cold data sources and no catalog mirror."""
+    monkeypatch.setattr(catalog_mirror, "CATALOG_PATH", str(tmp_path / "catalog.sqlite3"))
+    monkeypatch.setattr(catalog_mirror, "_mirror", None)
+    reset_sources()
+    yield
+    mirror = catalog_mirror._mirror
+    if mirror is not None:
+        mirror.close()
+    reset_sources()
+
+
+@pytest.fixture(scope="session")
+def fixture_server():
+    """FixtureServer replaying every cassette."""
+    server = replay.FixtureServer(replay.load_cassettes()).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def stores(fixture_server):
+    """Replay the stores from the cassettes."""
+    install_adapters(fixture_server.base_url)
+    return fixture_server
+
+
+class _UnavailableHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"<html><body>Service Unavailable</body></html>"
+        self.send_response(503)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_stores():
+    """Answer every store request with a 503 (without retries)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UnavailableHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    install_adapters(f"http://127.0.0.1:{server.server_address[1]}", retries=False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class FakeSource:
+    """Stand-in for a data source module answering after a delay"""
+
+    def __init__(self, categories=(), delay=0.0, fail=False):
+        """
+        Args:
+            categories: Categories returned by every lookup
+            delay: Seconds before answering (cut short by release)
+            fail: Answer None (failed lookup) instead of the categories
+        """
+        self.categories = list(categories)
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.finished = 0
+        self.released = threading.Event()
+        self._lock = threading.Lock()
+
+    def _answer(self):
+        with self._lock:
+            self.finished += 1
+        return None if self.fail else list(self.categories)
+
+    def get_categories(self, app_name):
+        with self._lock:
+            self.calls += 1
+        self.released.wait(self.delay)
+        return self._answer()
+
+    async def async_get_categories(self, app_name, session):
+        with self._lock:
+            self.calls += 1
+        started = time.monotonic()
+        while not self.released.is_set() and time.monotonic() - started < self.delay:
+            await asyncio.sleep(0.01)
+        return self._answer()
+
+
+@pytest.fixture
+def fake_sources(monkeypatch):
+    """
+    Replace the data sources of main.DATA_SOURCES: call the fixture with a
+    mapping of source name to FakeSource; the others answer [] at once.
+    """
+    installed = []
+
+    def install(sources):
+        sources = {name: sources.get(name) or FakeSource() for name in DATA_SOURCES}
+        for name, source in sources.items():
+            monkeypatch.setitem(main.DATA_SOURCES, name, source)
+        installed.extend(sources.values())
+        return sources
+
+    yield install
+    for source in installed:
+        source.released.set()
@@ -0,0 +1,104 @@
+"""JSONL batch mode of the command-line interface."""
+import io
+import json
+import sys
+import time
+
+import pytest
+
+from conftest import APPS
+from AppEnergy import main, metrics
+
+
+def _run_cli(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["AppEnergy", *argv])
+    main.calculate_energy_consumption()
+
+
+def _read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_writes_one_line_per_application_in_input_order(stores, tmp_path, monkeypatch):
+    names = tmp_path / "apps.txt"
+    names.write_text("\n".join(["", *APPS, "   ", "GIMP"]) + "\n", encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    _run_cli(monkeypatch, "--batch", str(names), "--output", str(output), "--no-cache", "--concurrency", "3")
+
+    results = _read_results(output)
+    assert [result["app_name"] for result in results] == [*APPS, "GIMP"]
+    assert results[0] == results[-1]
+    single = main.EnergyConsumptionCalculator(single_flight=None).process_application("Celeste")
+    assert results[APPS.index("Celeste")] == json.loads(json.dumps(single))
+
+
+def test_batch_reads_stdin_and_writes_stdout(stores, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("Doom\nGIMP\n"))
+
+    _run_cli(monkeypatch, "--batch", "-", "--no-cache")
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["app_name"] for line in lines] == ["Doom", "GIMP"]
+
+
+def test_batch_rejects_an_application_name(monkeypatch, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        _run_cli(monkeypatch, "GIMP", "--batch", "-")
+    assert exit_info.value.code == 2
+    assert "cannot be combined with --batch" in capsys.readouterr().err
+
+
+def _slow_first(monkeypatch):
+    """Make lookups of "Slow" finish after those of the other applications."""
+    def collect(self, app_name, timeout=None):
+        if app_name == "Slow":
+            time.sleep(0.5)
+        return {"Snapcraft": ["ide"]}, [], {}
+
+    monkeypatch.setattr(main.EnergyConsumptionCalculator, "_collect_app_data", collect)
+
+
+def test_worker_processes_classify_like_this_process(stores):
+    calculator = main.EnergyConsumptionCalculator(single_flight=None)
+    expected = list(calculator.process_applications(APPS))
+
+    entries = calculator.collect_applications(APPS)
+    assert list(calculator.classify_applications(entries, processes=2, chunk_size=2)) == expected
+
+
+@pytest.mark.parametrize("processes", [[], ["--processes", "1"]])
+@pytest.mark.parametrize("unordered", [False, True])
+def test_unordered_batch_writes_results_as_they_complete(tmp_path, monkeypatch, processes, unordered):
+    _slow_first(monkeypatch)
+    names = tmp_path / "apps.txt"
+    names.write_text("Slow\nFast\n", encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    _run_cli(monkeypatch, "--batch", str(names), "--output", str(output), "--no-cache", *processes,
+             *(["--unordered"] if unordered else []))
+
+    order = [result["app_name"] for result in _read_results(output)]
+    assert order == (["Fast", "Slow"] if unordered else ["Slow", "Fast"])
+
+
+def test_worker_processes_return_and_register_lookup_metrics(stores, monkeypatch):
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    calculator = main.EnergyConsumptionCalculator(single_flight=None, collect_metrics=True)
+
+    entries = calculator.collect_applications(APPS)
+    results = list(calculator.classify_applications(entries, processes=2, chunk_size=2))
+
+    assert [result["app_name"] for result in results] == APPS
+    for result in results:
+        lookup_metrics = result["metrics"]
+        assert lookup_metrics["fetch_ms"] > 0
+        assert lookup_metrics["normalize_ms"] > 0
+        assert lookup_metrics["match_ms"] > 0
+        assert lookup_metrics["requests"] == sum(entry["requests"] for entry in lookup_metrics["sources"].values())
+    snapshot = registry.snapshot()
+    assert snapshot["lookups"] == len(APPS)
+    assert snapshot["stage_seconds"]["match"] == pytest.approx(sum(r["metrics"]["match_ms"] for r in results) / 1000)
+    assert snapshot["sources"]["Flathub"]["fetches"] == len(APPS)
@@ -0,0 +1,86 @@
+"""Lookup cache, negative entries and failed lookups."""
+from AppEnergy.cache import CategoryCache
+from AppEnergy.main import DATA_SOURCES, EnergyConsumptionCalculator
+
+
+def _calculator(cache, **kwargs):
+    return EnergyConsumptionCalculator(cache=cache, single_flight=None, **kwargs)
+
+
+def test_not_found_is_cached_as_empty(stores, tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    result = _calculator(cache).process_application("Doom")
+
+    assert result["missing_sources"] == {}
+    assert cache.get("Snapcraft", "Doom") == []  # 404 from the Snapcraft API
+    assert cache.get("Itch.io", "Doom") == []  # No matching search result
+    assert cache.get("Gog", "Doom") == ["FPS", "Shooter", "Action", "Classic", "Gore"]
+
+
+def test_cached_lookups_need_no_requests(stores, tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    first = _calculator(cache).process_application("GIMP")
+
+    before = stores.requests
+    second = _calculator(cache).process_application(" gimp ")
+
+    assert stores.requests == before
+    assert second["category"] == first["category"]
+    assert second["confidence"] == first["confidence"]
+    assert second["raw_data"] == first["raw_data"]
+
+
+def test_refresh_ignores_cached_entries(stores, tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("Gog", "Doom", ["Stale"])
+
+    before = stores.requests
+    result = _calculator(cache, refresh_cache=True).process_application("Doom")
+
+    assert stores.requests > before
+    assert result["raw_data"]["Gog"] == ["FPS", "Shooter", "Action", "Classic", "Gore"]
+    assert cache.get("Gog", "Doom") == ["FPS", "Shooter", "Action", "Classic", "Gore"]
+
+
+def test_entries_expire(tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"), ttl={"Gog": -1}, negative_ttl=-1)
+    cache.set("Gog", "Doom", ["FPS"])
+    cache.set("Itch.io", "Doom", [])
+
+    assert cache.get("Gog", "Doom") is None
+    assert cache.get("Itch.io", "Doom") is None
+    assert cache.prune() == 2
+
+
+def test_failed_sources_are_reported_and_not_cached(unavailable_stores, tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    result = _calculator(cache, max_workers=1).process_application("GIMP")
+
+    assert result["missing_sources"] == {name: "error" for name in DATA_SOURCES}
+    for name in DATA_SOURCES:
+        assert cache.get(name, "GIMP") is None
+
+
+def test_descriptions_are_cached_with_the_categories(stores, tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    first = _calculator(cache, use_descriptions=True).process_application("GIMP")
+
+    assert cache.get_description("Flathub", "GIMP")
+    before = stores.requests
+    second = _calculator(cache, use_descriptions=True).process_application("GIMP")
+
+    assert stores.requests == before
+    assert second["category"] == first["category"]
+    assert second["confidence"] == first["confidence"]
+
+
+def test_set_description_only_updates_existing_entries(tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("Gog", "Doom", ["FPS"])
+    cache.set_description("Itch.io", "Doom", "Not cached")
+
+    assert cache.get_description("Gog", "Doom") is None
+    assert cache.get_description("Itch.io", "Doom") is None
+    cache.set_description("Gog", "Doom", "Rip and tear.")
+    assert cache.get_description("Gog", "Doom") == "Rip and tear."
+    assert cache.get("Gog", "Doom") == ["FPS"]
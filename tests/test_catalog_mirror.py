@@ -0,0 +1,129 @@
+"""Catalog mirror sync and offline lookups."""
+import json
+
+import pytest
+
+import replay
+from conftest import install_adapters
+from AppEnergy import main
+from AppEnergy.config import FLATHUB_API_URL, SNAPCRAFT_API_URL
+from AppEnergy.data_sources import catalog_mirror, flathub, snap
+
+FLATHUB_LISTINGS = {
+    "Development": [
+        {"name": "Visual Studio Code", "flatpakAppId": "com.visualstudio.code"},
+        {"name": "Removed App", "flatpakAppId": "org.example.Removed"},  # Details answer 404
+    ],
+    "Graphics": [{"name": "GIMP", "flatpakAppId": "org.gimp.GIMP"}],
+    "Utility": [{"name": "GIMP", "flatpakAppId": "org.gimp.GIMP"}],
+}
+SNAP_LISTINGS = {
+    "development": [{"name": "code", "snap-id": "vscode", "snap": {
+        "categories": [{"name": "development"}, {"name": "productivity"}]}}],
+    "games": [],
+}
+# Feeds of a sync: the Flathub category listings, then the Snapcraft category list and listings
+FEEDS = len(catalog_mirror.FLATHUB_CATEGORIES) + 1 + len(SNAP_LISTINGS)
+
+
+def _interaction(url, body):
+    return {"url": url, "status": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(body)}
+
+
+@pytest.fixture(scope="module")
+def catalog_server():
+    """FixtureServer with the cassettes and small Flathub and Snapcraft catalogs."""
+    interactions = replay.load_cassettes()
+    recorded = [
+        _interaction(f"{FLATHUB_API_URL}/compat/apps/category/{category}", FLATHUB_LISTINGS.get(category, []))
+        for category in catalog_mirror.FLATHUB_CATEGORIES
+    ]
+    recorded.append(_interaction(f"{SNAPCRAFT_API_URL}/snaps/categories",
+                                 {"categories": [{"name": name} for name in SNAP_LISTINGS]}))
+    recorded += [
+        _interaction(f"{SNAPCRAFT_API_URL}/snaps/find?category={name}&fields=title,categories", {"results": results})
+        for name, results in SNAP_LISTINGS.items()
+    ]
+    interactions.update((replay.request_key(interaction["url"]), interaction) for interaction in recorded)
+    server = replay.FixtureServer(interactions).start()
+    yield server
+    server.stop()
+
+
+def _sync(full=False):
+    mirror = catalog_mirror.CatalogMirror()
+    try:
+        return catalog_mirror.sync_flathub(mirror, full), catalog_mirror.sync_snapcraft(mirror, full)
+    finally:
+        mirror.close()
+
+
+@pytest.fixture
+def synced(catalog_server):
+    """Sync both catalogs into the test's CATALOG_PATH."""
+    install_adapters(catalog_server.base_url)
+    before = catalog_server.requests
+    summaries = _sync()
+    return catalog_server, summaries, catalog_server.requests - before
+
+
+def test_sync_imports_every_listing(synced):
+    _, (flathub_summary, snap_summary), requests = synced
+
+    assert flathub_summary == {"feeds": len(catalog_mirror.FLATHUB_CATEGORIES), "changed": 10, "apps": 2}
+    assert snap_summary == {"feeds": 2, "changed": 2, "apps": 1}
+    assert requests == FEEDS + 3  # Details of each listed Flathub application, once
+
+
+def test_resync_reads_only_new_details(synced):
+    server = synced[0]
+
+    before = server.requests
+    _sync()
+    assert server.requests - before == FEEDS + 1  # Only the application without details is retried
+
+    before = server.requests
+    _sync(full=True)
+    assert server.requests - before == FEEDS + 3
+
+
+def test_mirrored_apps_need_no_requests(synced):
+    server = synced[0]
+    before = server.requests
+
+    # Full categories from the details, not just the listings' main category
+    assert flathub.get_categories("GIMP") == ["Graphics", "2DGraphics", "RasterGraphics"]
+    assert flathub.get_categories("visual studio code") == flathub._parse_categories(
+        json.loads(server.interactions[replay.request_key(flathub._details_url("com.visualstudio.code"))]["body"])
+    )
+    assert snap.get_categories("code") == ["development", "productivity"]
+    assert server.requests == before
+
+
+def test_apps_missing_from_the_mirror_go_to_the_store(synced):
+    server = synced[0]
+    before = server.requests
+
+    assert flathub.get_categories("Removed App") == []
+    assert server.requests > before
+
+
+def test_stale_mirror_is_ignored(synced):
+    mirror = catalog_mirror.CatalogMirror()
+    try:
+        assert mirror.lookup(catalog_mirror.FLATHUB, "GIMP") == ["Graphics", "2DGraphics", "RasterGraphics"]
+        assert mirror.lookup(catalog_mirror.FLATHUB, "GIMP", max_age=-1) is None
+        assert mirror.lookup_id(catalog_mirror.FLATHUB, "gimp") == "org.gimp.GIMP"
+        assert mirror.lookup_id(catalog_mirror.FLATHUB, "gimp", max_age=-1) is None
+    finally:
+        mirror.close()
+
+
+def test_failed_sync_is_reported_on_stderr(unavailable_stores, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main._sync_catalog(["--source", "Flathub"])
+
+    assert exit_info.value.code == 1
+    captured = capsys.readouterr()
+    assert "Flathub: sync failed" in captured.err
+    assert captured.out == ""
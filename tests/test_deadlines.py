@@ -0,0 +1,87 @@
+"""Per-lookup time budgets, hedged requests and Retry-After waits."""
+import time
+
+import pytest
+from urllib3.response import HTTPResponse
+
+from conftest import FakeSource
+from AppEnergy.config import HTTP_RETRY_AFTER_MAX
+from AppEnergy.data_sources.session import DeadlineExceeded, DeadlineRetry, deadline, get_session
+from AppEnergy.main import EnergyConsumptionCalculator
+
+LATE_SOURCES = ["Flathub", "Apple Store", "Gog", "Itch.io", "My Abandonware"]
+
+
+class StallingSource(FakeSource):
+    """Source whose first request stalls and whose later requests answer at once"""
+
+    def get_categories(self, app_name):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            self.released.wait(self.delay)
+        return self._answer()
+
+
+def _calculator(**kwargs):
+    return EnergyConsumptionCalculator(single_flight=None, **kwargs)
+
+
+@pytest.mark.parametrize("max_workers", [1, 6])
+def test_lookup_returns_at_the_deadline(fake_sources, max_workers):
+    # Flathub overruns the budget however its requests are timed out
+    sources = fake_sources({"Snapcraft": FakeSource(["ide"]), "Flathub": FakeSource(["git"], delay=10)})
+
+    started = time.monotonic()
+    result = _calculator(max_workers=max_workers).process_application("Editor", timeout=0.3)
+
+    assert time.monotonic() - started < 2
+    assert result["raw_data"] == {"Snapcraft": ["ide"]}
+    assert result["missing_sources"]["Flathub"] == "timeout"
+    if max_workers == 1:
+        # Sources after Flathub are never started
+        assert result["missing_sources"] == {name: "timeout" for name in LATE_SOURCES}
+        assert sources["Gog"].calls == 0
+
+
+def test_sequential_lookup_without_timeout_waits_for_every_source(fake_sources):
+    fake_sources({"Flathub": FakeSource(["git"], delay=0.2)})
+
+    result = _calculator(max_workers=1).process_application("Editor")
+
+    assert result["raw_data"] == {"Flathub": ["git"]}
+    assert result["missing_sources"] == {}
+
+
+@pytest.mark.parametrize("max_workers", [1, 6])
+def test_hedged_request_answers_for_a_stalled_one(fake_sources, max_workers):
+    sources = fake_sources({"Gog": StallingSource(["puzzle"], delay=10)})
+
+    started = time.monotonic()
+    result = _calculator(max_workers=max_workers, hedge_after=0.1).process_application("Game")
+
+    assert time.monotonic() - started < 2
+    assert result["raw_data"] == {"Gog": ["puzzle"]}
+    assert sources["Gog"].calls == 2
+    assert sources["Snapcraft"].calls == 1  # Sources that answered in time are not hedged
+
+
+def test_requests_after_the_deadline_fail_immediately(stores):
+    before = stores.requests
+    with deadline(time.monotonic() - 1):
+        with pytest.raises(DeadlineExceeded):
+            get_session("plain").get("https://itch.io/search?q=Doom")
+    assert stores.requests == before
+
+
+def test_retry_after_is_capped():
+    retry = DeadlineRetry(total=1)
+    response = HTTPResponse(headers={"Retry-After": "3600"}, status=503)
+
+    assert retry.get_retry_after(response) == HTTP_RETRY_AFTER_MAX
+    with deadline(time.monotonic() + 1):
+        assert 0 < retry.get_retry_after(response) <= 1
+    with deadline(time.monotonic() - 1):
+        assert retry.get_retry_after(response) == 0
+        assert retry.is_exhausted()
@@ -0,0 +1,69 @@
+"""Confidence-driven early exit across data sources."""
+import asyncio
+import time
+
+from conftest import FakeSource
+from AppEnergy.main import EnergyConsumptionCalculator
+
+# More development tags than the budget of all the other sources together
+DEVELOPMENT_TAGS = [
+    "ide", "vscode", "intellij", "eclipse", "sublime", "git", "svn", "mercurial", "sql", "nosql",
+    "docker", "kubernetes", "postman", "insomnia", "graphql", "xcode", "android_studio", "api_client",
+]
+OTHER_SOURCES = ["Flathub", "Apple Store", "Gog", "Itch.io", "My Abandonware"]
+
+
+def _calculator(**kwargs):
+    return EnergyConsumptionCalculator(early_exit_threshold=0.6, single_flight=None, **kwargs)
+
+
+def test_sequential_lookup_stops_after_a_decisive_source(fake_sources):
+    sources = fake_sources({"Snapcraft": FakeSource(DEVELOPMENT_TAGS)})
+
+    result = _calculator(max_workers=1).process_application("Editor")
+
+    assert result["category"] == "development_programming"
+    assert result["skipped_sources"] == OTHER_SOURCES
+    assert [source.calls for source in sources.values()] == [1, 0, 0, 0, 0, 0]
+
+
+def test_concurrent_lookup_abandons_slow_sources(fake_sources):
+    slow = {name: FakeSource(["puzzle"], delay=10) for name in OTHER_SOURCES}
+    fake_sources({"Snapcraft": FakeSource(DEVELOPMENT_TAGS), **slow})
+
+    started = time.monotonic()
+    result = _calculator().process_application("Editor")
+
+    assert time.monotonic() - started < 5
+    assert result["category"] == "development_programming"
+    assert result["skipped_sources"] == OTHER_SOURCES
+    assert result["missing_sources"] == {}
+
+
+def test_async_lookup_cancels_slow_sources(fake_sources):
+    slow = {name: FakeSource(["puzzle"], delay=10) for name in OTHER_SOURCES}
+    fake_sources({"Snapcraft": FakeSource(DEVELOPMENT_TAGS), **slow})
+
+    started = time.monotonic()
+    result = asyncio.run(_calculator().async_process_application("Editor", session=object()))
+
+    assert time.monotonic() - started < 5
+    assert result["skipped_sources"] == OTHER_SOURCES
+
+
+def test_undecided_lookup_queries_every_source(fake_sources):
+    sources = fake_sources({"Snapcraft": FakeSource(["ide", "git"]), "Gog": FakeSource(["puzzle", "strategy"])})
+
+    result = _calculator(max_workers=1).process_application("Editor")
+
+    assert result["skipped_sources"] == []
+    assert all(source.calls == 1 for source in sources.values())
+
+
+def test_lead_must_exceed_the_pending_budget():
+    calculator = _calculator()
+    tags = {"Snapcraft": ["ide", "git", "docker"]}
+
+    assert calculator._can_exit_early(tags, ["Flathub"])  # Lead 3.0 > budget 2.0
+    assert not calculator._can_exit_early(tags, ["Flathub", "Gog"])  # Budget 5.0
+    assert not calculator._can_exit_early({"Snapcraft": ["ide", "git"]}, ["Flathub"])  # Lead 2.0
@@ -0,0 +1,99 @@
+"""Per-host circuit breakers and adaptive concurrency limits."""
+import threading
+import time
+
+import pytest
+
+from AppEnergy.data_sources import health
+from AppEnergy.main import DATA_SOURCES, EnergyConsumptionCalculator
+
+
+def _fail(host, count=1):
+    for _ in range(count):
+        trial = host.acquire()
+        host.release(0.01, True, trial)
+
+
+def test_host_key():
+    assert health.host_key("https://apps.apple.com/us/app/doom/id1") == "apple.com"
+    assert health.host_key("www.apple.com") == "apple.com"
+    assert health.host_key("https://celeste.itch.io/") == "itch.io"
+    assert health.host_key("http://127.0.0.1:8080/x") == "127.0.0.1"
+
+
+def test_circuit_opens_after_consecutive_failures():
+    host = health.HostHealth("example.com", failure_threshold=3, cooldown=60)
+    _fail(host, 2)
+    host.release(0.01, False, host.acquire())  # A success resets the count
+    _fail(host, 2)
+    assert host.state == health.CLOSED
+
+    _fail(host)
+    assert host.state == health.OPEN
+    assert not host.available()
+    with pytest.raises(health.CircuitOpenError):
+        host.acquire()
+    assert host.stats()["rejected"] == 1
+
+
+def test_half_open_circuit_lets_one_trial_through():
+    host = health.HostHealth("example.com", failure_threshold=1, cooldown=0.05)
+    _fail(host)
+    time.sleep(0.1)
+    assert host.state == health.HALF_OPEN
+
+    trial = host.acquire()
+    assert trial
+    with pytest.raises(health.CircuitOpenError):
+        host.acquire()  # Only one trial at a time
+    host.release(0.01, True, trial)
+    assert host.state == health.OPEN  # A failed trial reopens the circuit
+
+    time.sleep(0.1)
+    host.release(0.01, False, host.acquire())
+    assert host.state == health.CLOSED
+
+
+def test_limit_grows_additively_and_halves_on_congestion():
+    host = health.HostHealth("example.com", failure_threshold=100, min_concurrency=1, max_concurrency=8,
+                             slow_request=1.0)
+    _fail(host)
+    assert host.stats()["limit"] == 4
+    _fail(host, 5)
+    assert host.stats()["limit"] == 1  # Never below min_concurrency
+
+    for _ in range(3):
+        host.release(0.01, False, host.acquire())
+    assert host.stats()["limit"] == 2
+
+    host.release(2.0, False, host.acquire())  # Slow request
+    assert host.stats()["limit"] == 1
+
+    for _ in range(200):
+        host.release(0.01, False, host.acquire())
+    assert host.stats()["limit"] == 8  # Never above max_concurrency
+
+
+def test_acquire_waits_for_a_free_slot():
+    host = health.HostHealth("example.com", max_concurrency=1)
+    host.acquire()
+    with pytest.raises(TimeoutError):
+        host.acquire(timeout=0.05)
+
+    threading.Timer(0.05, host.release, (0.01, False)).start()
+    host.acquire(timeout=5)
+    assert host.stats()["in_flight"] == 1
+
+
+def test_open_circuits_skip_their_sources(unavailable_stores):
+    calculator = EnergyConsumptionCalculator(max_workers=1, single_flight=None)
+    for _ in range(health.CIRCUIT_FAILURE_THRESHOLD):
+        result = calculator.process_application("GIMP")
+        assert set(result["missing_sources"].values()) <= {"error", "circuit_open"}
+
+    requests = sum(stats["requests"] for stats in health.snapshot().values())
+    result = calculator.process_application("GIMP")
+
+    assert result["missing_sources"] == {name: "circuit_open" for name in DATA_SOURCES}
+    assert sum(stats["requests"] for stats in health.snapshot().values()) == requests
+    assert all(stats["state"] == health.OPEN for stats in health.snapshot().values())
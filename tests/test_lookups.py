@@ -0,0 +1,81 @@
+"""End-to-end lookups against the replayed stores, sync and asyncio."""
+import asyncio
+
+import pytest
+
+import replay
+from conftest import APPS, reset_sources
+from AppEnergy.main import DESCRIPTION_SOURCES, EnergyConsumptionCalculator
+
+# Fields of a result that must not depend on how it was looked up
+RESULT_FIELDS = ("app_name", "category", "confidence", "energy_level", "normalized_tags", "raw_data",
+                 "missing_sources", "error")
+
+
+def _calculator(**kwargs):
+    return EnergyConsumptionCalculator(single_flight=None, **kwargs)
+
+
+def _async_results(server, calculator, app_names):
+    from AppEnergy.data_sources import aio
+
+    async def run():
+        async with aio.create_session() as session:
+            replayed = replay.ReplaySession(server.base_url, session)
+            return [await calculator.async_process_application(app_name, replayed) for app_name in app_names]
+
+    return asyncio.run(run())
+
+
+def _fields(result):
+    return {field: result[field] for field in RESULT_FIELDS}
+
+
+def test_sync_lookups(stores):
+    calculator = _calculator()
+    results = {app_name: calculator.process_application(app_name) for app_name in APPS}
+
+    assert results["Visual Studio Code"]["category"] == "development_programming"
+    assert results["GIMP"]["raw_data"] == {
+        "Snapcraft": ["photo-and-video", "art-and-design"],
+        "Flathub": ["Graphics", "2DGraphics", "RasterGraphics"],
+    }
+    for result in results.values():
+        assert result["error"] is None
+        assert result["missing_sources"] == {}
+    assert not stores.unrecorded
+
+
+def test_async_lookups_match_sync(stores):
+    pytest.importorskip("aiohttp")
+    sync_results = [_fields(_calculator().process_application(app_name)) for app_name in APPS]
+    reset_sources()
+
+    async_results = [_fields(result) for result in _async_results(stores, _calculator(), APPS)]
+
+    assert async_results == sync_results
+
+
+def test_async_lookups_fill_page_memo(stores):
+    pytest.importorskip("aiohttp")
+    result, = _async_results(stores, _calculator(), ["Visual Studio Code"])
+
+    for source_name, module in DESCRIPTION_SOURCES.items():
+        page = module.fetch_app_page.peek("Visual Studio Code")
+        assert (page is not None) == (source_name in result["raw_data"])
+
+
+def test_async_descriptions_need_no_extra_requests(stores):
+    pytest.importorskip("aiohttp")
+    before = stores.requests
+    _async_results(stores, _calculator(), APPS)
+    without_descriptions = stores.requests - before
+    reset_sources()
+
+    before = stores.requests
+    with_descriptions = _async_results(stores, _calculator(use_descriptions=True), APPS)
+    assert stores.requests - before == without_descriptions
+
+    reset_sources()
+    sync_results = [_calculator(use_descriptions=True).process_application(app_name) for app_name in APPS]
+    assert [_fields(result) for result in with_descriptions] == [_fields(result) for result in sync_results]
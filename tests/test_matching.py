@@ -0,0 +1,109 @@
+"""Keyword index scores against the exhaustive fuzzy matcher."""
+import difflib
+from functools import lru_cache
+
+import pytest
+
+from AppEnergy.config import CATEGORIES
+from AppEnergy.main import EnergyConsumptionCalculator
+from AppEnergy.matching import FUZZY_MATCH_CUTOFF, KeywordIndex
+
+KEYWORDS = sorted({keyword for keywords in CATEGORIES.values() for keyword in keywords})
+
+# Genres and tags as stores return them (after normalization)
+STORE_TAGS = [
+    "action", "adventure", "arcade", "audiovideo", "casual", "development", "emulator", "file_manager",
+    "graphics", "ide", "indie", "instant_messaging", "office", "photography", "platformer", "rpg",
+    "shooter", "text_editor", "utilities", "web_browser", "a", "ab", "",
+]
+
+
+def _edit(word, kind):
+    """A one-character replacement, deletion or insertion in the middle of a word."""
+    position = len(word) // 2
+    if kind == 0:
+        return word[:position] + "x" + word[position + 1:]
+    if kind == 1 and len(word) > 1:
+        return word[:position] + word[position + 1:]
+    return word[:position] + "_" + word[position:]
+
+
+# Keywords, one-character edits of them and store genres: many pairs sit near the cut-off
+TAGS = list(dict.fromkeys([
+    *KEYWORDS, *(_edit(keyword, number % 3) for number, keyword in enumerate(KEYWORDS)), *STORE_TAGS,
+]))
+
+# A few tags per application, as the stores return them
+TAG_SETS = [", ".join(TAGS[start:start + 4]) for start in range(0, len(TAGS), 7)]
+
+
+@lru_cache(maxsize=None)
+def difflib_ratio(tag, keyword):
+    """difflib ratio if above the cut-off, else 0.0 (difflib's own upper bounds skip hopeless pairs)."""
+    matcher = difflib.SequenceMatcher(None, tag, keyword)
+    if matcher.real_quick_ratio() <= FUZZY_MATCH_CUTOFF or matcher.quick_ratio() <= FUZZY_MATCH_CUTOFF:
+        return 0.0
+    similarity = matcher.ratio()
+    return similarity if similarity > FUZZY_MATCH_CUTOFF else 0.0
+
+
+def reference_tag_score(tag, keywords):
+    """Best-match score of a tag, as calculate_category_confidence originally computed it."""
+    if tag in keywords:
+        return 1.0
+    best = 0.0
+    for keyword in keywords:
+        if tag in keyword or keyword in tag:
+            best = max(best, 0.8)
+        else:
+            similarity = difflib_ratio(tag, keyword)
+            if similarity > 0.7:
+                best = max(best, similarity * 0.6)
+    return best
+
+
+def reference_confidence(normalized_tags, keywords):
+    tags = [tag.strip() for tag in normalized_tags.split(",")]
+    return sum(reference_tag_score(tag, keywords) for tag in tags) / len(tags)
+
+
+def test_keyword_index_matches_reference():
+    index = KeywordIndex(CATEGORIES)
+    for tag in TAGS:
+        expected = tuple(reference_tag_score(tag, CATEGORIES[name]) for name in index.category_names)
+        assert index.score_tag(tag) == expected, tag
+
+
+@pytest.mark.parametrize("category", sorted(CATEGORIES))
+def test_category_confidence_matches_reference(category):
+    calculator = EnergyConsumptionCalculator()
+    keywords = CATEGORIES[category]
+    for tags in TAG_SETS:
+        expected = reference_confidence(tags, keywords)
+        assert calculator.calculate_category_confidence(tags, category, keywords) == expected, tags
+        assert calculator._fuzzy_category_confidence(tags, keywords) == expected, tags
+
+
+def test_edited_categories_rebuild_the_index():
+    calculator = EnergyConsumptionCalculator()
+    calculator.categories = {name: set(keywords) for name, keywords in CATEGORIES.items()}
+    assert calculator.match_categories("spreadsheet") == ("others", 0.0)
+
+    calculator.categories["custom"] = {"spreadsheet"}  # Edited in place
+    assert calculator.match_categories("spreadsheet") == ("custom", 1.0)
+
+    keywords = {"spreadsheet", "ledger"}
+    assert calculator.calculate_category_confidence("ledgers, spreadsheets", "unindexed", keywords) == \
+        reference_confidence("ledgers, spreadsheets", keywords)
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_batch_matches_single(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    calculator = EnergyConsumptionCalculator()
+    tag_sets = TAG_SETS + ["", "action, rpg", "  graphics ,photo", "spreadsheet"]
+
+    expected = [calculator.match_categories(tags) for tags in tag_sets]
+    assert calculator.match_categories_batch(tag_sets, use_numpy=use_numpy) == expected
+    assert calculator.match_categories_batch(iter(tag_sets), use_numpy=use_numpy) == expected
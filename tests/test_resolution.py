@@ -0,0 +1,81 @@
+"""Name -> store ID/URL resolutions of the search-based sources."""
+import pytest
+
+import replay
+from conftest import install_adapters
+from AppEnergy.cache import CategoryCache, ResolutionIndex
+from AppEnergy.data_sources import apple_store, itch_io, myabandonware, resolution
+from AppEnergy.main import EnergyConsumptionCalculator
+
+CAPTCHA_PAGE = "<html><body><h1>Please verify you are a human</h1></body></html>"
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ResolutionIndex(str(tmp_path / "cache.sqlite3"))
+    resolution.set_index(index)
+    yield index
+    index.close()
+
+
+def test_resolution_skips_the_search(stores, index):
+    first = apple_store.get_categories("Stardew Valley")
+    assert first
+    assert index.get("Apple Store", "Stardew Valley") == "https://apps.apple.com/us/app/stardew-valley/id1406710800"
+    apple_store.fetch_app_page.cache_clear()
+
+    before = stores.requests
+    assert apple_store.get_categories("stardew  valley") == first
+    assert stores.requests == before + 1  # App page only
+
+
+def test_no_match_is_stored(stores, index):
+    assert itch_io.get_categories("Doom") == []
+    assert index.get("Itch.io", "Doom") == ""
+    itch_io.fetch_app_page.cache_clear()
+
+    before = stores.requests
+    assert itch_io.get_categories("Doom") == []
+    assert stores.requests == before
+
+
+def test_stale_resolution_is_searched_again(stores, index):
+    index.set("Apple Store", "Stardew Valley", "https://apps.apple.com/us/app/removed/id1")
+
+    assert apple_store.get_categories("Stardew Valley")
+    assert index.get("Apple Store", "Stardew Valley") == "https://apps.apple.com/us/app/stardew-valley/id1406710800"
+
+
+def test_failed_search_is_not_stored_as_no_match(unavailable_stores, index):
+    assert apple_store.get_categories("Doom") is None
+    assert itch_io.get_categories("Doom") is None
+    assert myabandonware.get_categories("Doom") is None
+    for source in ("Apple Store", "Itch.io", "My Abandonware"):
+        assert index.get(source, "Doom") is None
+
+
+@pytest.mark.parametrize("find", [apple_store._find_app_link, itch_io._find_game_link,
+                                  myabandonware._find_game_path])
+def test_search_page_without_results_container_fails(find):
+    with pytest.raises(ValueError):
+        find(CAPTCHA_PAGE, "Doom")
+
+
+def test_blocked_search_page_stores_nothing(index, tmp_path):
+    interactions = replay.load_cassettes()
+    url = apple_store._search_url("Doom")
+    interactions[replay.request_key(url)] = {
+        "url": url, "status": 200, "headers": {"Content-Type": "text/html"}, "body": CAPTCHA_PAGE,
+    }
+    server = replay.FixtureServer(interactions).start()
+    try:
+        install_adapters(server.base_url)
+        cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+        result = EnergyConsumptionCalculator(cache=cache, single_flight=None).process_application("Doom")
+    finally:
+        server.stop()
+
+    assert result["missing_sources"] == {"Apple Store": "error"}
+    assert index.get("Apple Store", "Doom") is None
+    assert cache.get("Apple Store", "Doom") is None
+    assert cache.get("Gog", "Doom")
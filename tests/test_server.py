@@ -0,0 +1,97 @@
+"""HTTP/JSON server: endpoints and request validation."""
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import pytest
+
+from conftest import APPS
+from AppEnergy.config import SERVE_MAX_BATCH
+from AppEnergy.main import EnergyConsumptionCalculator
+from AppEnergy.server import ClassificationServer
+
+
+@pytest.fixture
+def server(stores):
+    calculator = EnergyConsumptionCalculator(single_flight=None, collect_metrics=True)
+    server = ClassificationServer(("127.0.0.1", 0), calculator, concurrency=4, quiet=True)
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _request(url, body=None, raw=None):
+    data = raw if raw is not None else (None if body is None else json.dumps(body).encode("utf-8"))
+    request = Request(url, data=data, method="GET" if data is None else "POST")
+    try:
+        with urlopen(request, timeout=30) as response:
+            return response.status, response.read().decode("utf-8")
+    except HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def _json(url, body=None, raw=None):
+    status, text = _request(url, body, raw)
+    return status, json.loads(text)
+
+
+def test_classify(server):
+    status, result = _json(f"{server}/classify?name={quote('Visual Studio Code')}&timeout=30")
+
+    assert status == 200
+    assert result["category"] == "development_programming"
+    assert "metrics" in result
+
+
+def test_batch_keeps_input_order(server):
+    status, body = _json(f"{server}/batch", {"names": [*APPS, " GIMP "], "timeout": 30})
+
+    assert status == 200
+    assert [result["app_name"] for result in body["results"]] == [*APPS, "GIMP"]
+
+
+def test_health_stats_and_metrics(server):
+    _json(f"{server}/classify?name=Doom")
+
+    assert _json(f"{server}/healthz")[1]["status"] == "ok"
+    stats = _json(f"{server}/stats")[1]
+    assert set(stats) == {"uptime", "tag_cache", "coalescing", "hosts", "metrics"}
+    status, text = _request(f"{server}/metrics")
+    assert status == 200 and "appenergy" in text.lower()
+
+
+@pytest.mark.parametrize("query", ["", "name=%20", "name=Doom&timeout=abc", "name=Doom&timeout=0",
+                                   "name=Doom&timeout=inf", "name=Doom&timeout=nan"])
+def test_classify_rejects_bad_queries(server, query):
+    status, body = _json(f"{server}/classify?{query}")
+    assert status == 400
+    assert "error" in body
+
+
+@pytest.mark.parametrize("body", [
+    {}, {"names": "GIMP"}, {"names": [1]}, {"names": ["GIMP", " "]},
+    {"names": ["GIMP"], "timeout": True}, {"names": ["GIMP"], "timeout": "soon"},
+    {"names": ["GIMP"], "timeout": -1}, [],
+])
+def test_batch_rejects_bad_bodies(server, body):
+    status, response = _json(f"{server}/batch", body)
+    assert status == 400
+    assert "error" in response
+
+
+def test_batch_rejects_invalid_json_and_oversized_batches(server):
+    assert _json(f"{server}/batch", raw=b"{not json")[0] == 400
+    assert _json(f"{server}/batch", {"names": ["GIMP"] * (SERVE_MAX_BATCH + 1)})[0] == 413
+
+
+def test_boolean_timeout_is_rejected(server):
+    status, body = _json(f"{server}/batch", {"names": ["GIMP"], "timeout": True})
+    assert (status, body) == (400, {"error": "'timeout' must be a number of seconds"})
+
+
+def test_unknown_paths(server):
+    assert _json(f"{server}/nope")[0] == 404
+    assert _json(f"{server}/classify", {"names": []})[0] == 404
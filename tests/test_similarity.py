@@ -0,0 +1,39 @@
+"""Similarity engine against difflib."""
+from test_matching import KEYWORDS, TAGS, difflib_ratio
+
+from AppEnergy.matching import FUZZY_MATCH_CUTOFF
+from AppEnergy.similarity import SimilarityEngine, lcs_length
+
+
+def reference_lcs(a, b):
+    row = [0] * (len(b) + 1)
+    for char in a:
+        previous = 0
+        for position, other in enumerate(b, 1):
+            previous, row[position] = row[position], (
+                previous + 1 if char == other else max(row[position], row[position - 1])
+            )
+    return row[-1]
+
+
+def test_similarity_engine_matches_difflib():
+    engine = SimilarityEngine(FUZZY_MATCH_CUTOFF)
+    for tag in TAGS:
+        for keyword in KEYWORDS:
+            assert engine.ratio(tag, keyword) == difflib_ratio(tag, keyword), (tag, keyword)
+
+
+def test_similarity_engine_survives_cache_resets():
+    engine = SimilarityEngine(FUZZY_MATCH_CUTOFF, maxsize=2)
+    for keyword in KEYWORDS[:20]:
+        for tag in TAGS[::11]:
+            assert engine.ratio(tag, keyword) == difflib_ratio(tag, keyword), (tag, keyword)
+
+
+def test_lcs_length_matches_dynamic_programming():
+    for keyword in KEYWORDS:
+        masks = {}
+        for position, char in enumerate(keyword):
+            masks[char] = masks.get(char, 0) | (1 << position)
+        for tag in TAGS[::5]:
+            assert lcs_length(masks, len(keyword), tag) == reference_lcs(keyword, tag), (keyword, tag)
@@ -0,0 +1,148 @@
+"""Coalescing of concurrent identical source lookups."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import FakeSource
+from AppEnergy.data_sources.session import remaining_time
+from AppEnergy.main import EnergyConsumptionCalculator
+from AppEnergy.singleflight import SingleFlight, WaitTimeout
+
+
+class DeadlineSource(FakeSource):
+    """Source that fails (None) when its lookup's deadline passes before it answers"""
+
+    def get_categories(self, app_name):
+        with self._lock:
+            self.calls += 1
+        remaining = remaining_time()
+        if remaining is not None and remaining < self.delay:
+            self.released.wait(max(0.0, remaining))
+            return None
+        self.released.wait(self.delay)
+        return self._answer()
+
+
+def _run_concurrently(flight, count, function, timeout=None):
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(flight.do, "key", function, timeout) for _ in range(count)]
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def function():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return ["shared"]
+
+    results = _run_concurrently(flight, 5, function)
+
+    assert results == [["shared"]] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 5, "executed": 1, "deduplicated": 4, "in_flight": 0}
+
+
+def test_exceptions_are_shared():
+    flight = SingleFlight()
+
+    def function():
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    results = _run_concurrently(flight, 3, function)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["executed"] == 1
+
+
+def test_follower_wait_times_out_without_the_leader():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("key", lambda: release.wait(5)))
+    leader.start()
+    time.sleep(0.05)
+
+    with pytest.raises(WaitTimeout):
+        flight.do("key", lambda: None, timeout=0.05)
+    release.set()
+    leader.join()
+
+
+def test_leader_timeout_is_not_a_wait_timeout():
+    flight = SingleFlight()
+
+    def function():
+        time.sleep(0.1)
+        raise TimeoutError("leader deadline")
+
+    results = _run_concurrently(flight, 2, function, timeout=5)
+    assert all(type(result) is TimeoutError for result in results)
+
+
+def test_async_calls_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def function():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def run():
+        waiters = [asyncio.ensure_future(flight.async_do("key", function)) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiters[0].cancel()  # One waiter leaving does not cancel the shared task
+        return await asyncio.gather(*waiters[1:])
+
+    assert asyncio.run(run()) == ["shared"] * 2
+    assert len(calls) == 1
+
+
+def test_async_task_is_cancelled_once_every_waiter_left():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def function():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        waiter = asyncio.ensure_future(flight.async_do("key", function))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert cancelled == [1]
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("max_workers", [1, 6])
+def test_follower_reruns_a_lookup_that_timed_out_on_the_leader_deadline(fake_sources, max_workers):
+    source = DeadlineSource(["ide"], delay=0.5)
+    fake_sources({"Snapcraft": source})
+    flight = SingleFlight()
+    leader = EnergyConsumptionCalculator(single_flight=flight)
+    follower = EnergyConsumptionCalculator(max_workers=max_workers, single_flight=flight)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader_result = executor.submit(leader.process_application, "Editor", 0.2)
+        time.sleep(0.05)
+        follower_result = executor.submit(follower.process_application, "Editor")
+        leader_result, follower_result = leader_result.result(), follower_result.result()
+
+    assert leader_result["missing_sources"] == {"Snapcraft": "timeout"}
+    assert follower_result["raw_data"] == {"Snapcraft": ["ide"]}
+    assert follower_result["missing_sources"] == {}
+    assert source.calls == 2